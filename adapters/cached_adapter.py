@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存
+按(适配器配置, prompt, system)内容寻址缓存响应，用于回测回放和调试
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any
+from .llm_base import LLMAdapter, FALLBACK_RESPONSE
+
+# 命中后的访问时间先记在内存中，攒够这么多条再批量写回
+ACCESS_FLUSH_SIZE = 256
+
+# 每写入这么多条检查一次过期和条数上限
+EVICT_INTERVAL = 256
+
+
+class ResponseCache:
+    """基于SQLite的本地响应存储，支持TTL和条数上限淘汰"""
+    
+    def __init__(self, path: str = ".cache/llm_responses.sqlite", ttl: float = None, max_entries: int = 100000):
+        """
+        初始化响应存储
+        
+        Args:
+            path: SQLite文件路径
+            ttl: 条目有效期（秒），None表示永不过期
+            max_entries: 最大条目数，超出时批量淘汰最久未访问的条目（每EVICT_INTERVAL次写入检查一次，
+                条数可能暂时超出上限不到EVICT_INTERVAL条）
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, accessed REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created)")
+        self.conn.commit()
+        
+        self.pending_access = {}
+        self.puts_since_evict = 0
+    
+    def get(self, key: str):
+        """
+        读取缓存响应
+        
+        Args:
+            key: 请求哈希
+            
+        Returns:
+            响应文本，未命中或已过期时返回None
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            
+            if self.ttl is not None and now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            
+            self.pending_access[key] = now
+            if len(self.pending_access) >= ACCESS_FLUSH_SIZE:
+                self._flush_access()
+                self.conn.commit()
+            return row[0]
+    
+    def put(self, key: str, model: str, response: str):
+        """
+        写入响应（每EVICT_INTERVAL次写入执行一次淘汰）
+        
+        Args:
+            key: 请求哈希
+            model: 模型名称
+            response: 响应文本
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            self.pending_access.pop(key, None)
+            self.puts_since_evict += 1
+            if self.puts_since_evict >= EVICT_INTERVAL:
+                self._evict(now)
+            self.conn.commit()
+    
+    def _flush_access(self):
+        """批量写回内存中记录的访问时间（调用方持有锁并负责提交）"""
+        if self.pending_access:
+            self.conn.executemany("UPDATE responses SET accessed = ? WHERE key = ?",
+                                  [(accessed, key) for key, accessed in self.pending_access.items()])
+            self.pending_access.clear()
+    
+    def _evict(self, now: float):
+        """删除过期条目，条数超过上限时按访问时间从旧到新批量淘汰（调用方持有锁并负责提交）"""
+        self.puts_since_evict = 0
+        self._flush_access()
+        if self.ttl is not None:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        
+        excess = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (excess,)
+            )
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    
+    def close(self):
+        """写回访问时间、执行淘汰并关闭数据库连接"""
+        with self.lock:
+            self._evict(time.time())
+            self.conn.commit()
+            self.conn.close()
+
+
+class CachedLLMAdapter(LLMAdapter):
+    """带响应缓存的适配器包装器（可包装任意LLMAdapter）"""
+    
+    def __init__(self, adapter: LLMAdapter, cache: ResponseCache = None, enabled: bool = True):
+        """
+        初始化缓存适配器
+        
+        Args:
+            adapter: 被包装的适配器
+            cache: 响应存储，为None时使用默认路径
+            enabled: 是否启用缓存，实盘应关闭（直接透传）
+        """
+        super().__init__(adapter.api_key)
+        self.adapter = adapter
+        self.cache = cache if cache is not None else ResponseCache()
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def supports_system_prompt(self) -> bool:
+        """与被包装适配器一致"""
+        return self.adapter.supports_system_prompt
+    
+    def cache_key(self, prompt: str, system: str = None) -> str:
+        """
+        计算请求哈希
+        
+        Args:
+            prompt: 输入提示词
+            system: system提示词
+            
+        Returns:
+            sha256十六进制摘要
+        """
+        payload = json.dumps([self.adapter.cache_identity(), system, prompt], ensure_ascii=False, sort_keys=True,
+                             default=repr)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def call(self, prompt: str, **options) -> str:
+        """
+        调用LLM API，命中缓存时直接返回
+        
+        Args:
+            prompt: 输入提示词
+            **options: 透传给被包装适配器的参数（如system）
+            
+        Returns:
+            LLM响应文本
+        """
+        if not self.enabled:
+            return self.adapter.call(prompt, **options)
+        
+        key = self.cache_key(prompt, options.get('system'))
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        
+        response = self.adapter.call(prompt, **options)
+        self._store(key, response)
+        return response
+    
+    async def acall(self, prompt: str, **options) -> str:
+        """
+        异步调用LLM API，命中缓存时直接返回
+        
+        Args:
+            prompt: 输入提示词
+            **options: 透传给被包装适配器的参数（如system）
+            
+        Returns:
+            LLM响应文本
+        """
+        if not self.enabled:
+            return await self.adapter.acall(prompt, **options)
+        
+        key = self.cache_key(prompt, options.get('system'))
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        
+        response = await self.adapter.acall(prompt, **options)
+        self._store(key, response)
+        return response
+    
+    def _lookup(self, key: str):
+        """查询缓存并更新计数"""
+        cached = self.cache.get(key)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+    
+    def _store(self, key: str, response: str):
+        """写入缓存，API失败的默认响应不缓存"""
+        if response != FALLBACK_RESPONSE:
+            self.cache.put(key, self.adapter.get_model_name(), response)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+        
+        Returns:
+            统计字典{hits, misses, hit_rate, entries}
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self.cache)
+        }
+    
+    def cache_identity(self) -> Dict[str, Any]:
+        """与被包装适配器一致"""
+        return self.adapter.cache_identity()
+    
+    async def aclose(self):
+        """关闭被包装适配器的连接"""
+        await self.adapter.aclose()
+    
+    def get_model_name(self) -> str:
+        """获取模型名称"""
+        return self.adapter.get_model_name()
@@ -6,8 +6,9 @@ Claude适配器
 """
 
 import os
-from typing import Dict, Any
-from .llm_base import LLMAdapter
+from typing import Dict, Any, AsyncIterator
+from .llm_base import LLMAdapter, HTTP_POOL_LIMITS, FALLBACK_RESPONSE, DEFAULT_SYSTEM_PROMPT, run_sync
+from .resilience import ResilienceGuard, ResilienceError, get_guard
 
 try:
     import anthropic
@@ -15,16 +16,37 @@ except ImportError:
     print("❌ 请安装anthropic: pip install anthropic")
     anthropic = None
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 
 class ClaudeAdapter(LLMAdapter):
     """Claude适配器"""
     
-    def __init__(self, api_key: str = None):
+    supports_streaming = True
+    supports_system_prompt = True
+    
+    # 使用默认模型时在决策对比中显示的名称
+    display_name = "Claude-3-Sonnet"
+    default_model = "claude-3-sonnet-20240229"
+    
+    def __init__(self, api_key: str = None, model: str = "claude-3-sonnet-20240229",
+                 temperature: float = 0.7, max_tokens: int = 500, timeout: float = 30.0,
+                 guard: ResilienceGuard = None, base_url: str = None, display_name: str = None):
         """
         初始化Claude适配器
         
         Args:
             api_key: Anthropic API密钥，如果为None则从环境变量获取
+            model: 模型名称
+            temperature: 采样温度
+            max_tokens: 最大输出token数
+            timeout: 单次请求超时（秒）
+            guard: 限流+熔断守卫，默认使用按服务商共享的守卫
+            base_url: API地址，为None时使用SDK默认（或ANTHROPIC_BASE_URL环境变量）
+            display_name: 决策对比、账本和日志中的名称，默认模型为"Claude-3-Sonnet"，其他模型为模型名
         """
         if api_key is None:
             api_key = os.getenv('ANTHROPIC_API_KEY')
@@ -33,40 +55,124 @@ class ClaudeAdapter(LLMAdapter):
             raise ValueError("Anthropic API密钥未设置，请设置ANTHROPIC_API_KEY环境变量")
         
         super().__init__(api_key)
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.display_name = display_name or (type(self).display_name if model == self.default_model else model)
+        self.guard = guard or get_guard('anthropic')
         
-        # 初始化Anthropic客户端
+        # 初始化长期复用的异步Anthropic客户端（带keep-alive连接池）
         if anthropic:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            http_client = None
+            if httpx:
+                http_client = anthropic.DefaultAsyncHttpxClient(limits=httpx.Limits(**HTTP_POOL_LIMITS))
+            self.client = anthropic.AsyncAnthropic(
+                api_key=self.api_key,
+                base_url=base_url,
+                timeout=timeout,
+                http_client=http_client
+            )
         else:
             raise ImportError("Anthropic库未安装")
     
-    def call(self, prompt: str) -> str:
+    def call(self, prompt: str, system: str = None) -> str:
         """
         调用Claude API
         
         Args:
             prompt: 输入提示词
+            system: system提示词，为None时使用默认角色设定
+            
+        Returns:
+            Claude响应文本
+        """
+        return run_sync(self.acall(prompt, system))
+    
+    async def acall(self, prompt: str, system: str = None) -> str:
+        """
+        异步调用Claude API
+        
+        Args:
+            prompt: 输入提示词
+            system: system提示词，提供时标记cache_control以复用提示词缓存
             
         Returns:
             Claude响应文本
         """
         try:
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=500,
-                temperature=0.7,
-                system="你是一个专业的量化交易分析师，请根据市场数据给出交易决策。",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            async with self.guard:
+                response = await self.client.messages.create(
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    system=self._system_blocks(system),
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
             
             return response.content[0].text.strip()
             
+        except ResilienceError as e:
+            print(f"⚡ Claude快速失败: {e}")
+            return FALLBACK_RESPONSE
         except Exception as e:
             print(f"❌ Claude API调用失败: {e}")
-            return '{"symbol": null, "action": "HOLD", "confidence": 0.0, "rationale": "API调用失败"}'
+            return FALLBACK_RESPONSE
+    
+    async def astream(self, prompt: str, system: str = None) -> AsyncIterator[str]:
+        """
+        流式调用Claude API，生成器被关闭时立即断开连接（停止生成和计费）
+        
+        守卫覆盖整个读取过程：读取中途出错或被取消计为失败，调用方提前关闭生成器计为成功。
+        
+        Args:
+            prompt: 输入提示词
+            system: system提示词，提供时标记cache_control以复用提示词缓存
+            
+        Yields:
+            响应文本片段
+        """
+        received = False
+        try:
+            async with self.guard:
+                async with self.client.messages.stream(
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    system=self._system_blocks(system),
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                ) as stream:
+                    async for text in stream.text_stream:
+                        received = True
+                        yield text
+        except ResilienceError as e:
+            print(f"⚡ Claude快速失败: {e}")
+            yield FALLBACK_RESPONSE
+        except Exception as e:
+            if received:
+                print(f"❌ Claude流式响应中断: {e}")
+            else:
+                print(f"❌ Claude API调用失败: {e}")
+                yield FALLBACK_RESPONSE
+    
+    def _system_blocks(self, system: str = None):
+        """
+        组装system参数
+        
+        调用方提供的system是跨周期不变的静态前缀，作为带cache_control的文本块发送，
+        后续请求命中Anthropic提示词缓存；未提供时沿用默认角色设定。
+        """
+        if system is None:
+            return DEFAULT_SYSTEM_PROMPT
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    
+    async def aclose(self):
+        """关闭异步客户端及其连接池"""
+        await self.client.close()
     
     def get_model_name(self) -> str:
         """获取模型名称"""
-        return "Claude-3-Sonnet"
+        return self.display_name
@@ -7,13 +7,23 @@
 
 import os
 import sys
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any
+from .resilience import ResilienceGuard, ResilienceError, get_guard
+from .instrumentation import get_instrumentation, metric_key
 
-# 添加cex_scripts路径到sys.path
-cex_scripts_path = "/Users/binguo/workspaces/cex_scripts/scripts/tools"
+# 添加cex_scripts路径到sys.path（可用CEX_SCRIPTS_PATH环境变量覆盖）
+cex_scripts_path = os.getenv('CEX_SCRIPTS_PATH', "/Users/binguo/workspaces/cex_scripts/scripts/tools")
 if cex_scripts_path not in sys.path:
     sys.path.append(cex_scripts_path)
 
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
 try:
     from cex_verified_api_client import BitgetVerifiedAPIClient
 except ImportError:
@@ -21,11 +31,43 @@ except ImportError:
     BitgetVerifiedAPIClient = None
 
 
+# 客户端可能提供的全量行情接口（一次请求返回所有交易对）
+BULK_PRICE_METHODS = ('get_all_prices', 'get_all_tickers', 'get_tickers')
+
+# 客户端可能提供的K线接口，调用方式为 fetch(symbol, interval, start_ms, end_ms, limit)
+KLINE_METHODS = ('get_klines', 'get_candles', 'get_history_candles')
+
+# 行情获取埋点（逐个获取按代币打标签，全量行情记为symbol="*"）
+SNAPSHOT_KEY = metric_key('price_snapshot_seconds')
+BULK_FETCH_KEY = metric_key('price_fetch_seconds', symbol='*')
+
+
 class ExchangeAPI:
     """交易所API适配器"""
     
-    def __init__(self):
-        """初始化交易所API"""
+    def __init__(self, max_workers: int = 8, guard: ResilienceGuard = None, client: Any = None,
+                 verbose: bool = True):
+        """
+        初始化交易所API
+        
+        Args:
+            max_workers: 无全量行情接口时并发获取价格的最大线程数
+            guard: 限流+熔断守卫，默认使用交易所共享的守卫
+            client: 行情客户端（需提供get_current_price，可选全量行情接口），
+                    为None时使用BitgetVerifiedAPIClient；离线调试和压测可注入MockExchangeClient
+            verbose: 是否逐个打印获取到的价格
+        """
+        self.max_workers = max_workers
+        self.executor = None
+        self.guard = guard or get_guard('bitget')
+        self.verbose = verbose
+        self.instrumentation = get_instrumentation()
+        self.fetch_keys = {}
+        
+        if client is not None:
+            self.client = client
+            return
+        
         if BitgetVerifiedAPIClient is None:
             raise ImportError("BitgetVerifiedAPIClient未找到")
         
@@ -46,23 +88,97 @@ class ExchangeAPI:
         Returns:
             价格字典，格式为{symbol: price}
         """
+        return self.get_price_snapshot(symbols)['prices']
+    
+    def get_price_snapshot(self, symbols: List[str]) -> Dict[str, Any]:
+        """
+        获取多个代币的价格快照
+        
+        优先使用一次全量行情请求；交易所不支持时用有界线程池并发逐个获取。
+        所有代币共享同一个快照时间戳。
+        
+        Args:
+            symbols: 代币符号列表
+            
+        Returns:
+            快照字典，格式为{'timestamp': 秒级时间戳, 'latency': 获取耗时, 'prices': {symbol: price}}
+        """
+        start = time.time()
+        
         if self.client is None:
             print("❌ API客户端未初始化")
-            return {symbol: 0.0 for symbol in symbols}
+            prices = {symbol: 0.0 for symbol in symbols}
+        else:
+            prices = self._fetch_bulk_prices(symbols)
+            if prices is None:
+                prices = self._fetch_prices_concurrently(symbols)
+            
+            if self.verbose:
+                for symbol in symbols:
+                    if prices[symbol] > 0:
+                        print(f"✅ {symbol}: ${prices[symbol]:.4f}")
         
-        prices = {}
+        end = time.time()
+        self.instrumentation.observe_key(SNAPSHOT_KEY, end - start)
+        return {'timestamp': end, 'latency': end - start, 'prices': prices}
+    
+    def _fetch_bulk_prices(self, symbols: List[str]):
+        """
+        通过全量行情接口一次获取所有价格
         
-        for symbol in symbols:
+        Returns:
+            价格字典；客户端不支持或请求失败时返回None
+        """
+        for method_name in BULK_PRICE_METHODS:
+            fetch_all = getattr(self.client, method_name, None)
+            if fetch_all is None:
+                continue
+            
+            start = time.perf_counter()
             try:
-                price = self.client.get_current_price(symbol)
-                prices[symbol] = price
-                print(f"✅ {symbol}: ${price:.4f}")
+                with self.guard:
+                    tickers = self._normalize_tickers(fetch_all())
+            except ResilienceError as e:
+                print(f"⚡ 全量行情快速失败: {e}")
+                self.instrumentation.inc('price_fetch_errors_total', symbol='*', kind='circuit_open')
+                return {symbol: 0.0 for symbol in symbols}
             except Exception as e:
-                print(f"❌ 获取{symbol}价格失败: {e}")
-                prices[symbol] = 0.0
+                print(f"⚠️ 全量行情获取失败，改为逐个获取: {e}")
+                self.instrumentation.inc('price_fetch_errors_total', symbol='*', kind='error')
+                return None
+            self.instrumentation.observe_key(BULK_FETCH_KEY, time.perf_counter() - start)
+            
+            prices = {}
+            for symbol in symbols:
+                if symbol in tickers:
+                    prices[symbol] = tickers[symbol]
+                else:
+                    print(f"❌ 全量行情中缺少{symbol}")
+                    prices[symbol] = 0.0
+            return prices
         
+        return None
+    
+    def _normalize_tickers(self, tickers) -> Dict[str, float]:
+        """将全量行情统一转换为{symbol: price}"""
+        if isinstance(tickers, dict):
+            return {symbol: float(price) for symbol, price in tickers.items()}
+        
+        prices = {}
+        for ticker in tickers:
+            price = ticker.get('lastPr', ticker.get('last', ticker.get('close')))
+            if price is not None:
+                prices[ticker['symbol']] = float(price)
         return prices
     
+    def _fetch_prices_concurrently(self, symbols: List[str]) -> Dict[str, float]:
+        """用有界线程池并发逐个获取价格"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="price")
+        
+        results = self.executor.map(self.get_single_price, symbols)
+        return dict(zip(symbols, results))
+    
     def get_single_price(self, symbol: str) -> float:
         """
         获取单个代币的价格
@@ -76,12 +192,86 @@ class ExchangeAPI:
         if self.client is None:
             return 0.0
         
+        key = self.fetch_keys.get(symbol)
+        if key is None:
+            key = self.fetch_keys[symbol] = metric_key('price_fetch_seconds', symbol=symbol)
+        
+        start = time.perf_counter()
         try:
-            return self.client.get_current_price(symbol)
+            with self.guard:
+                price = self.client.get_current_price(symbol)
+            self.instrumentation.observe_key(key, time.perf_counter() - start)
+            return price
+        except ResilienceError as e:
+            print(f"⚡ 获取{symbol}价格快速失败: {e}")
+            self.instrumentation.inc('price_fetch_errors_total', symbol=symbol, kind='circuit_open')
+            return 0.0
         except Exception as e:
             print(f"❌ 获取{symbol}价格失败: {e}")
+            self.instrumentation.inc('price_fetch_errors_total', symbol=symbol, kind='error')
             return 0.0
     
+    def get_klines(self, symbol: str, start_ms: int, end_ms: int, interval: str = '1m', limit: int = 1000):
+        """
+        获取历史K线
+        
+        Args:
+            symbol: 代币符号
+            start_ms: 起始时间（毫秒，含）
+            end_ms: 结束时间（毫秒，不含）
+            interval: K线周期
+            limit: 单次请求最多返回的K线根数
+            
+        Returns:
+            形状(n, 6)的数组，列为ts（秒）、开、高、低、收、量，按时间升序；
+            客户端不支持K线接口或请求失败时返回None
+        """
+        if self.client is None:
+            return None
+        
+        fetch = None
+        for method_name in KLINE_METHODS:
+            fetch = getattr(self.client, method_name, None)
+            if fetch is not None:
+                break
+        if fetch is None:
+            print("❌ 行情客户端不支持K线接口")
+            return None
+        
+        start = time.perf_counter()
+        try:
+            with self.guard:
+                rows = self._normalize_klines(fetch(symbol, interval, start_ms, end_ms, limit))
+        except ResilienceError as e:
+            print(f"⚡ 获取{symbol}K线快速失败: {e}")
+            self.instrumentation.inc('kline_fetch_errors_total', symbol=symbol, kind='circuit_open')
+            return None
+        except Exception as e:
+            print(f"❌ 获取{symbol}K线失败: {e}")
+            self.instrumentation.inc('kline_fetch_errors_total', symbol=symbol, kind='error')
+            return None
+        self.instrumentation.observe('kline_fetch_seconds', time.perf_counter() - start, symbol=symbol)
+        
+        rows = rows[(rows[:, 0] >= start_ms / 1000.0) & (rows[:, 0] < end_ms / 1000.0)]
+        return rows[np.argsort(rows[:, 0], kind='stable')]
+    
+    def _normalize_klines(self, klines):
+        """
+        将K线统一转换为(n, 6)数组
+        
+        支持Bitget v2格式的列表行 [ts毫秒, 开, 高, 低, 收, 成交量, ...] 与字典行 {ts, open, high, low, close, volume}。
+        """
+        rows = []
+        for kline in klines or []:
+            if isinstance(kline, dict):
+                ts = kline.get('ts', kline.get('timestamp'))
+                values = [kline['open'], kline['high'], kline['low'], kline['close'],
+                          kline.get('volume', kline.get('baseVolume', 0.0))]
+            else:
+                ts, values = kline[0], kline[1:6]
+            rows.append([float(ts) / 1000.0] + [float(value) for value in values])
+        return np.array(rows, dtype=np.float64).reshape(-1, 6)
+    
     def is_available(self) -> bool:
         """检查API是否可用"""
         return self.client is not None
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求适配器
+请求在最近延迟的指定分位数内未返回时，向同一或备用模型/端点再发一份，
+先返回有效响应的一方胜出，另一方立即取消（不计入熔断失败），用少量额外花费压低尾延迟
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable
+from .llm_base import LLMAdapter, FALLBACK_RESPONSE, run_sync
+from .resilience import bind_abandon_event
+
+
+def is_valid_response(text: str) -> bool:
+    """默认有效性判断：不是失败回退响应且包含JSON对象"""
+    return bool(text) and text != FALLBACK_RESPONSE and '{' in text
+
+
+class HedgedLLMAdapter(LLMAdapter):
+    """对冲请求包装器（可包装任意LLMAdapter）"""
+    
+    def __init__(self, adapter: LLMAdapter, backup: LLMAdapter = None, percentile: float = 0.95,
+                 initial_delay: float = 3.0, min_delay: float = 0.2, window: int = 200, min_samples: int = 20,
+                 validator: Callable[[str], bool] = None):
+        """
+        初始化对冲适配器
+        
+        Args:
+            adapter: 主适配器
+            backup: 对冲请求使用的备用适配器，为None时向主适配器再发一份
+            percentile: 触发对冲的延迟分位数（0-1），如0.95表示慢于最近95%请求时对冲
+            initial_delay: 样本不足min_samples时使用的固定对冲延迟（秒）
+            min_delay: 对冲延迟下限（秒），避免对快速请求过度对冲
+            window: 参与分位数计算的最近请求数
+            min_samples: 开始按分位数计算前需要的样本数
+            validator: 响应有效性判断函数，默认排除失败回退响应
+        """
+        super().__init__(adapter.api_key)
+        self.adapter = adapter
+        self.backup = backup or adapter
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.validator = validator or is_valid_response
+        
+        self.latencies = deque(maxlen=window)
+        self.stats = {'calls': 0, 'hedges': 0, 'hedge_wins': 0, 'failures': 0, 'saved_seconds': 0.0}
+    
+    @property
+    def supports_system_prompt(self) -> bool:
+        """主备适配器都支持时才透传system"""
+        return self.adapter.supports_system_prompt and self.backup.supports_system_prompt
+    
+    def hedge_delay(self) -> float:
+        """
+        当前的对冲延迟
+        
+        Returns:
+            最近成功请求延迟的percentile分位数（秒），样本不足时为initial_delay
+        """
+        if len(self.latencies) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(self.latencies)
+        index = min(int(self.percentile * (len(ordered) - 1)), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+    
+    def call(self, prompt: str, **options) -> str:
+        """
+        调用LLM API（必要时对冲）
+        
+        Args:
+            prompt: 输入提示词
+            **options: 透传给被包装适配器的参数（如system）
+            
+        Returns:
+            最先返回的有效响应；全部无效时返回最后一个响应
+        """
+        return run_sync(self.acall(prompt, **options))
+    
+    async def acall(self, prompt: str, **options) -> str:
+        """
+        异步调用LLM API（必要时对冲）
+        
+        主请求在对冲延迟内未返回、或提前返回了无效响应时发出对冲请求；
+        先到的有效响应胜出，落败请求以"主动放弃"方式取消。
+        
+        Args:
+            prompt: 输入提示词
+            **options: 透传给被包装适配器的参数
+            
+        Returns:
+            最先返回的有效响应；全部无效时返回最后一个响应
+        """
+        self.stats['calls'] += 1
+        start = time.monotonic()
+        primary = self._spawn(self.adapter, prompt, options, start)
+        attempts = [primary]
+        response = FALLBACK_RESPONSE
+        
+        try:
+            done, _ = await asyncio.wait({primary[0]}, timeout=self.hedge_delay())
+            if done:
+                response = self._result(primary)
+                if self.validator(response):
+                    return response
+            
+            self.stats['hedges'] += 1
+            attempts.append(self._spawn(self.backup, prompt, options, time.monotonic()))
+            pending = {attempt[0] for attempt in attempts if not attempt[0].done()}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in attempts:
+                    if attempt[0] not in done:
+                        continue
+                    response = self._result(attempt)
+                    if self.validator(response):
+                        if attempt is not primary:
+                            self.stats['hedge_wins'] += 1
+                            self.stats['saved_seconds'] += self._estimate_saved(time.monotonic() - start)
+                        return response
+            
+            self.stats['failures'] += 1
+            return response
+        finally:
+            for task, _, abandon in attempts:
+                if not task.done():
+                    abandon.set()
+                    task.cancel()
+    
+    def _spawn(self, adapter: LLMAdapter, prompt: str, options: Dict[str, Any], start: float):
+        """
+        启动一个请求任务
+        
+        Returns:
+            (任务, 开始时间, 放弃标记)
+        """
+        abandon = threading.Event()
+        
+        async def attempt():
+            # 任务运行在独立的上下文副本中，放弃标记只作用于本请求
+            bind_abandon_event(abandon)
+            return await adapter.acall(prompt, **options)
+        
+        return asyncio.ensure_future(attempt()), start, abandon
+    
+    def _result(self, attempt) -> str:
+        """取出已完成请求的响应，并把有效响应的延迟计入样本"""
+        task, start, _ = attempt
+        if task.cancelled() or task.exception() is not None:
+            return FALLBACK_RESPONSE
+        response = task.result()
+        if self.validator(response):
+            self.latencies.append(time.monotonic() - start)
+        return response
+    
+    def _estimate_saved(self, elapsed: float) -> float:
+        """
+        估算对冲胜出节省的时间
+        
+        被取消的主请求的真实耗时未知，用最近样本中超过elapsed的延迟均值作为其条件期望。
+        """
+        slower = [latency for latency in self.latencies if latency > elapsed]
+        if not slower:
+            return 0.0
+        return sum(slower) / len(slower) - elapsed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取对冲统计
+        
+        Returns:
+            统计字典{calls, hedges, hedge_rate, hedge_wins, failures, saved_seconds, hedge_delay}
+        """
+        calls = self.stats['calls']
+        return dict(self.stats, hedge_rate=self.stats['hedges'] / calls if calls else 0.0,
+                    hedge_delay=self.hedge_delay())
+    
+    async def aclose(self):
+        """关闭主备适配器的连接"""
+        await self.adapter.aclose()
+        if self.backup is not self.adapter:
+            await self.backup.aclose()
+    
+    def cache_identity(self) -> Dict[str, Any]:
+        """响应缓存键：响应可能来自主或备用适配器"""
+        backup = self.backup.cache_identity() if self.backup is not self.adapter else None
+        return {'adapter': type(self).__name__, 'primary': self.adapter.cache_identity(), 'backup': backup}
+    
+    def get_model_name(self) -> str:
+        """获取模型名称"""
+        return self.adapter.get_model_name()
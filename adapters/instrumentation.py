@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热路径埋点
+计时器/计数器（装饰器与上下文管理器），每个线程写自己的分片、无锁聚合为直方图，
+导出为Prometheus文本（本地HTTP端点）或JSON文件
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from time import perf_counter
+from typing import Dict, List, Any, Tuple
+
+# 延迟直方图的桶上界（秒），覆盖微秒级解析到分钟级LLM请求
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 导出的指标名前缀
+METRIC_PREFIX = "alpha_arena_"
+
+
+# 指标键 -> (指标名, 标签元组)；键本身是字符串，哈希值被缓存，热路径上查表不必重复哈希嵌套元组
+_KEY_LABELS = {}
+
+
+def metric_key(name: str, **labels) -> str:
+    """
+    构造指标键（热路径上预先构造一次，之后直接复用）
+    
+    Args:
+        name: 指标名
+        **labels: 标签
+        
+    Returns:
+        形如 name{key="value"} 的序列标识
+    """
+    label_items = tuple(sorted((key, str(value)) for key, value in labels.items()))
+    key = name + _format_labels(label_items)
+    if key not in _KEY_LABELS:
+        _KEY_LABELS[key] = (name, label_items)
+    return key
+
+
+class Instrumentation:
+    """指标注册表（每线程一个分片，读取时合并）"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, enabled: bool = True):
+        """
+        初始化注册表
+        
+        Args:
+            buckets: 直方图桶上界（升序）
+            enabled: 是否记录，关闭后所有记录调用直接返回
+        """
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self.local = threading.local()
+        self.shards = []
+        self.shards_lock = threading.Lock()
+    
+    def _shard(self):
+        """当前线程的分片（首次使用时登记，之后无锁写入）"""
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = ({}, {})
+            self.local.shard = shard
+            self.local.histograms, self.local.counters = shard
+            with self.shards_lock:
+                self.shards.append(shard)
+        return shard
+    
+    def observe_key(self, key, value: float):
+        """
+        记录一个样本到直方图
+        
+        分片内每个序列是一个列表：[各桶计数..., +Inf桶计数, 总和, 样本数]
+        
+        Args:
+            key: metric_key的返回值
+            value: 样本值（秒）
+        """
+        if not self.enabled:
+            return
+        try:
+            histograms = self.local.histograms
+        except AttributeError:
+            histograms = self._shard()[0]
+        series = histograms.get(key)
+        if series is None:
+            series = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+    
+    def inc_key(self, key, value: float = 1):
+        """
+        计数器累加
+        
+        Args:
+            key: metric_key的返回值
+            value: 增量
+        """
+        if not self.enabled:
+            return
+        try:
+            counters = self.local.counters
+        except AttributeError:
+            counters = self._shard()[1]
+        counters[key] = counters.get(key, 0) + value
+    
+    def observe(self, name: str, value: float, **labels):
+        """按名称和标签记录样本（每次构造键，热路径请用observe_key）"""
+        self.observe_key(metric_key(name, **labels), value)
+    
+    def inc(self, name: str, value: float = 1, **labels):
+        """按名称和标签累加计数器（每次构造键，热路径请用inc_key）"""
+        self.inc_key(metric_key(name, **labels), value)
+    
+    def timer(self, name: str, **labels) -> 'Timer':
+        """
+        计时上下文管理器/装饰器
+        
+        Args:
+            name: 指标名
+            **labels: 标签
+            
+        Returns:
+            Timer实例，可用作 `with ...:` 或 `@...`
+        """
+        return Timer(self, metric_key(name, **labels))
+    
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """
+        合并所有线程分片
+        
+        写入方不加锁，读到的可能是略旧的值，但不会丢失已完成的写入。
+        
+        Returns:
+            {'histograms': {键: [桶计数..., 总和, 样本数]}, 'counters': {键: 值}}
+        """
+        with self.shards_lock:
+            shards = list(self.shards)
+        
+        histograms = {}
+        counters = {}
+        for shard_histograms, shard_counters in shards:
+            for key, series in list(shard_histograms.items()):
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = list(series)
+                else:
+                    for i, value in enumerate(series):
+                        merged[i] += value
+            for key, value in list(shard_counters.items()):
+                counters[key] = counters.get(key, 0) + value
+        return {'histograms': histograms, 'counters': counters}
+    
+    def reset(self):
+        """清空所有分片"""
+        with self.shards_lock:
+            for histograms, counters in self.shards:
+                histograms.clear()
+                counters.clear()
+    
+    def to_prometheus(self) -> str:
+        """
+        导出Prometheus文本格式
+        
+        Returns:
+            text/plain; version=0.0.4 格式的指标文本
+        """
+        data = self.collect()
+        lines = []
+        typed = set()
+        
+        for key, series in sorted(data['histograms'].items()):
+            name, labels = _KEY_LABELS[key]
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {series[-2]!r}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {series[-1]}")
+        
+        for key, value in sorted(data['counters'].items()):
+            name, labels = _KEY_LABELS[key]
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        导出为便于JSON序列化的摘要（直方图附带均值与近似分位数）
+        
+        Returns:
+            {'histograms': [{name, labels, count, sum, mean, p50, p90, p99, buckets}], 'counters': [{name, labels, value}]}
+        """
+        data = self.collect()
+        histograms = []
+        for key, series in sorted(data['histograms'].items()):
+            name, labels = _KEY_LABELS[key]
+            count = series[-1]
+            histograms.append({
+                'name': name,
+                'labels': dict(labels),
+                'count': count,
+                'sum': series[-2],
+                'mean': series[-2] / count if count else 0.0,
+                'p50': self._quantile(series, 0.5),
+                'p90': self._quantile(series, 0.9),
+                'p99': self._quantile(series, 0.99),
+                'buckets': dict(zip([repr(b) for b in self.buckets] + ['+Inf'], series[:-2]))
+            })
+        counters = [{'name': _KEY_LABELS[key][0], 'labels': dict(_KEY_LABELS[key][1]), 'value': value}
+                    for key, value in sorted(data['counters'].items())]
+        return {'timestamp': time.time(), 'histograms': histograms, 'counters': counters}
+    
+    def _quantile(self, series: List[float], q: float) -> float:
+        """按桶上界估算分位数（落在+Inf桶时取最大桶上界）"""
+        count = series[-1]
+        if not count:
+            return 0.0
+        target = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, series):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound
+        return self.buckets[-1]
+    
+    def write_json(self, path: str):
+        """
+        把当前指标写入JSON文件（先写临时文件再替换，读取方不会读到半个文件）
+        
+        Args:
+            path: 输出路径
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    
+    def start_http_server(self, port: int = 9108, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """
+        在后台线程启动 /metrics 端点（Prometheus文本）和 /metrics.json 端点
+        
+        Args:
+            port: 端口
+            host: 监听地址，默认只监听本机
+            
+        Returns:
+            HTTP服务实例（调用shutdown()停止）
+        """
+        handler = type('MetricsHandler', (_MetricsHandler,), {'instrumentation': self})
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 指标端点已启动: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+class Timer:
+    """计时器（上下文管理器与装饰器两用，键在创建时构造好）"""
+    
+    __slots__ = ('instrumentation', 'key', 'start')
+    
+    def __init__(self, instrumentation: Instrumentation, key):
+        self.instrumentation = instrumentation
+        self.key = key
+        self.start = 0.0
+    
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.instrumentation.observe_key(self.key, perf_counter() - self.start)
+        return False
+    
+    def __call__(self, func):
+        instrumentation = self.instrumentation
+        key = self.key
+        
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instrumentation.observe_key(key, perf_counter() - start)
+        
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """指标端点（instrumentation属性由start_http_server注入）"""
+    
+    instrumentation = None
+    
+    def do_GET(self):
+        if self.path.startswith('/metrics.json'):
+            body = json.dumps(self.instrumentation.to_dict(), ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json'
+        elif self.path.startswith('/metrics'):
+            body = self.instrumentation.to_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('content-type', content_type)
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        """关闭默认的访问日志"""
+        pass
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """格式化Prometheus标签"""
+    if not labels:
+        return ""
+    escaped = (key + '="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+# 进程内共享的默认注册表
+_default_instrumentation = Instrumentation(enabled=os.getenv('METRICS_ENABLED', '1') != '0')
+
+
+def get_instrumentation() -> Instrumentation:
+    """获取进程内共享的指标注册表"""
+    return _default_instrumentation
+
+
+def timer(name: str, **labels) -> Timer:
+    """在默认注册表上创建计时器（`with timer(...)` 或 `@timer(...)`）"""
+    return _default_instrumentation.timer(name, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    """在默认注册表上记录样本"""
+    _default_instrumentation.observe(name, value, **labels)
+
+
+def inc(name: str, value: float = 1, **labels):
+    """在默认注册表上累加计数器"""
+    _default_instrumentation.inc(name, value, **labels)
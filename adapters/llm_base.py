@@ -5,13 +5,87 @@ LLM适配器基类
 定义统一的LLM接口规范
 """
 
+import asyncio
+import functools
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from concurrent.futures import Future
+from typing import Dict, Any, AsyncIterator, Iterator
+
+
+# HTTP长连接池配置：保活时间覆盖5分钟决策周期，避免每个周期重新TLS握手
+HTTP_POOL_LIMITS = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 330.0,
+}
+
+# API调用失败时返回的默认观望响应
+FALLBACK_RESPONSE = '{"symbol": null, "action": "HOLD", "confidence": 0.0, "rationale": "API调用失败"}'
+
+# 调用方未提供system提示词时使用的默认角色设定
+DEFAULT_SYSTEM_PROMPT = "你是一个专业的量化交易分析师，请根据市场数据给出交易决策。"
+
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+
+def get_shared_loop() -> asyncio.AbstractEventLoop:
+    """
+    获取共享的后台事件循环
+    
+    所有适配器的异步客户端都绑定在这一个循环上，连接池因此可以跨周期复用。
+    
+    Returns:
+        在后台守护线程中运行的事件循环
+    """
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            _shared_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_shared_loop.run_forever, name="llm-loop", daemon=True)
+            thread.start()
+    return _shared_loop
+
+
+def submit_coroutine(coro) -> Future:
+    """
+    将协程提交到共享事件循环
+    
+    Args:
+        coro: 协程对象
+        
+    Returns:
+        concurrent.futures.Future，可跨线程等待或取消
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_shared_loop())
+
+
+def run_sync(coro, timeout: float = None):
+    """
+    在共享事件循环上执行协程并阻塞等待结果
+    
+    注意：不能在共享事件循环线程内部调用，否则会死锁。
+    
+    Args:
+        coro: 协程对象
+        timeout: 等待超时（秒）
+        
+    Returns:
+        协程返回值
+    """
+    return submit_coroutine(coro).result(timeout)
 
 
 class LLMAdapter(ABC):
     """LLM适配器基类"""
     
+    # 是否原生支持token流式输出（决策引擎据此选择流式+提前终止）
+    supports_streaming = False
+    
+    # call/acall/astream是否接受system参数（决策引擎据此把静态前缀作为system单独发送）
+    supports_system_prompt = False
+    
     def __init__(self, api_key: str):
         """
         初始化LLM适配器
@@ -34,6 +108,88 @@ class LLMAdapter(ABC):
         """
         pass
     
+    async def acall(self, prompt: str, **options) -> str:
+        """
+        异步调用LLM API
+        
+        默认实现把同步call放到线程池执行；原生异步的适配器应覆盖此方法，
+        并让call通过run_sync复用它。
+        
+        Args:
+            prompt: 输入提示词
+            **options: 透传给call的参数（supports_system_prompt为True时可能含system）
+            
+        Returns:
+            LLM响应文本
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.call, prompt, **options))
+    
+    async def astream(self, prompt: str, **options) -> AsyncIterator[str]:
+        """
+        流式调用LLM API
+        
+        调用方提前关闭生成器（aclose）时，实现应立即取消底层请求。
+        默认实现一次性返回acall的完整结果。
+        
+        Args:
+            prompt: 输入提示词
+            **options: 透传给acall的参数
+            
+        Yields:
+            响应文本片段
+        """
+        yield await self.acall(prompt, **options)
+    
+    def stream(self, prompt: str, **options) -> Iterator[str]:
+        """
+        同步流式调用，在共享事件循环上驱动astream
+        
+        提前break时会关闭底层异步生成器，从而取消请求。
+        
+        Args:
+            prompt: 输入提示词
+            **options: 透传给astream的参数（如system）
+            
+        Yields:
+            响应文本片段
+        """
+        chunks = self.astream(prompt, **options)
+        try:
+            while True:
+                try:
+                    chunk = run_sync(chunks.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            run_sync(chunks.aclose())
+    
+    async def aclose(self):
+        """释放异步客户端持有的连接池"""
+        pass
+    
+    def close(self):
+        """同步释放连接池"""
+        run_sync(self.aclose())
+    
+    def cache_identity(self) -> Dict[str, Any]:
+        """
+        决定响应内容的适配器配置（响应缓存键的一部分）
+        
+        默认包含适配器类、名称、模型、采样温度和最大输出token数；有其他影响输出的参数时应覆盖。
+        
+        Returns:
+            可JSON序列化的配置字典
+        """
+        return {
+            'adapter': type(self).__name__,
+            'name': self.get_model_name(),
+            'model': getattr(self, 'model', None),
+            'temperature': getattr(self, 'temperature', None),
+            'max_tokens': getattr(self, 'max_tokens', None)
+        }
+    
     @abstractmethod
     def get_model_name(self) -> str:
         """
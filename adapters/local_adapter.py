@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模型适配器
+在本机CPU上运行的模型：llama.cpp（GGUF，llama-cpp-python）或OpenAI兼容的本地推理服务（/v1/completions）。
+所有策略的并发调用由后台线程收集为微批次一起推理；共享的静态前缀放在prompt最前面，
+推理端在周期之间保留其KV状态，每次只需计算动态后缀
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List
+from .llm_base import LLMAdapter, FALLBACK_RESPONSE, DEFAULT_SYSTEM_PROMPT
+
+try:
+    from llama_cpp import Llama, LlamaRAMCache
+except ImportError:
+    Llama = None
+    LlamaRAMCache = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class LlamaCppBackend:
+    """llama.cpp推理后端（进程内加载GGUF模型）"""
+    
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: int = None,
+                 cache_bytes: int = 2 << 30):
+        """
+        加载模型
+        
+        Args:
+            model_path: GGUF模型文件路径
+            n_ctx: 上下文长度
+            n_threads: 推理线程数，默认为CPU核数
+            cache_bytes: 前缀KV状态缓存容量（字节）
+        """
+        if Llama is None:
+            raise ImportError("llama-cpp-python库未安装")
+        
+        self.llama = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads or os.cpu_count(),
+                           verbose=False)
+        # 按token前缀保存KV状态：不同前缀交替出现时也能直接恢复，不必重新计算
+        self.llama.set_cache(LlamaRAMCache(capacity_bytes=cache_bytes))
+        print(f"✅ 本地模型已加载: {os.path.basename(model_path)}")
+    
+    def generate(self, prompts: List[str], max_tokens: int, temperature: float) -> List[str]:
+        """
+        依次补全一个微批次
+        
+        同前缀的prompt相邻处理：上下文中已评估的最长公共前缀直接复用，只计算各自的后缀。
+        
+        Args:
+            prompts: prompt列表
+            max_tokens: 最大输出token数
+            temperature: 采样温度
+            
+        Returns:
+            补全文本列表，顺序与prompts一致
+        """
+        order = sorted(range(len(prompts)), key=prompts.__getitem__)
+        results = [None] * len(prompts)
+        for i in order:
+            output = self.llama(prompts[i], max_tokens=max_tokens, temperature=temperature)
+            results[i] = output['choices'][0]['text']
+        return results
+    
+    def warm(self, prefix: str):
+        """预先评估前缀，让其KV状态留在上下文/缓存中"""
+        self.llama(prefix, max_tokens=1, temperature=0.0)
+    
+    def close(self):
+        """释放模型"""
+        self.llama = None
+
+
+class CompletionServerBackend:
+    """OpenAI兼容的本地推理服务（llama.cpp server、vLLM等）"""
+    
+    def __init__(self, base_url: str, model: str = "local", timeout: float = 120.0):
+        """
+        初始化服务连接
+        
+        Args:
+            base_url: 服务地址，如 http://127.0.0.1:8080/v1
+            model: 请求中的模型名
+            timeout: 单次请求超时（秒）
+        """
+        if httpx is None:
+            raise ImportError("httpx库未安装")
+        
+        self.url = base_url.rstrip('/') + '/completions'
+        self.model = model
+        self.client = httpx.Client(timeout=timeout)
+    
+    def generate(self, prompts: List[str], max_tokens: int, temperature: float) -> List[str]:
+        """
+        一次请求补全整个微批次（prompt为列表，由服务端连续批处理）
+        
+        cache_prompt让llama.cpp server保留已计算前缀的KV状态；其他服务忽略该字段。
+        
+        Args:
+            prompts: prompt列表
+            max_tokens: 最大输出token数
+            temperature: 采样温度
+            
+        Returns:
+            补全文本列表，顺序与prompts一致
+        """
+        response = self.client.post(self.url, json={
+            'model': self.model,
+            'prompt': prompts,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'cache_prompt': True
+        })
+        response.raise_for_status()
+        results = [None] * len(prompts)
+        for choice in response.json()['choices']:
+            results[choice.get('index', 0)] = choice['text']
+        return results
+    
+    def warm(self, prefix: str):
+        """发送只含前缀的请求，刷新服务端的前缀缓存"""
+        self.generate([prefix], max_tokens=1, temperature=0.0)
+    
+    def close(self):
+        """关闭连接"""
+        self.client.close()
+
+
+class LocalLLMAdapter(LLMAdapter):
+    """本地模型适配器（微批次 + 前缀保温）"""
+    
+    supports_system_prompt = True
+    
+    def __init__(self, model_path: str = None, base_url: str = None, model: str = "local",
+                 temperature: float = 0.7, max_tokens: int = 300, max_batch_size: int = 16,
+                 batch_window: float = 0.005, keep_warm_interval: float = 60.0, timeout: float = 120.0,
+                 display_name: str = None, backend: Any = None):
+        """
+        初始化本地模型适配器
+        
+        优先级：backend参数 > model_path（llama.cpp）> base_url（本地推理服务）；
+        都未提供时读取LOCAL_MODEL_PATH、LOCAL_LLM_BASE_URL环境变量。
+        
+        Args:
+            model_path: GGUF模型文件路径
+            base_url: OpenAI兼容的本地服务地址（含/v1）
+            model: 请求本地服务时使用的模型名
+            temperature: 采样温度
+            max_tokens: 最大输出token数
+            max_batch_size: 单个微批次的最大请求数
+            batch_window: 收到第一个请求后继续收集的时间窗口（秒）
+            keep_warm_interval: 空闲超过该秒数时重新评估最近的共享前缀，0表示不保温
+            timeout: 单次调用等待结果的超时（秒）
+            display_name: 显示名称，默认为Local-<模型文件名或model>
+            backend: 自定义推理后端（需提供generate/warm/close），用于测试或接入其他运行时
+        """
+        super().__init__(api_key="local")
+        model_path = model_path or os.getenv('LOCAL_MODEL_PATH')
+        base_url = base_url or os.getenv('LOCAL_LLM_BASE_URL')
+        
+        if backend is not None:
+            self.backend = backend
+        elif model_path:
+            self.backend = LlamaCppBackend(model_path)
+        elif base_url:
+            self.backend = CompletionServerBackend(base_url, model, timeout)
+        else:
+            raise ValueError("本地模型未配置，请设置LOCAL_MODEL_PATH或LOCAL_LLM_BASE_URL环境变量")
+        
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.keep_warm_interval = keep_warm_interval
+        self.timeout = timeout
+        if display_name is None:
+            name = os.path.splitext(os.path.basename(model_path))[0] if model_path else model
+            display_name = "Local" if name == "local" else f"Local-{name}"
+        self.display_name = display_name
+        
+        self.requests = queue.Queue()
+        self.warm_prefix = None
+        self.stats = {'calls': 0, 'batches': 0, 'max_batch': 0, 'warmups': 0, 'errors': 0}
+        self.closed = False
+        self.worker = threading.Thread(target=self._batch_loop, name="local-llm-batcher", daemon=True)
+        self.worker.start()
+    
+    def call(self, prompt: str, system: str = None) -> str:
+        """
+        调用本地模型（与其他线程的并发调用合并为微批次）
+        
+        Args:
+            prompt: 输入提示词
+            system: 静态前缀（放在prompt最前面，供推理端复用KV状态）
+            
+        Returns:
+            模型输出文本；失败或超时时返回失败回退响应
+        """
+        try:
+            future = self.submit(prompt, system)
+        except Exception as e:
+            print(f"❌ 本地模型调用失败: {e}")
+            return FALLBACK_RESPONSE
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # 撤销尚未推理的请求，避免结果无人接收却仍占用后续微批次
+            future.cancel()
+            print(f"❌ 本地模型调用超时（>{self.timeout:g}s）")
+            return FALLBACK_RESPONSE
+        except Exception as e:
+            print(f"❌ 本地模型调用失败: {e}")
+            return FALLBACK_RESPONSE
+    
+    async def acall(self, prompt: str, system: str = None) -> str:
+        """
+        异步调用本地模型
+        
+        Args:
+            prompt: 输入提示词
+            system: 静态前缀
+            
+        Returns:
+            模型输出文本
+        """
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(prompt, system)), self.timeout)
+        except asyncio.TimeoutError:
+            print(f"❌ 本地模型调用超时（>{self.timeout:g}s）")
+            return FALLBACK_RESPONSE
+        except Exception as e:
+            print(f"❌ 本地模型调用失败: {e}")
+            return FALLBACK_RESPONSE
+    
+    def submit(self, prompt: str, system: str = None) -> Future:
+        """
+        把请求放入批处理队列
+        
+        Args:
+            prompt: 输入提示词
+            system: 静态前缀
+            
+        Returns:
+            结果Future
+        """
+        if self.closed:
+            raise RuntimeError("本地模型适配器已关闭")
+        future = Future()
+        self.requests.put(((system or DEFAULT_SYSTEM_PROMPT) + "\n\n", prompt, future))
+        return future
+    
+    def _batch_loop(self):
+        """后台批处理线程：收集微批次、推理、分发结果；空闲时为共享前缀保温"""
+        idle_timeout = self.keep_warm_interval if self.keep_warm_interval > 0 else None
+        while True:
+            try:
+                first = self.requests.get(timeout=idle_timeout)
+            except queue.Empty:
+                self._keep_warm()
+                continue
+            if first is None:
+                return
+            
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.requests.put(None)
+                    break
+                batch.append(item)
+            
+            self._run_batch(batch)
+    
+    def _run_batch(self, batch: List[tuple]):
+        """推理一个微批次并设置各请求的结果"""
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        self.stats['calls'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+        try:
+            texts = self.backend.generate([prefix + prompt for prefix, prompt, _ in batch],
+                                          self.max_tokens, self.temperature)
+        except Exception as e:
+            self.stats['errors'] += 1
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        
+        self.warm_prefix = batch[-1][0]
+        for (_, _, future), text in zip(batch, texts):
+            future.set_result((text or "").strip())
+    
+    def _keep_warm(self):
+        """空闲时重新评估最近的共享前缀，避免其KV状态被推理端淘汰"""
+        if self.warm_prefix is None:
+            return
+        try:
+            self.backend.warm(self.warm_prefix)
+            self.stats['warmups'] += 1
+        except Exception as e:
+            print(f"⚠️ 本地模型前缀保温失败: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取批处理统计
+        
+        Returns:
+            统计字典{calls, batches, avg_batch, max_batch, warmups, errors}
+        """
+        batches = self.stats['batches']
+        return dict(self.stats, avg_batch=self.stats['calls'] / batches if batches else 0.0)
+    
+    def close(self):
+        """停止批处理线程并释放推理后端"""
+        if self.closed:
+            return
+        self.closed = True
+        self.requests.put(None)
+        self.worker.join(timeout=self.timeout)
+        self.backend.close()
+    
+    async def aclose(self):
+        """关闭适配器（在线程池中等待批处理线程退出）"""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+    
+    def get_model_name(self) -> str:
+        """获取模型名称"""
+        return self.display_name
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟交易所客户端
+与BitgetVerifiedAPIClient接口一致的进程内替身，可配置延迟、抖动和错误率，用于离线运行和压测
+"""
+
+import hashlib
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Any
+
+# 默认初始价格
+DEFAULT_BASE_PRICES = {
+    'BTCUSDT': 65000.0,
+    'ETHUSDT': 3200.0,
+    'XRPUSDT': 0.52,
+    'BNBUSDT': 580.0,
+    'SOLUSDT': 150.0,
+}
+
+
+class MockExchangeError(Exception):
+    """模拟的交易所请求失败"""
+    pass
+
+
+class MockExchangeClient:
+    """模拟行情客户端（随机游走价格）"""
+    
+    def __init__(self, base_prices: Dict[str, float] = None, latency: float = 0.02, jitter: float = 0.01,
+                 error_rate: float = 0.0, volatility: float = 0.0005, bulk: bool = True, seed: int = None):
+        """
+        初始化模拟客户端
+        
+        Args:
+            base_prices: 初始价格{symbol: price}，未列出的代币按100起步
+            latency: 每次请求的基础延迟（秒）
+            jitter: 延迟抖动上限（秒），实际延迟在[latency, latency+jitter]内均匀分布
+            error_rate: 请求失败概率（0-1）
+            volatility: 每次请求的价格波动率
+            bulk: 是否提供全量行情接口get_all_tickers（关闭时ExchangeAPI走逐个并发获取）
+            seed: 随机种子
+        """
+        self.prices = dict(base_prices or DEFAULT_BASE_PRICES)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.volatility = volatility
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        
+        if not bulk:
+            self.get_all_tickers = None
+    
+    def get_current_price(self, symbol: str) -> float:
+        """
+        获取单个代币的最新价
+        
+        Args:
+            symbol: 代币符号
+            
+        Returns:
+            价格
+        """
+        self._simulate_request()
+        with self.lock:
+            return self._step(symbol)
+    
+    def get_all_tickers(self) -> List[Dict[str, Any]]:
+        """
+        全量行情（格式同Bitget v2 spot tickers）
+        
+        Returns:
+            ticker列表[{symbol, lastPr}]
+        """
+        self._simulate_request()
+        with self.lock:
+            return [{'symbol': symbol, 'lastPr': str(self._step(symbol))} for symbol in list(self.prices)]
+    
+    def get_klines(self, symbol: str, interval: str = '1m', start_ms: int = 0, end_ms: int = None,
+                   limit: int = 1000) -> List[List[str]]:
+        """
+        历史1分钟K线（格式同Bitget v2 candles）
+        
+        价格是时间的确定性函数（日内与小时级周期叠加按分钟哈希的噪声），
+        同一时间段无论请求多少次、如何分页都返回相同的K线。
+        
+        Args:
+            symbol: 代币符号
+            interval: K线周期（只支持1m）
+            start_ms: 起始时间（毫秒，含）
+            end_ms: 结束时间（毫秒，不含），默认为当前分钟
+            limit: 最多返回的K线根数
+            
+        Returns:
+            K线列表[[ts毫秒, 开, 高, 低, 收, 成交量]]，数值为字符串
+        """
+        self._simulate_request()
+        if end_ms is None:
+            end_ms = int(time.time() // 60) * 60000
+        first = -(-int(start_ms) // 60000)
+        last = min(-(-int(end_ms) // 60000), first + limit)
+        
+        base = DEFAULT_BASE_PRICES.get(symbol, self.prices.get(symbol, 100.0))
+        klines = []
+        for minute in range(first, last):
+            open_, close = self._kline_close(symbol, base, minute - 1), self._kline_close(symbol, base, minute)
+            wick = self._kline_noise(symbol, minute, 'wick')
+            high = max(open_, close) * (1 + abs(wick) * 0.0005)
+            low = min(open_, close) * (1 - abs(wick) * 0.0005)
+            volume = 50.0 + 50.0 * abs(self._kline_noise(symbol, minute, 'volume'))
+            klines.append([str(minute * 60000)] + [repr(value) for value in (open_, high, low, close, volume)])
+        return klines
+    
+    def _kline_close(self, symbol: str, base: float, minute: int) -> float:
+        """指定分钟的确定性收盘价"""
+        drift = 0.02 * math.sin(2 * math.pi * minute / 1440) + 0.005 * math.sin(2 * math.pi * minute / 97)
+        return base * math.exp(drift + 0.001 * self._kline_noise(symbol, minute, 'close'))
+    
+    @staticmethod
+    def _kline_noise(symbol: str, minute: int, field: str) -> float:
+        """按(代币, 分钟, 字段)哈希得到的[-1, 1)噪声"""
+        digest = hashlib.blake2b(f"{symbol}:{minute}:{field}".encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') / 2 ** 63 - 1.0
+    
+    def _simulate_request(self):
+        """模拟网络延迟与失败"""
+        with self.lock:
+            self.request_count += 1
+            delay = self.latency + self.random.uniform(0.0, self.jitter)
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            raise MockExchangeError("模拟交易所请求失败")
+    
+    def _step(self, symbol: str) -> float:
+        """价格随机游走一步"""
+        price = self.prices.get(symbol, 100.0)
+        price *= 1 + self.random.gauss(0.0, self.volatility)
+        self.prices[symbol] = price
+        return price
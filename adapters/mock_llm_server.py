@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟LLM服务
+进程内HTTP服务，兼容OpenAI /v1/chat/completions、/v1/completions（批量prompt，本地推理服务替身）
+和 Anthropic /v1/messages（含SSE流式），
+可配置延迟、抖动、错误率和token间隔，真实适配器只需把base_url指向它
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List
+from .stub_adapter import StubLLMAdapter
+
+
+class MockLLMServer:
+    """模拟LLM HTTP服务"""
+    
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, error_rate: float = 0.0,
+                 token_interval: float = 0.01, chunk_size: int = 8, trailing_text: str = "",
+                 responses: List[str] = None, seed: int = None):
+        """
+        初始化模拟服务
+        
+        Args:
+            latency: 首token前的基础延迟（秒）
+            jitter: 延迟抖动上限（秒）
+            error_rate: 返回HTTP 500的概率（0-1）
+            token_interval: 流式输出时相邻片段的间隔（秒）
+            chunk_size: 流式输出每个片段的字符数
+            trailing_text: 附加在决策JSON之后的文字（模拟模型的多余输出，验证提前终止）
+            responses: 预设响应列表，为None时按prompt哈希生成确定性决策
+            seed: 随机种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.token_interval = token_interval
+        self.chunk_size = chunk_size
+        self.trailing_text = trailing_text
+        self.stub = StubLLMAdapter(responses=responses, seed=seed or 0)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.stats = {'requests': 0, 'errors': 0, 'aborted_streams': 0, 'aborted_requests': 0,
+                      'completion_batches': 0, 'completion_prompts': 0}
+    
+    def start(self) -> 'MockLLMServer':
+        """在后台线程启动服务（随机端口）"""
+        handler = type('MockLLMHandler', (_MockLLMHandler,), {'mock': self})
+        self.server = _MockHTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-llm", daemon=True)
+        self.thread.start()
+        print(f"✅ 模拟LLM服务已启动: {self.base_url}")
+        return self
+    
+    def stop(self):
+        """停止服务"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+    
+    @property
+    def base_url(self) -> str:
+        """服务根地址（Anthropic SDK的base_url）"""
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+    
+    @property
+    def openai_base_url(self) -> str:
+        """OpenAI SDK的base_url"""
+        return self.base_url + "/v1"
+    
+    def next_outcome(self):
+        """
+        抽取本次请求的延迟和是否失败
+        
+        Returns:
+            (延迟秒数, 是否失败)
+        """
+        with self.lock:
+            self.stats['requests'] += 1
+            delay = self.latency + self.random.uniform(0.0, self.jitter)
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.stats['errors'] += 1
+        return delay, failed
+    
+    def render(self, prompt: str) -> str:
+        """生成响应文本"""
+        with self.lock:
+            return self.stub.call(prompt) + self.trailing_text
+    
+    def chunks(self, text: str) -> List[str]:
+        """按chunk_size切分流式片段"""
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    """多线程HTTP服务（加大监听队列：流式提前终止会断开连接，每个周期所有模型同时重连）"""
+    
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    """请求处理（mock属性由MockLLMServer.start注入）"""
+    
+    protocol_version = 'HTTP/1.1'
+    mock = None
+    
+    def do_POST(self):
+        length = int(self.headers.get('content-length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        anthropic_api = self.path.rstrip('/').endswith('/messages')
+        
+        delay, failed = self.mock.next_outcome()
+        time.sleep(delay)
+        if failed:
+            self._send_json(500, {'error': {'type': 'api_error', 'message': 'mock server error'}})
+            return
+        
+        if self.path.rstrip('/').endswith('/completions') and 'messages' not in body:
+            self._send_completions(body)
+            return
+        
+        prompt = body['messages'][-1]['content']
+        if isinstance(prompt, list):
+            prompt = ''.join(block.get('text', '') for block in prompt)
+        text = self.mock.render(prompt)
+        model = body.get('model', 'mock')
+        
+        if body.get('stream'):
+            events = self._anthropic_events(text, model) if anthropic_api else self._openai_events(text, model)
+            self._send_stream(events)
+        elif anthropic_api:
+            self._send_json(200, {
+                'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': model,
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn', 'stop_sequence': None,
+                'usage': {'input_tokens': len(prompt), 'output_tokens': len(text)}
+            })
+        else:
+            self._send_json(200, {
+                'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': len(prompt), 'completion_tokens': len(text),
+                          'total_tokens': len(prompt) + len(text)}
+            })
+    
+    def _send_completions(self, body: Dict[str, Any]):
+        """OpenAI /v1/completions：prompt可以是列表，一次请求返回每个prompt的补全（按index对应）"""
+        prompts = body.get('prompt', '')
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        with self.mock.lock:
+            self.mock.stats['completion_batches'] += 1
+            self.mock.stats['completion_prompts'] += len(prompts)
+        
+        choices = [{'index': i, 'text': self.mock.render(prompt), 'finish_reason': 'stop'}
+                   for i, prompt in enumerate(prompts)]
+        prompt_tokens = sum(len(prompt) for prompt in prompts)
+        completion_tokens = sum(len(choice['text']) for choice in choices)
+        self._send_json(200, {
+            'id': 'cmpl-mock', 'object': 'text_completion', 'created': int(time.time()),
+            'model': body.get('model', 'mock'), 'choices': choices,
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens}
+        })
+    
+    def _openai_events(self, text: str, model: str):
+        """OpenAI chat.completion.chunk事件序列"""
+        for piece in self.mock.chunks(text):
+            yield None, {'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': 0, 'model': model,
+                         'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}
+        yield None, {'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': 0, 'model': model,
+                     'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+        yield None, '[DONE]'
+    
+    def _anthropic_events(self, text: str, model: str):
+        """Anthropic messages流式事件序列"""
+        yield 'message_start', {'type': 'message_start', 'message': {
+            'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': model, 'content': [],
+            'stop_reason': None, 'stop_sequence': None, 'usage': {'input_tokens': 1, 'output_tokens': 0}}}
+        yield 'content_block_start', {'type': 'content_block_start', 'index': 0,
+                                      'content_block': {'type': 'text', 'text': ''}}
+        for piece in self.mock.chunks(text):
+            yield 'content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                          'delta': {'type': 'text_delta', 'text': piece}}
+        yield 'content_block_stop', {'type': 'content_block_stop', 'index': 0}
+        yield 'message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                'usage': {'output_tokens': len(text)}}
+        yield 'message_stop', {'type': 'message_stop'}
+    
+    def _send_stream(self, events):
+        """以chunked编码逐条发送SSE事件；客户端提前断开时停止生成"""
+        self.send_response(200)
+        self.send_header('content-type', 'text/event-stream')
+        self.send_header('transfer-encoding', 'chunked')
+        self.end_headers()
+        try:
+            for event, data in events:
+                payload = data if isinstance(data, str) else json.dumps(data)
+                message = (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+                encoded = message.encode('utf-8')
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(encoded), encoded))
+                self.wfile.flush()
+                if self.mock.token_interval > 0:
+                    time.sleep(self.mock.token_interval)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with self.mock.lock:
+                self.mock.stats['aborted_streams'] += 1
+            self.close_connection = True
+    
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        """发送JSON响应；客户端已断开（超时或对冲落败被取消）时只计数"""
+        encoded = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('content-type', 'application/json')
+            self.send_header('content-length', str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+        except (BrokenPipeError, ConnectionResetError):
+            with self.mock.lock:
+                self.mock.stats['aborted_requests'] += 1
+            self.close_connection = True
+    
+    def log_message(self, format, *args):
+        """关闭默认的访问日志"""
+        pass
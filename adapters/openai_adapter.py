@@ -6,8 +6,9 @@ OpenAI适配器
 """
 
 import os
-from typing import Dict, Any
-from .llm_base import LLMAdapter
+from typing import Dict, Any, AsyncIterator
+from .llm_base import LLMAdapter, HTTP_POOL_LIMITS, FALLBACK_RESPONSE, DEFAULT_SYSTEM_PROMPT, run_sync
+from .resilience import ResilienceGuard, ResilienceError, get_guard
 
 try:
     import openai
@@ -15,16 +16,39 @@ except ImportError:
     print("❌ 请安装openai: pip install openai")
     openai = None
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 
 class OpenAIAdapter(LLMAdapter):
     """OpenAI适配器"""
     
-    def __init__(self, api_key: str = None):
+    supports_streaming = True
+    supports_system_prompt = True
+    
+    # 日志中显示的服务商名称（OpenAI兼容接口的子类覆盖）
+    provider_label = "OpenAI"
+    # 使用默认模型时在决策对比中显示的名称
+    display_name = "GPT-4"
+    default_model = "gpt-4"
+    
+    def __init__(self, api_key: str = None, model: str = "gpt-4", temperature: float = 0.7,
+                 max_tokens: int = 500, timeout: float = 30.0,
+                 guard: ResilienceGuard = None, base_url: str = None, display_name: str = None):
         """
         初始化OpenAI适配器
         
         Args:
             api_key: OpenAI API密钥，如果为None则从环境变量获取
+            model: 模型名称
+            temperature: 采样温度
+            max_tokens: 最大输出token数
+            timeout: 单次请求超时（秒）
+            guard: 限流+熔断守卫，默认使用按服务商共享的守卫
+            base_url: API地址，为None时使用SDK默认（或OPENAI_BASE_URL环境变量）
+            display_name: 决策对比、账本和日志中的名称，默认模型为类上的display_name，其他模型为模型名
         """
         if api_key is None:
             api_key = os.getenv('OPENAI_API_KEY')
@@ -33,40 +57,119 @@ class OpenAIAdapter(LLMAdapter):
             raise ValueError("OpenAI API密钥未设置，请设置OPENAI_API_KEY环境变量")
         
         super().__init__(api_key)
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.display_name = display_name or (type(self).display_name if model == self.default_model else model)
+        self.guard = guard or get_guard('openai')
         
-        # 初始化OpenAI客户端
+        # 初始化长期复用的异步客户端（带keep-alive连接池）
         if openai:
-            openai.api_key = self.api_key
+            http_client = None
+            if httpx:
+                http_client = openai.DefaultAsyncHttpxClient(limits=httpx.Limits(**HTTP_POOL_LIMITS))
+            self.client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=base_url,
+                timeout=timeout,
+                http_client=http_client
+            )
         else:
             raise ImportError("OpenAI库未安装")
     
-    def call(self, prompt: str) -> str:
+    def call(self, prompt: str, system: str = None) -> str:
         """
         调用OpenAI API
         
         Args:
             prompt: 输入提示词
+            system: system提示词，为None时使用默认角色设定
+            
+        Returns:
+            OpenAI响应文本
+        """
+        return run_sync(self.acall(prompt, system))
+    
+    async def acall(self, prompt: str, system: str = None) -> str:
+        """
+        异步调用OpenAI API
+        
+        Args:
+            prompt: 输入提示词
+            system: system提示词，为None时使用默认角色设定（固定前缀可命中OpenAI前缀缓存）
             
         Returns:
             OpenAI响应文本
         """
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的量化交易分析师，请根据市场数据给出交易决策。"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
+            async with self.guard:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._messages(prompt, system),
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature
+                )
             
             return response.choices[0].message.content.strip()
             
+        except ResilienceError as e:
+            print(f"⚡ {self.provider_label}快速失败: {e}")
+            return FALLBACK_RESPONSE
+        except Exception as e:
+            print(f"❌ {self.provider_label} API调用失败: {e}")
+            return FALLBACK_RESPONSE
+    
+    async def astream(self, prompt: str, system: str = None) -> AsyncIterator[str]:
+        """
+        流式调用OpenAI API，生成器被关闭时立即断开连接（停止生成和计费）
+        
+        守卫覆盖整个读取过程：读取中途出错或被取消计为失败，调用方提前关闭生成器计为成功。
+        
+        Args:
+            prompt: 输入提示词
+            system: system提示词，为None时使用默认角色设定
+            
+        Yields:
+            响应文本片段
+        """
+        received = False
+        try:
+            async with self.guard:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._messages(prompt, system),
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    stream=True
+                )
+                try:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            received = True
+                            yield chunk.choices[0].delta.content
+                finally:
+                    await stream.close()
+        except ResilienceError as e:
+            print(f"⚡ {self.provider_label}快速失败: {e}")
+            yield FALLBACK_RESPONSE
         except Exception as e:
-            print(f"❌ OpenAI API调用失败: {e}")
-            return '{"symbol": null, "action": "HOLD", "confidence": 0.0, "rationale": "API调用失败"}'
+            if received:
+                print(f"❌ {self.provider_label}流式响应中断: {e}")
+            else:
+                print(f"❌ {self.provider_label} API调用失败: {e}")
+                yield FALLBACK_RESPONSE
+    
+    def _messages(self, prompt: str, system: str = None):
+        """组装消息列表（system在前，保证相同前缀的请求共享缓存）"""
+        return [
+            {"role": "system", "content": system or DEFAULT_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def aclose(self):
+        """关闭异步客户端及其连接池"""
+        await self.client.close()
     
     def get_model_name(self) -> str:
         """获取模型名称"""
-        return "GPT-4"
+        return self.display_name
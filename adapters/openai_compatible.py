@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenAI兼容接口适配器
+DeepSeek、通义千问（DashScope兼容模式）、Gemini（OpenAI兼容端点）复用OpenAI异步客户端
+"""
+
+import os
+from .openai_adapter import OpenAIAdapter
+from .resilience import ResilienceGuard, get_guard
+
+
+class OpenAICompatibleAdapter(OpenAIAdapter):
+    """OpenAI兼容接口适配器基类（子类只需声明服务商信息）"""
+    
+    # 服务商标识（用于共享守卫和<PROVIDER>_BASE_URL环境变量）
+    provider = None
+    # 日志中显示的服务商名称；display_name为使用默认模型时在决策对比中显示的名称
+    provider_label = None
+    display_name = None
+    default_model = None
+    default_base_url = None
+    api_key_env = None
+    
+    def __init__(self, api_key: str = None, model: str = None, temperature: float = 0.7,
+                 max_tokens: int = 500, timeout: float = 30.0, guard: ResilienceGuard = None,
+                 base_url: str = None, display_name: str = None):
+        """
+        初始化OpenAI兼容适配器
+        
+        Args:
+            api_key: API密钥，如果为None则从api_key_env环境变量获取
+            model: 模型名称，默认default_model
+            temperature: 采样温度
+            max_tokens: 最大输出token数
+            timeout: 单次请求超时（秒）
+            guard: 限流+熔断守卫，默认使用该服务商共享的守卫
+            base_url: API地址，默认读取<PROVIDER>_BASE_URL环境变量，否则为default_base_url
+            display_name: 决策对比、账本和日志中的名称，默认模型为类上的display_name，其他模型为模型名
+        """
+        if api_key is None:
+            api_key = os.getenv(self.api_key_env)
+        
+        if not api_key:
+            raise ValueError(f"{self.provider_label} API密钥未设置，请设置{self.api_key_env}环境变量")
+        
+        super().__init__(
+            api_key=api_key,
+            model=model or self.default_model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            guard=guard or get_guard(self.provider),
+            base_url=base_url or os.getenv(f"{self.provider.upper()}_BASE_URL", self.default_base_url),
+            display_name=display_name
+        )
+
+
+class DeepSeekAdapter(OpenAICompatibleAdapter):
+    """DeepSeek适配器"""
+    
+    provider = 'deepseek'
+    provider_label = "DeepSeek"
+    display_name = "DeepSeek-V3"
+    default_model = "deepseek-chat"
+    default_base_url = "https://api.deepseek.com/v1"
+    api_key_env = 'DEEPSEEK_API_KEY'
+
+
+class QwenAdapter(OpenAICompatibleAdapter):
+    """通义千问适配器（DashScope OpenAI兼容模式）"""
+    
+    provider = 'qwen'
+    provider_label = "Qwen"
+    display_name = "Qwen-Plus"
+    default_model = "qwen-plus"
+    default_base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+    api_key_env = 'DASHSCOPE_API_KEY'
+
+
+class GeminiAdapter(OpenAICompatibleAdapter):
+    """Gemini适配器（Google OpenAI兼容端点）"""
+    
+    provider = 'gemini'
+    provider_label = "Gemini"
+    display_name = "Gemini-1.5-Pro"
+    default_model = "gemini-1.5-pro"
+    default_base_url = "https://generativelanguage.googleapis.com/v1beta/openai/"
+    api_key_env = 'GEMINI_API_KEY'
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+适配器注册表
+按名称登记"模块:类"路径，只有启用的模型才会导入对应模块（及其SDK）并实例化
+"""
+
+import importlib
+import json
+import os
+from typing import Dict, List, Any, Union
+from .llm_base import LLMAdapter
+
+# 内置适配器（值为"模块:类"，首次使用时才导入）
+BUILTIN_ADAPTERS = {
+    'openai': 'adapters.openai_adapter:OpenAIAdapter',
+    'claude': 'adapters.claude_adapter:ClaudeAdapter',
+    'deepseek': 'adapters.openai_compatible:DeepSeekAdapter',
+    'qwen': 'adapters.openai_compatible:QwenAdapter',
+    'gemini': 'adapters.openai_compatible:GeminiAdapter',
+    'stub': 'adapters.stub_adapter:StubLLMAdapter',
+    'local': 'adapters.local_adapter:LocalLLMAdapter',
+}
+
+# 第三方包通过该entry point组注册适配器，如 mymodel = "my_pkg.adapter:MyAdapter"
+ENTRY_POINT_GROUP = 'alpha_arena.adapters'
+
+# 未提供配置文件和ENABLED_MODELS时默认启用的模型
+DEFAULT_MODELS = ('openai', 'claude')
+
+_default_registry = None
+
+
+class AdapterRegistry:
+    """LLM适配器注册表"""
+    
+    def __init__(self):
+        """初始化注册表（只登记路径，不导入任何适配器模块）"""
+        self.specs = dict(BUILTIN_ADAPTERS)
+        self.classes = {}
+    
+    def register(self, name: str, adapter: Union[str, type]):
+        """
+        登记适配器
+        
+        Args:
+            name: 注册名（配置文件和ENABLED_MODELS中使用）
+            adapter: "模块:类"路径（延迟导入）或适配器类
+        """
+        if isinstance(adapter, str):
+            self.specs[name] = adapter
+            self.classes.pop(name, None)
+        else:
+            self.classes[name] = adapter
+    
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> int:
+        """
+        登记已安装包通过entry point声明的适配器（只读取路径，不导入）
+        
+        Args:
+            group: entry point组名
+            
+        Returns:
+            登记的适配器数量
+        """
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return 0
+        
+        eps = entry_points()
+        eps = eps.select(group=group) if hasattr(eps, 'select') else eps.get(group, [])
+        count = 0
+        for ep in eps:
+            self.register(ep.name, ep.value)
+            count += 1
+        return count
+    
+    def load_config(self, path: str) -> List[Dict[str, Any]]:
+        """
+        读取模型配置文件
+        
+        格式：{"adapters": {注册名: "模块:类"},
+              "models": [{"name": 注册名, "enabled": true, "options": {...}, "hedge": {...}}]}
+        hedge为可选的对冲请求配置（HedgedLLMAdapter参数，backup可填另一个注册名）。
+        
+        Args:
+            path: JSON配置文件路径
+            
+        Returns:
+            启用的模型列表[{name, options}]，配置了对冲时附带hedge
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        
+        for name, spec in config.get('adapters', {}).items():
+            self.register(name, spec)
+        
+        models = []
+        for model in config.get('models', []):
+            if isinstance(model, str):
+                model = {'name': model}
+            if model.get('enabled', True):
+                entry = {'name': model['name'], 'options': model.get('options', {})}
+                if model.get('hedge') is not None:
+                    entry['hedge'] = model['hedge']
+                models.append(entry)
+        return models
+    
+    def resolve(self, name: str) -> type:
+        """
+        取得适配器类，首次使用时才导入其模块
+        
+        Args:
+            name: 注册名
+            
+        Returns:
+            适配器类
+        """
+        adapter_class = self.classes.get(name)
+        if adapter_class is not None:
+            return adapter_class
+        
+        spec = self.specs.get(name)
+        if spec is None:
+            raise KeyError(f"未注册的适配器: {name}")
+        
+        module_name, _, class_name = spec.partition(':')
+        adapter_class = getattr(importlib.import_module(module_name), class_name)
+        if not (isinstance(adapter_class, type) and issubclass(adapter_class, LLMAdapter)):
+            raise TypeError(f"{spec}不是LLMAdapter子类")
+        self.classes[name] = adapter_class
+        return adapter_class
+    
+    def create(self, name: str, **options) -> LLMAdapter:
+        """
+        实例化适配器
+        
+        Args:
+            name: 注册名
+            **options: 传给适配器构造函数的参数
+            
+        Returns:
+            适配器实例
+        """
+        return self.resolve(name)(**options)
+    
+    def names(self) -> List[str]:
+        """已登记的全部注册名"""
+        return sorted(set(self.specs) | set(self.classes))
+
+
+def get_registry() -> AdapterRegistry:
+    """
+    获取全局注册表（首次调用时登记内置适配器和entry point）
+    
+    Returns:
+        注册表实例
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = AdapterRegistry()
+        _default_registry.load_entry_points()
+    return _default_registry
+
+
+def register_adapter(name: str):
+    """
+    类装饰器：把适配器登记到全局注册表
+    
+    Args:
+        name: 注册名
+    """
+    def decorator(adapter_class):
+        get_registry().register(name, adapter_class)
+        return adapter_class
+    return decorator
+
+
+def create_model_adapter(model: Dict[str, Any], registry: AdapterRegistry = None) -> LLMAdapter:
+    """
+    按模型配置创建适配器，配置了hedge时包装为对冲适配器
+    
+    Args:
+        model: load_enabled_models返回的模型配置{name, options, hedge}
+        registry: 注册表，默认为全局注册表
+        
+    Returns:
+        适配器实例
+    """
+    registry = registry or get_registry()
+    adapter = registry.create(model['name'], **model['options'])
+    hedge = model.get('hedge')
+    if hedge is None:
+        return adapter
+    
+    from .hedged_adapter import HedgedLLMAdapter
+    hedge = dict(hedge)
+    backup = hedge.pop('backup', None)
+    if backup is not None:
+        backup = registry.create(backup, **hedge.pop('backup_options', {}))
+    return HedgedLLMAdapter(adapter, backup=backup, **hedge)
+
+
+def load_enabled_models(registry: AdapterRegistry = None, config_path: str = None) -> List[Dict[str, Any]]:
+    """
+    确定本次运行启用的模型
+    
+    优先级：ENABLED_MODELS环境变量（逗号分隔）> 配置文件（MODELS_CONFIG，默认models.json）> 默认openai+claude。
+    配置文件中的adapters段无论是否使用ENABLED_MODELS都会登记。
+    
+    Args:
+        registry: 注册表，默认为全局注册表
+        config_path: 配置文件路径
+        
+    Returns:
+        启用的模型列表[{name, options}]
+    """
+    registry = registry or get_registry()
+    config_path = config_path or os.getenv('MODELS_CONFIG', 'models.json')
+    
+    models = None
+    if os.path.exists(config_path):
+        models = registry.load_config(config_path)
+    
+    enabled = os.getenv('ENABLED_MODELS')
+    if enabled:
+        configured = {model['name']: model for model in models or []}
+        names = [name.strip() for name in enabled.split(',') if name.strip()]
+        return [configured.get(name, {'name': name, 'options': {}}) for name in names]
+    
+    if models is not None:
+        return models
+    return [{'name': name, 'options': {}} for name in DEFAULT_MODELS]
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+限流与熔断
+令牌桶限流器 + 熔断器，按服务商/交易所共享，包裹LLM和交易所调用
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Dict, Any
+
+# 熔断器状态
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+# 各服务商/交易所的默认配置
+# rate/burst: 每秒请求数与突发容量；max_wait: 排队等待令牌的上限（秒），超过则直接拒绝
+# failure_threshold: 连续失败多少次后熔断；recovery_timeout: 熔断多久后放行半开探测（秒）
+GUARD_CONFIGS = {
+    'openai': {'rate': 5.0, 'burst': 10, 'max_wait': 2.0, 'failure_threshold': 3, 'recovery_timeout': 30.0},
+    'anthropic': {'rate': 5.0, 'burst': 10, 'max_wait': 2.0, 'failure_threshold': 3, 'recovery_timeout': 30.0},
+    'bitget': {'rate': 20.0, 'burst': 20, 'max_wait': 1.0, 'failure_threshold': 5, 'recovery_timeout': 10.0},
+}
+DEFAULT_GUARD_CONFIG = {'rate': 10.0, 'burst': 10, 'max_wait': 2.0, 'failure_threshold': 5, 'recovery_timeout': 30.0}
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+# 当前上下文的"主动放弃"标记：标记被set后取消的请求不计入熔断失败（如对冲请求中落败的一方）
+_abandon_event = contextvars.ContextVar('resilience_abandon_event', default=None)
+
+
+class ResilienceError(Exception):
+    """限流/熔断拒绝调用"""
+    pass
+
+
+class CircuitOpenError(ResilienceError):
+    """熔断器打开，调用被快速拒绝"""
+    pass
+
+
+class RateLimitExceeded(ResilienceError):
+    """等待令牌超过上限，调用被拒绝"""
+    pass
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器"""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self, max_wait: float = None):
+        """
+        预定一个令牌
+        
+        令牌不足时允许透支，调用方按返回的等待时间休眠后再发请求，
+        这样同步线程和协程都能复用同一个桶。
+        
+        Args:
+            max_wait: 可接受的最长等待（秒），为None时不限
+            
+        Returns:
+            需要等待的秒数；超过max_wait时不预定并返回None
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            
+            wait = (1 - self.tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """熔断器（关闭 → 打开 → 半开探测 → 关闭）"""
+    
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        初始化熔断器
+        
+        Args:
+            name: 名称（用于日志）
+            failure_threshold: 连续失败多少次后打开
+            recovery_timeout: 打开后多久进入半开状态（秒）
+            half_open_max_calls: 半开状态同时放行的探测请求数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """
+        是否放行本次调用
+        
+        关闭状态不加锁直接放行；打开状态在恢复期内直接拒绝，期满后转为半开并放行有限的探测请求。
+        
+        Returns:
+            True表示放行
+        """
+        if self.state == CLOSED:
+            return True
+        
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self.half_open_calls = 0
+                print(f"🔄 {self.name}熔断器半开，放行探测请求")
+            
+            if self.state == HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    return False
+                self.half_open_calls += 1
+            return True
+    
+    def release(self):
+        """归还未实际发出的半开探测名额"""
+        with self.lock:
+            if self.state == HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+    
+    def retry_after(self) -> float:
+        """距离下一次半开探测的剩余秒数"""
+        if self.state != OPEN:
+            return 0.0
+        return max(self.recovery_timeout - (time.monotonic() - self.opened_at), 0.0)
+    
+    def record_success(self):
+        """记录一次成功调用"""
+        if self.state == CLOSED and self.failures == 0:
+            return
+        
+        with self.lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                print(f"✅ {self.name}熔断器恢复")
+    
+    def record_failure(self):
+        """记录一次失败调用，达到阈值（或半开探测失败）时打开熔断器"""
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                print(f"⚡ {self.name}连续失败{self.failures}次，熔断{self.recovery_timeout:g}秒")
+
+
+class ResilienceGuard:
+    """
+    限流+熔断组合守卫
+    
+    同步用法 `with guard: ...`，异步用法 `async with guard: ...`。
+    进入时先检查熔断再领取令牌，被拒绝时抛出ResilienceError；
+    退出时按是否抛异常记录成功/失败（被取消的请求也计为失败，超时的端点因此会被熔断；
+    通过bind_abandon_event主动放弃的请求除外）。
+    """
+    
+    def __init__(self, name: str, rate: float = 10.0, burst: int = 10, max_wait: float = 2.0,
+                 failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        """
+        初始化守卫
+        
+        Args:
+            name: 服务商/交易所名称
+            rate: 每秒请求数，为None时不限流
+            burst: 突发容量
+            max_wait: 排队等待令牌的上限（秒）
+            failure_threshold: 连续失败多少次后熔断
+            recovery_timeout: 熔断恢复时间（秒）
+            half_open_max_calls: 半开状态放行的探测请求数
+        """
+        self.name = name
+        self.max_wait = max_wait
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_timeout, half_open_max_calls)
+        self.rejected = 0
+        self.throttled = 0.0
+    
+    def acquire(self) -> float:
+        """
+        检查熔断并领取令牌
+        
+        Returns:
+            领取令牌需要等待的秒数
+            
+        Raises:
+            CircuitOpenError: 熔断器打开
+            RateLimitExceeded: 等待令牌超过max_wait
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name}熔断中，{self.breaker.retry_after():.1f}秒后重试")
+        
+        if self.bucket is None:
+            return 0.0
+        
+        wait = self.bucket.reserve(self.max_wait)
+        if wait is None:
+            self.breaker.release()
+            self.rejected += 1
+            raise RateLimitExceeded(f"{self.name}请求过于频繁，已限流")
+        self.throttled += wait
+        return wait
+    
+    def __enter__(self):
+        wait = self.acquire()
+        if wait > 0:
+            time.sleep(wait)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._record(exc_type)
+        return False
+    
+    async def __aenter__(self):
+        wait = self.acquire()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self._record(exc_type)
+        return False
+    
+    def _record(self, exc_type):
+        """按退出时的异常类型记录结果（调用方主动关闭生成器、主动放弃的请求不算失败）"""
+        if exc_type is None or exc_type is GeneratorExit:
+            self.breaker.record_success()
+        elif exc_type is asyncio.CancelledError and is_abandoned():
+            self.breaker.release()
+        else:
+            self.breaker.record_failure()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取守卫统计
+        
+        Returns:
+            统计字典{state, failures, rejected, throttled_seconds}
+        """
+        return {
+            'state': self.breaker.state,
+            'failures': self.breaker.failures,
+            'rejected': self.rejected,
+            'throttled_seconds': self.throttled
+        }
+
+
+def bind_abandon_event(event: threading.Event):
+    """
+    为当前上下文（通常是单个asyncio任务）登记放弃标记
+    
+    调用方先set该标记再取消任务时，守卫把这次取消视为主动放弃：
+    不记失败，只归还半开探测名额。
+    
+    Args:
+        event: 放弃标记
+    """
+    _abandon_event.set(event)
+
+
+def is_abandoned() -> bool:
+    """当前上下文的请求是否已被调用方主动放弃"""
+    event = _abandon_event.get()
+    return event is not None and event.is_set()
+
+
+def configure_guard(name: str, **config) -> ResilienceGuard:
+    """
+    按名称（重新）配置共享守卫
+    
+    Args:
+        name: 服务商/交易所名称
+        **config: ResilienceGuard参数，未给出的取GUARD_CONFIGS中的默认值
+        
+    Returns:
+        新的守卫实例
+    """
+    settings = dict(GUARD_CONFIGS.get(name, DEFAULT_GUARD_CONFIG))
+    settings.update(config)
+    guard = ResilienceGuard(name, **settings)
+    with _guards_lock:
+        _guards[name] = guard
+    return guard
+
+
+def get_guard(name: str) -> ResilienceGuard:
+    """
+    获取共享守卫，同一服务商/交易所的所有适配器共用一个令牌桶和熔断器
+    
+    Args:
+        name: 服务商/交易所名称
+        
+    Returns:
+        守卫实例
+    """
+    guard = _guards.get(name)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(name)
+            if guard is None:
+                guard = ResilienceGuard(name, **GUARD_CONFIGS.get(name, DEFAULT_GUARD_CONFIG))
+                _guards[name] = guard
+    return guard
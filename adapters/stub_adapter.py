@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+桩适配器
+不联网、结果可复现的LLM替身，用于回测和离线调试
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Any, List, Callable
+from .llm_base import LLMAdapter
+
+
+class StubLLMAdapter(LLMAdapter):
+    """确定性桩适配器"""
+    
+    PRICE_PATTERN = re.compile(r'-\s*([A-Z0-9]+USDT):\s*\$')
+    
+    # 批量提示词中每个上下文小节的标题（与core.prompts.BATCH_SECTION_TITLE一致）
+    BATCH_SECTION_PATTERN = re.compile(r'^### 上下文 (\S+)$', re.MULTILINE)
+    
+    def __init__(self, responses: List[str] = None, policy: Callable[[str], str] = None,
+                 model_name: str = "Stub", seed: int = 0, temperature: float = None):
+        """
+        初始化桩适配器
+        
+        三种模式按优先级：policy函数 > 循环回放responses > 按prompt哈希生成决策
+        （批量提示词按上下文小节分别哈希，返回decisions数组）。
+        
+        Args:
+            responses: 预设响应列表，按调用顺序循环返回
+            policy: 自定义策略函数，参数为prompt，返回响应文本
+            model_name: 模型名称
+            seed: 哈希模式的随机种子，不同种子得到不同但可复现的决策序列
+            temperature: 采样温度，仅参与哈希（参数扫描时不同温度得到不同但可复现的决策序列）
+        """
+        super().__init__(api_key="stub")
+        self.responses = list(responses or [])
+        self.policy = policy
+        self.model_name = model_name
+        self.seed = seed
+        self.temperature = temperature
+        self.call_count = 0
+    
+    def call(self, prompt: str) -> str:
+        """
+        返回确定性响应
+        
+        Args:
+            prompt: 输入提示词
+            
+        Returns:
+            响应文本
+        """
+        self.call_count += 1
+        
+        if self.policy is not None:
+            return self.policy(prompt)
+        
+        if self.responses:
+            return self.responses[(self.call_count - 1) % len(self.responses)]
+        
+        sections = self.BATCH_SECTION_PATTERN.split(prompt)
+        if len(sections) > 1:
+            # 批量模式：split结果为[前缀, id1, 小节1, id2, 小节2, ...]，每个小节独立哈希
+            decisions = [dict(self._hash_decision(section), id=context_id)
+                         for context_id, section in zip(sections[1::2], sections[2::2])]
+            return json.dumps({"decisions": decisions}, ensure_ascii=False)
+        
+        return json.dumps(self._hash_decision(prompt), ensure_ascii=False)
+    
+    async def acall(self, prompt: str) -> str:
+        """异步调用（无IO，直接返回）"""
+        return self.call(prompt)
+    
+    def _hash_decision(self, prompt: str) -> Dict[str, Any]:
+        """根据prompt内容哈希生成决策，同样的prompt总是得到同样的决策"""
+        salt = self.seed if self.temperature is None else f"{self.seed}:{self.temperature}"
+        digest = hashlib.sha256(f"{salt}:{prompt}".encode('utf-8')).digest()
+        symbols = self.PRICE_PATTERN.findall(prompt) or [None]
+        action = ('BUY', 'SELL', 'HOLD', 'HOLD')[digest[0] % 4]
+        
+        return {
+            "symbol": symbols[digest[1] % len(symbols)] if action != 'HOLD' else None,
+            "action": action,
+            "position_size_pct": 0.2,
+            "confidence": round(digest[2] / 255.0, 2),
+            "rationale": "桩适配器确定性决策"
+        }
+    
+    def cache_identity(self) -> Dict[str, Any]:
+        """响应缓存键：另含种子和回放模式"""
+        policy = getattr(self.policy, '__qualname__', repr(self.policy)) if self.policy is not None else None
+        return dict(super().cache_identity(), seed=self.seed, responses=self.responses, policy=policy)
+    
+    def get_model_name(self) -> str:
+        """获取模型名称"""
+        return self.model_name
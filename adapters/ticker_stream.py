@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情推送适配器
+通过WebSocket订阅实时ticker，推送给本地最新价缓存
+"""
+
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Callable
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+
+class TickerStream(ABC):
+    """行情推送基类"""
+    
+    def __init__(self):
+        """初始化行情推送"""
+        self.listeners = []
+        self.symbols = []
+        self.running = False
+    
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        注册tick回调
+        
+        Args:
+            callback: 回调函数，参数为tick字典{symbol, price, bid, ask, volume, ts}
+        """
+        self.listeners.append(callback)
+    
+    def emit(self, tick: Dict[str, Any]):
+        """
+        分发一条tick给所有监听者
+        
+        Args:
+            tick: tick字典
+        """
+        for callback in self.listeners:
+            try:
+                callback(tick)
+            except Exception as e:
+                print(f"❌ tick回调处理失败: {e}")
+    
+    @abstractmethod
+    def start(self, symbols: List[str]):
+        """
+        开始订阅
+        
+        Args:
+            symbols: 代币符号列表
+        """
+        pass
+    
+    @abstractmethod
+    def stop(self):
+        """停止订阅"""
+        pass
+
+
+class BitgetTickerStream(TickerStream):
+    """Bitget现货公共ticker推送"""
+    
+    def __init__(self, url: str = "wss://ws.bitget.com/v2/ws/public", ping_interval: float = 25.0,
+                 reconnect_delay: float = 3.0):
+        """
+        初始化Bitget行情推送
+        
+        Args:
+            url: 公共WebSocket地址
+            ping_interval: 心跳间隔（秒），Bitget要求30秒内发送ping
+            reconnect_delay: 断线重连等待（秒）
+        """
+        if websocket is None:
+            raise ImportError("websocket-client库未安装，请执行: pip install websocket-client")
+        
+        super().__init__()
+        self.url = url
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.ws = None
+        self.thread = None
+        self.last_base_volume = {}
+    
+    def start(self, symbols: List[str]):
+        """开始订阅（后台线程，断线自动重连）"""
+        self.symbols = list(symbols)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="ticker-stream", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """停止订阅"""
+        self.running = False
+        if self.ws is not None:
+            self.ws.close()
+    
+    def _run(self):
+        """连接循环"""
+        while self.running:
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=lambda ws, e: print(f"❌ 行情推送异常: {e}")
+            )
+            self.ws.run_forever()
+            if self.running:
+                print(f"⚠️ 行情推送断开，{self.reconnect_delay:.0f}秒后重连")
+                time.sleep(self.reconnect_delay)
+    
+    def _on_open(self, ws):
+        """连接建立后订阅ticker频道"""
+        args = [{"instType": "SPOT", "channel": "ticker", "instId": symbol} for symbol in self.symbols]
+        ws.send(json.dumps({"op": "subscribe", "args": args}))
+        threading.Thread(target=self._heartbeat, args=(ws,), name="ticker-ping", daemon=True).start()
+        print(f"✅ 已订阅{len(self.symbols)}个代币的实时行情")
+    
+    def _heartbeat(self, ws):
+        """定时发送文本ping保持连接"""
+        while self.running and ws is self.ws:
+            time.sleep(self.ping_interval)
+            try:
+                ws.send("ping")
+            except Exception:
+                return
+    
+    def _on_message(self, ws, message: str):
+        """解析ticker推送"""
+        if message == "pong":
+            return
+        
+        payload = json.loads(message)
+        if payload.get('arg', {}).get('channel') != 'ticker' or 'data' not in payload:
+            return
+        
+        for item in payload['data']:
+            symbol = item['instId']
+            
+            # ticker只给出24小时累计成交量，取相邻两次推送的增量作为本tick成交量
+            base_volume = float(item.get('baseVolume') or 0.0)
+            last_volume = self.last_base_volume.get(symbol)
+            self.last_base_volume[symbol] = base_volume
+            volume = max(base_volume - last_volume, 0.0) if last_volume is not None else 0.0
+            
+            self.emit({
+                'symbol': symbol,
+                'price': float(item['lastPr']),
+                'bid': float(item.get('bidPr') or 0.0),
+                'ask': float(item.get('askPr') or 0.0),
+                'volume': volume,
+                'ts': int(item.get('ts', 0)) / 1000.0
+            })
+
+
+class MockTickerStream(TickerStream):
+    """本地模拟行情推送（随机游走），用于测试和离线运行"""
+    
+    def __init__(self, base_prices: Dict[str, float], interval: float = 0.5, volatility: float = 0.0005,
+                 spread_bp: float = 2.0, seed: int = None):
+        """
+        初始化模拟行情推送
+        
+        Args:
+            base_prices: 初始价格，格式为{symbol: price}
+            interval: 推送间隔（秒），<=0表示不自动推送，只能手动push
+            volatility: 每次推送的价格波动率
+            spread_bp: 买卖价差（基点）
+            seed: 随机种子
+        """
+        super().__init__()
+        self.prices = dict(base_prices)
+        self.interval = interval
+        self.volatility = volatility
+        self.spread_bp = spread_bp
+        self.random = random.Random(seed)
+        self.thread = None
+    
+    def start(self, symbols: List[str]):
+        """开始推送"""
+        self.symbols = list(symbols)
+        self.running = True
+        if self.interval > 0:
+            self.thread = threading.Thread(target=self._run, name="mock-ticker", daemon=True)
+            self.thread.start()
+    
+    def stop(self):
+        """停止推送"""
+        self.running = False
+    
+    def push(self, symbol: str, price: float):
+        """
+        手动推送一条tick
+        
+        Args:
+            symbol: 代币符号
+            price: 最新价
+        """
+        self.prices[symbol] = price
+        half_spread = price * self.spread_bp / 20000.0
+        self.emit({
+            'symbol': symbol,
+            'price': price,
+            'bid': price - half_spread,
+            'ask': price + half_spread,
+            'ts': time.time()
+        })
+    
+    def _run(self):
+        """随机游走推送循环"""
+        while self.running:
+            for symbol in self.symbols:
+                if symbol in self.prices:
+                    price = self.prices[symbol] * (1 + self.random.gauss(0.0, self.volatility))
+                    self.push(symbol, price)
+            time.sleep(self.interval)
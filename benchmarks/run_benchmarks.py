@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端压测
+用模拟交易所和模拟LLM服务跑完整决策周期，统计周期延迟分位数、N模型×M代币吞吐和内存，并与基线对比
+
+用法：python -m benchmarks.run_benchmarks [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from adapters.exchange_api import ExchangeAPI
+from adapters.hedged_adapter import HedgedLLMAdapter
+from adapters.instrumentation import get_instrumentation
+from adapters.mock_exchange import MockExchangeClient, DEFAULT_BASE_PRICES
+from adapters.mock_llm_server import MockLLMServer
+from adapters.resilience import ResilienceGuard
+from core.decision import DecisionMaker
+from core.execution import PaperTradingEngine
+from core.market import MarketData
+from core.orchestrator import DecisionOrchestrator
+from core.scheduler import CycleScheduler, STAGES
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# 越小越好的指标；其余（吞吐）越大越好
+LOWER_IS_BETTER = ('p50_ms', 'p90_ms', 'p99_ms', 'mean_ms', 'peak_mem_kb')
+
+# 模拟模型在决策JSON之后继续输出的文字，用于体现流式提前终止的收益
+TRAILING_TEXT = "\n\n以上决策基于最近一小时的价格走势与波动率，仅供模拟交易使用。" * 4
+
+
+def build_symbols(n_symbols: int) -> List[str]:
+    """生成M个代币符号（前5个为真实代币，其余为合成代币）"""
+    symbols = list(DEFAULT_BASE_PRICES)[:n_symbols]
+    symbols += [f"SYM{i}USDT" for i in range(n_symbols - len(symbols))]
+    return symbols
+
+
+def build_adapter(provider: str, index: int, server: MockLLMServer, hedge_percentile: float = None):
+    """创建指向模拟服务的真实适配器（独立守卫，不限流，避免压测被令牌桶节流）；可选包装为对冲适配器"""
+    guard = ResilienceGuard(f"bench-{provider}-{index}", rate=None)
+    display_name = f"{provider}-{index}"
+    if provider == 'anthropic':
+        from adapters.claude_adapter import ClaudeAdapter
+        adapter = ClaudeAdapter(api_key="mock", base_url=server.base_url, guard=guard, display_name=display_name)
+    else:
+        from adapters.openai_adapter import OpenAIAdapter
+        adapter = OpenAIAdapter(api_key="mock", base_url=server.openai_base_url, guard=guard,
+                                display_name=display_name)
+    if hedge_percentile:
+        adapter = HedgedLLMAdapter(adapter, percentile=hedge_percentile, initial_delay=1.0, min_samples=5)
+    return adapter
+
+
+def run_scenario(n_models: int, n_symbols: int, args) -> Dict[str, float]:
+    """
+    运行一个N模型×M代币场景
+    
+    Returns:
+        指标字典{p50_ms, p90_ms, p99_ms, mean_ms, cycles_per_sec, decisions_per_sec, peak_mem_kb, 各阶段均值}
+    """
+    symbols = build_symbols(n_symbols)
+    providers = args.providers.split(',')
+    
+    server = MockLLMServer(latency=args.llm_latency, jitter=args.llm_jitter, error_rate=args.error_rate,
+                           token_interval=args.token_interval, trailing_text=TRAILING_TEXT, seed=args.seed).start()
+    client = MockExchangeClient({symbol: DEFAULT_BASE_PRICES.get(symbol, 100.0) for symbol in symbols},
+                                latency=args.exchange_latency, jitter=args.exchange_jitter,
+                                error_rate=args.error_rate, seed=args.seed)
+    exchange_api = ExchangeAPI(client=client, verbose=False, guard=ResilienceGuard("bench-exchange", rate=None))
+    market_data = MarketData(tick_ttl=0, exchange_api=exchange_api, symbols=symbols)
+    
+    decision_makers = []
+    for i in range(n_models):
+        provider = providers[i % len(providers)]
+        decision_makers.append(DecisionMaker(build_adapter(provider, i, server, args.hedge_percentile),
+                                             symbols=symbols))
+    
+    scheduler = CycleScheduler(market_data, DecisionOrchestrator(decision_makers, timeout=args.timeout),
+                               PaperTradingEngine(symbols, verbose=False))
+    
+    try:
+        for _ in range(args.warmup):
+            scheduler.run_cycle()
+        
+        # 只统计计时周期内的Python内存峰值（预热阶段的SDK导入和连接建立不计入）
+        tracemalloc.start()
+        latencies = []
+        stage_totals = dict.fromkeys(STAGES, 0.0)
+        start = time.perf_counter()
+        for _ in range(args.cycles):
+            result = scheduler.run_cycle()
+            latencies.append(result['timings']['total'])
+            for stage in STAGES:
+                stage_totals[stage] += result['timings'][stage]
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        for decision_maker in decision_makers:
+            decision_maker.llm_adapter.close()
+        server.stop()
+    
+    latencies_ms = np.array(latencies) * 1000
+    metrics = {
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p90_ms': float(np.percentile(latencies_ms, 90)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'mean_ms': float(latencies_ms.mean()),
+        'cycles_per_sec': args.cycles / elapsed,
+        'decisions_per_sec': args.cycles * n_models / elapsed,
+        'peak_mem_kb': peak / 1024,
+    }
+    for stage in STAGES:
+        metrics[f'{stage}_mean_ms'] = stage_totals[stage] / args.cycles * 1000
+    return metrics
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> int:
+    """
+    与基线对比并打印差异
+    
+    Args:
+        results: 本次结果{scenario: metrics}
+        baseline: 基线结果
+        tolerance: 允许的劣化比例（如0.2表示20%）
+        
+    Returns:
+        劣化超过容忍度的指标数
+    """
+    regressions = 0
+    print(f"\n📊 与基线对比（容忍 {tolerance:.0%}）:")
+    for scenario, metrics in results.items():
+        base = baseline.get(scenario)
+        if base is None:
+            print(f"   {scenario}: 基线中无此场景")
+            continue
+        for metric in list(LOWER_IS_BETTER) + ['decisions_per_sec']:
+            if metric not in base or base[metric] == 0:
+                continue
+            change = metrics[metric] / base[metric] - 1
+            worse = change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance
+            if worse:
+                regressions += 1
+            mark = "⚠️" if worse else "  "
+            print(f"   {mark} {scenario} {metric}: {base[metric]:.2f} → {metrics[metric]:.2f} ({change:+.1%})")
+    return regressions
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Alpha Arena 端到端压测")
+    parser.add_argument('--models', default='1,2,4,8', help="模型数列表（逗号分隔）")
+    parser.add_argument('--symbols', default='5,20', help="代币数列表（逗号分隔）")
+    parser.add_argument('--providers', default='openai', help="轮流使用的接口风格：openai,anthropic")
+    parser.add_argument('--cycles', type=int, default=20, help="每个场景计时的周期数")
+    parser.add_argument('--warmup', type=int, default=1, help="预热周期数（建立连接，不计时）")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="模拟LLM首token延迟（秒）")
+    parser.add_argument('--llm-jitter', type=float, default=0.1, help="模拟LLM延迟抖动（秒）")
+    parser.add_argument('--token-interval', type=float, default=0.005, help="模拟LLM流式片段间隔（秒）")
+    parser.add_argument('--exchange-latency', type=float, default=0.02, help="模拟交易所延迟（秒）")
+    parser.add_argument('--exchange-jitter', type=float, default=0.01, help="模拟交易所延迟抖动（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="模拟LLM与交易所的错误率")
+    parser.add_argument('--hedge-percentile', type=float, default=None,
+                        help="启用对冲请求：慢于最近请求该分位数（如0.9）时再发一份")
+    parser.add_argument('--timeout', type=float, default=8.0, help="单模型决策超时（秒）")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的劣化比例")
+    parser.add_argument('--metrics-file', default=None, help="把埋点直方图与计数器写入该JSON文件")
+    return parser.parse_args()
+
+
+def main():
+    """命令行入口"""
+    args = parse_args()
+    model_counts = [int(n) for n in args.models.split(',')]
+    symbol_counts = [int(n) for n in args.symbols.split(',')]
+    
+    print("🏁 Alpha Arena 端到端压测")
+    print("=" * 50)
+    
+    results = {}
+    for n_symbols in symbol_counts:
+        for n_models in model_counts:
+            scenario = f"{args.providers.replace(',', '+')}_n{n_models}_m{n_symbols}"
+            if args.hedge_percentile:
+                scenario += "_hedged"
+            print(f"\n▶️ {scenario}: {n_models}个模型 × {n_symbols}个代币，{args.cycles}个周期")
+            metrics = run_scenario(n_models, n_symbols, args)
+            results[scenario] = metrics
+            print(f"   周期延迟 p50 {metrics['p50_ms']:.1f}ms / p90 {metrics['p90_ms']:.1f}ms / "
+                  f"p99 {metrics['p99_ms']:.1f}ms，吞吐 {metrics['decisions_per_sec']:.2f} 决策/秒，"
+                  f"内存峰值 {metrics['peak_mem_kb']:.0f}KB")
+            print("   阶段均值: " + " | ".join(f"{stage} {metrics[f'{stage}_mean_ms']:.1f}ms" for stage in STAGES))
+    
+    if args.metrics_file:
+        get_instrumentation().write_json(args.metrics_file)
+        print(f"\n📈 埋点指标已写入: {args.metrics_file}")
+    
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n💾 进程最大常驻内存: {max_rss_mb:.1f}MB")
+    
+    regressions = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f)['scenarios'], args.tolerance)
+    
+    if args.save_baseline:
+        baseline = {
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': sys.version.split()[0],
+            'config': {key: value for key, value in vars(args).items()
+                       if key not in ('baseline', 'save_baseline', 'tolerance')},
+            'scenarios': results
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 基线已保存: {args.baseline}")
+    
+    if regressions:
+        print(f"\n❌ {regressions}项指标劣化超过{args.tolerance:.0%}")
+        sys.exit(1)
+    print("\n✅ 压测完成")
+
+
+if __name__ == "__main__":
+    main()
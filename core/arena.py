@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+竞技场
+汇总N个模型的同周期决策：按信心度加权的代币×动作投票矩阵、基于账本的实时排行榜，
+以及所有模型两两之间的一致率（每周期增量累加，开销与历史长度无关）
+"""
+
+from typing import Dict, List, Any
+from core.execution import LedgerBook
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+ACTIONS = ('BUY', 'SELL', 'HOLD')
+ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+
+# 投票矩阵最后一行：未指定代币（通常是HOLD）
+NO_SYMBOL = 'None'
+
+
+class Arena:
+    """多模型竞技场"""
+    
+    def __init__(self, ledger: LedgerBook, capacity: int = 8):
+        """
+        初始化竞技场
+        
+        Args:
+            ledger: 撮合引擎的多模型账本（排行榜数据来源）
+            capacity: 预分配的模型数，不足时自动翻倍
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.ledger = ledger
+        self.symbols = list(ledger.symbols) + [NO_SYMBOL]
+        self.symbol_index = {symbol: i for i, symbol in enumerate(ledger.symbols)}
+        self.model_names = []
+        self.model_index = {}
+        self.cycles = 0
+        
+        # 两两统计：agree[i, j]为同周期选择相同(代币, 动作)的次数，together[i, j]为同时出场次数
+        self.agree = np.zeros((capacity, capacity), dtype=np.int64)
+        self.together = np.zeros((capacity, capacity), dtype=np.int64)
+    
+    def _model_row(self, model_name: str) -> int:
+        """取得模型行号，首次出现时登记（必要时扩容两两矩阵）"""
+        row = self.model_index.get(model_name)
+        if row is not None:
+            return row
+        
+        row = len(self.model_names)
+        if row >= len(self.agree):
+            capacity = 2 * len(self.agree)
+            for name in ('agree', 'together'):
+                grown = np.zeros((capacity, capacity), dtype=np.int64)
+                grown[:row, :row] = getattr(self, name)[:row, :row]
+                setattr(self, name, grown)
+        
+        self.model_names.append(model_name)
+        self.model_index[model_name] = row
+        return row
+    
+    def _choice_codes(self, decisions: Dict[str, Dict[str, Any]]):
+        """
+        把决策编码为(行号数组, 代币行数组, 动作列数组, 信心度数组)
+        
+        未知代币与未指定代币都归入最后一行。
+        """
+        n = len(decisions)
+        rows = np.empty(n, dtype=np.int64)
+        symbol_rows = np.empty(n, dtype=np.int64)
+        action_cols = np.empty(n, dtype=np.int64)
+        confidences = np.empty(n)
+        no_symbol = len(self.symbols) - 1
+        
+        for k, (model_name, decision) in enumerate(decisions.items()):
+            rows[k] = self._model_row(model_name)
+            symbol_rows[k] = self.symbol_index.get(decision.get('symbol'), no_symbol)
+            action_cols[k] = ACTION_INDEX.get(decision.get('action', 'HOLD'), ACTION_INDEX['HOLD'])
+            confidences[k] = min(max(float(decision.get('confidence', 0.0) or 0.0), 0.0), 1.0)
+        return rows, symbol_rows, action_cols, confidences
+    
+    def vote_matrix(self, decisions: Dict[str, Dict[str, Any]]):
+        """
+        按信心度加权的投票矩阵
+        
+        Args:
+            decisions: 决策字典{model_name: decision}
+            
+        Returns:
+            形状(代币数+1, 3)的数组，行与self.symbols对齐，列与ACTIONS对齐
+        """
+        _, symbol_rows, action_cols, confidences = self._choice_codes(decisions)
+        votes = np.zeros((len(self.symbols), len(ACTIONS)))
+        np.add.at(votes, (symbol_rows, action_cols), confidences)
+        return votes
+    
+    def update(self, decisions: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        计入一个周期的决策
+        
+        投票矩阵只依赖本周期决策；两两一致次数用本周期的N×N比较结果累加，
+        每周期O(N²)，与已运行的周期数无关。
+        
+        Args:
+            decisions: 决策字典{model_name: decision}
+            
+        Returns:
+            本周期汇总{votes, consensus, agreement}
+        """
+        rows, symbol_rows, action_cols, confidences = self._choice_codes(decisions)
+        votes = np.zeros((len(self.symbols), len(ACTIONS)))
+        np.add.at(votes, (symbol_rows, action_cols), confidences)
+        
+        codes = symbol_rows * len(ACTIONS) + action_cols
+        same = codes[:, None] == codes[None, :]
+        index = np.ix_(rows, rows)
+        self.agree[index] += same
+        self.together[index] += 1
+        self.cycles += 1
+        
+        n = len(rows)
+        agreement = float((same.sum() - n) / (n * (n - 1))) if n > 1 else 1.0
+        return {
+            'votes': votes,
+            'consensus': self.consensus(votes),
+            'agreement': agreement
+        }
+    
+    def consensus(self, votes) -> Dict[str, Any]:
+        """
+        投票矩阵中权重最高的(代币, 动作)
+        
+        Args:
+            votes: vote_matrix/update返回的投票矩阵
+            
+        Returns:
+            共识字典{symbol, action, weight, share}，share为占总权重比例；无有效票时为HOLD
+        """
+        total = float(votes.sum())
+        if total <= 0:
+            return {'symbol': None, 'action': 'HOLD', 'weight': 0.0, 'share': 0.0}
+        
+        symbol_row, action_col = np.unravel_index(int(np.argmax(votes)), votes.shape)
+        symbol = self.symbols[symbol_row]
+        weight = float(votes[symbol_row, action_col])
+        return {
+            'symbol': None if symbol == NO_SYMBOL else symbol,
+            'action': ACTIONS[action_col],
+            'weight': weight,
+            'share': weight / total
+        }
+    
+    def agreement_matrix(self):
+        """
+        所有模型两两之间的历史一致率
+        
+        Returns:
+            (模型名称列表, N×N一致率数组)，从未同时出场的组合为nan
+        """
+        n = len(self.model_names)
+        together = self.together[:n, :n]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.where(together > 0, self.agree[:n, :n] / together, np.nan)
+        return list(self.model_names), rates
+    
+    def leaderboard(self, prices: Dict[str, float], metrics: Dict[str, Dict[str, float]] = None) -> List[Dict[str, Any]]:
+        """
+        按净值排序的实时排行榜
+        
+        Args:
+            prices: 价格字典
+            metrics: OnlineMetrics.snapshot()的结果，提供时附带回撤与Sharpe
+            
+        Returns:
+            排名列表[{rank, model, nav, return, realized_pnl, fees, ...}]
+        """
+        ledger = self.ledger
+        navs = ledger.mark_to_market(ledger.price_vector(prices))
+        order = np.argsort(-navs, kind='stable')
+        
+        board = []
+        for rank, row in enumerate(order.tolist(), start=1):
+            model_name = ledger.model_names[row]
+            entry = {
+                'rank': rank,
+                'model': model_name,
+                'nav': float(navs[row]),
+                'return': float(navs[row] / ledger.initial_cash - 1.0),
+                'realized_pnl': float(ledger.realized_pnl[row]),
+                'fees': float(ledger.fees_paid[row]),
+                'positions': int(np.count_nonzero(ledger.qty[row]))
+            }
+            if metrics and model_name in metrics:
+                entry['max_drawdown'] = metrics[model_name]['max_drawdown']
+                entry['sharpe'] = metrics[model_name]['sharpe']
+            board.append(entry)
+        return board
+    
+    def format_cycle(self, summary: Dict[str, Any], decisions: Dict[str, Dict[str, Any]]) -> str:
+        """
+        格式化本周期的投票结果
+        
+        Args:
+            summary: update的返回值
+            decisions: 决策字典
+            
+        Returns:
+            显示文本
+        """
+        lines = []
+        for model_name, decision in decisions.items():
+            lines.append(f"   {model_name}: {decision.get('action', 'HOLD')} {decision.get('symbol', 'None')}"
+                         f"（信心 {decision.get('confidence', 0.0):.2f}）")
+        
+        consensus = summary['consensus']
+        n = len(decisions)
+        if n >= 2 and summary['agreement'] == 1.0:
+            lines.append(f"   🎯 {n}个AI达成一致！")
+        elif n >= 2:
+            lines.append(f"   ⚡ {n}个AI意见分歧（两两一致率 {summary['agreement']:.0%}）")
+        if consensus['weight'] > 0:
+            lines.append(f"   🗳️ 加权共识: {consensus['action']} {consensus['symbol'] or 'None'}"
+                         f"（权重占比 {consensus['share']:.0%}）")
+        return "\n".join(lines)
+    
+    def format_leaderboard(self, board: List[Dict[str, Any]]) -> str:
+        """
+        格式化排行榜
+        
+        Args:
+            board: leaderboard的返回值
+            
+        Returns:
+            显示文本
+        """
+        lines = []
+        for entry in board:
+            line = (f"   #{entry['rank']} {entry['model']}: ${entry['nav']:.2f}（{entry['return']:+.2%}），"
+                    f"已实现 ${entry['realized_pnl']:+.2f}，手续费 ${entry['fees']:.2f}")
+            if 'sharpe' in entry:
+                line += f"，回撤 {entry['max_drawdown']:.2%}，Sharpe {entry['sharpe']:.2f}"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回测引擎
+把历史K线回放给DecisionMaker，用NumPy批量计算净值、回撤和费用
+"""
+
+import csv
+import json
+import os
+import time
+from typing import Dict, List, Any
+
+from core.bars import compute_features
+from core.decision import DecisionMaker, check_unique_model_names
+from core.execution import PaperTradingEngine
+from core.risk import RiskEngine, DEFAULT_RISK_LIMITS
+from core.metrics import SECONDS_PER_YEAR, drawdown_series, sharpe_ratio, calmar_ratio, round_trips, trade_stats
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+OHLCV_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+CLOSE = 3
+
+
+class BarData:
+    """多代币对齐的K线数据，ohlcv形状为(bars, symbols, 5)"""
+    
+    def __init__(self, timestamps, symbols: List[str], ohlcv):
+        """
+        初始化K线数据
+        
+        Args:
+            timestamps: 毫秒时间戳数组，形状(bars,)
+            symbols: 代币符号列表
+            ohlcv: K线数组，形状(bars, symbols, 5)，可以是内存映射数组
+        """
+        self.timestamps = timestamps
+        self.symbols = list(symbols)
+        self.ohlcv = ohlcv
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    @property
+    def close(self):
+        """收盘价数组，形状(bars, symbols)"""
+        return self.ohlcv[:, :, CLOSE]
+    
+    @classmethod
+    def load(cls, path: str) -> 'BarData':
+        """
+        加载K线数据
+        
+        支持缓存目录（内存映射）、CSV和Parquet。CSV/Parquet首次加载后会在旁边
+        生成.npy缓存目录，之后直接内存映射，不再解析文本。
+        
+        Args:
+            path: 缓存目录、.csv或.parquet文件路径
+            
+        Returns:
+            BarData实例
+        """
+        if os.path.isdir(path):
+            return cls._load_cache(path)
+        
+        cache_dir = os.path.splitext(path)[0] + '_bars'
+        if os.path.isdir(cache_dir) and os.path.getmtime(cache_dir) >= os.path.getmtime(path):
+            return cls._load_cache(cache_dir)
+        
+        if path.endswith('.parquet'):
+            rows = cls._read_parquet(path)
+        else:
+            rows = cls._read_csv(path)
+        
+        cls._from_rows(*rows).save(cache_dir)
+        return cls._load_cache(cache_dir)
+    
+    @classmethod
+    def synthetic(cls, symbols: List[str], n_bars: int, start_prices: Dict[str, float] = None,
+                  volatility: float = 0.0008, seed: int = 0) -> 'BarData':
+        """
+        生成几何随机游走的1分钟K线，用于离线回测和基准测试
+        
+        Args:
+            symbols: 代币符号列表
+            n_bars: K线数量
+            start_prices: 初始价格
+            volatility: 每根K线的收益率标准差
+            seed: 随机种子
+            
+        Returns:
+            BarData实例
+        """
+        rng = np.random.default_rng(seed)
+        start_prices = start_prices or {}
+        start = np.array([start_prices.get(symbol, 100.0) for symbol in symbols])
+        
+        returns = rng.normal(0.0, volatility, size=(n_bars, len(symbols)))
+        close = start * np.exp(np.cumsum(returns, axis=0))
+        open_ = np.vstack([start, close[:-1]])
+        spread = np.abs(rng.normal(0.0, volatility / 2, size=close.shape))
+        
+        ohlcv = np.empty((n_bars, len(symbols), 5))
+        ohlcv[:, :, 0] = open_
+        ohlcv[:, :, 1] = np.maximum(open_, close) * (1 + spread)
+        ohlcv[:, :, 2] = np.minimum(open_, close) * (1 - spread)
+        ohlcv[:, :, 3] = close
+        ohlcv[:, :, 4] = rng.gamma(2.0, 50.0, size=close.shape)
+        
+        timestamps = np.arange(n_bars, dtype=np.int64) * 60000 + 1704067200000
+        return cls(timestamps, symbols, ohlcv)
+    
+    def save(self, cache_dir: str):
+        """
+        保存为可内存映射的.npy缓存目录
+        
+        Args:
+            cache_dir: 缓存目录
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(os.path.join(cache_dir, 'timestamps.npy'), np.asarray(self.timestamps))
+        np.save(os.path.join(cache_dir, 'ohlcv.npy'), np.asarray(self.ohlcv))
+        with open(os.path.join(cache_dir, 'symbols.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.symbols, f)
+    
+    @classmethod
+    def _load_cache(cls, cache_dir: str) -> 'BarData':
+        """内存映射加载缓存目录"""
+        with open(os.path.join(cache_dir, 'symbols.json'), 'r', encoding='utf-8') as f:
+            symbols = json.load(f)
+        timestamps = np.load(os.path.join(cache_dir, 'timestamps.npy'), mmap_mode='r')
+        ohlcv = np.load(os.path.join(cache_dir, 'ohlcv.npy'), mmap_mode='r')
+        return cls(timestamps, symbols, ohlcv)
+    
+    @staticmethod
+    def _read_csv(path: str):
+        """读取长表CSV：timestamp,symbol,open,high,low,close,volume"""
+        timestamps, symbols, values = [], [], []
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                timestamps.append(int(row['timestamp']))
+                symbols.append(row['symbol'])
+                values.append([float(row[field]) for field in OHLCV_FIELDS])
+        return np.array(timestamps, dtype=np.int64), np.array(symbols), np.array(values)
+    
+    @staticmethod
+    def _read_parquet(path: str):
+        """读取长表Parquet（内存映射读取列数据）"""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("读取Parquet需要pyarrow: pip install pyarrow")
+        
+        table = pq.read_table(path, memory_map=True)
+        timestamps = table.column('timestamp').to_numpy().astype(np.int64)
+        symbols = np.array(table.column('symbol').to_pylist())
+        values = np.column_stack([table.column(field).to_numpy() for field in OHLCV_FIELDS])
+        return timestamps, symbols, values
+    
+    @classmethod
+    def _from_rows(cls, timestamps, symbols, values) -> 'BarData':
+        """把长表行转换为按时间和代币对齐的数组，缺失K线用前值填充"""
+        unique_ts, ts_index = np.unique(timestamps, return_inverse=True)
+        unique_symbols, symbol_index = np.unique(symbols, return_inverse=True)
+        
+        ohlcv = np.full((len(unique_ts), len(unique_symbols), 5), np.nan)
+        ohlcv[ts_index, symbol_index] = values
+        
+        # 缺失K线：价格沿用上一根收盘价，成交量为0
+        missing = np.isnan(ohlcv[:, :, CLOSE])
+        if missing.any():
+            close = ohlcv[:, :, CLOSE]
+            valid_index = np.where(~missing, np.arange(len(unique_ts))[:, None], 0)
+            np.maximum.accumulate(valid_index, axis=0, out=valid_index)
+            filled = close[valid_index, np.arange(close.shape[1])]
+            for field in range(4):
+                ohlcv[:, :, field] = np.where(missing, filled, ohlcv[:, :, field])
+            ohlcv[:, :, 4] = np.where(missing, 0.0, ohlcv[:, :, 4])
+        
+        return cls(unique_ts, unique_symbols.tolist(), ohlcv)
+
+
+class Backtester:
+    """历史回放回测器"""
+    
+    def __init__(self, decision_makers: List[DecisionMaker], bars: BarData, decision_interval: int = 5,
+                 initial_cash: float = 10000.0, fee_bp: float = 5.0, slippage_bp: float = 10.0,
+                 context_bars: int = 0, risk_limits: Dict[str, Any] = None):
+        """
+        初始化回测器
+        
+        Args:
+            decision_makers: 参与回测的决策引擎列表（通常使用StubLLMAdapter）
+            bars: K线数据
+            decision_interval: 决策间隔（K线根数），1分钟K线下默认5即每5分钟决策一次
+            initial_cash: 每个模型的初始资金
+            fee_bp: 手续费（基点）
+            slippage_bp: 滑点（基点）
+            context_bars: 每次决策附带的历史K线根数（与实盘prompt一致时取60），0表示只给现价
+            risk_limits: RiskEngine参数（如DEFAULT_RISK_LIMITS），为None时不经风控直接撮合；
+                止盈止损和Kill-Switch在决策点按收盘价检查
+                
+        Raises:
+            ValueError: 模型名称重复（账本和结果按模型名称区分）
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.decision_makers = list(decision_makers)
+        check_unique_model_names(self.decision_makers)
+        self.bars = bars
+        self.decision_interval = decision_interval
+        self.initial_cash = initial_cash
+        self.fee_bp = fee_bp
+        self.slippage_bp = slippage_bp
+        self.context_bars = context_bars
+        self.risk_limits = risk_limits
+    
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """
+        执行回测
+        
+        只在决策点逐个调用模型并撮合；决策点之间持仓不变，整段净值用一次
+        向量化运算算出，不逐根K线循环。
+        
+        Returns:
+            结果字典{model_name: {nav, drawdown, fees, summary}}，数组按K线对齐
+        """
+        bars = self.bars
+        close = np.ascontiguousarray(bars.close)
+        decision_index = np.arange(0, len(bars), self.decision_interval)
+        
+        engine = PaperTradingEngine(bars.symbols, self.initial_cash, self.fee_bp, self.slippage_bp, verbose=False)
+        ledger = engine.ledger
+        for decision_maker in self.decision_makers:
+            engine.register_model(decision_maker.model_name)
+        executor = engine
+        if self.risk_limits is not None:
+            executor = RiskEngine(engine, time_unit=0.001, verbose=False, **self.risk_limits)
+        
+        n_models = ledger.size
+        cash_hist = np.empty((len(decision_index), n_models))
+        qty_hist = np.empty((len(decision_index), n_models, len(bars.symbols)))
+        fee_hist = np.empty((len(decision_index), n_models))
+        trade_counts = np.zeros(n_models, dtype=np.int64)
+        
+        # 模型/桩调用耗时单独累计，回放耗时不含LLM
+        llm_seconds = 0.0
+        start = time.perf_counter()
+        for k, i in enumerate(decision_index):
+            prices = dict(zip(bars.symbols, close[i].tolist()))
+            snapshot = {'timestamp': int(bars.timestamps[i]), 'prices': prices}
+            market_context = self._market_context(i) if self.context_bars else None
+            
+            decisions = {}
+            for decision_maker in self.decision_makers:
+                decisions[decision_maker.model_name] = decision_maker.get_decision(prices, market_context)
+                llm_seconds += decision_maker.last_timings['llm']
+            for fill in executor.execute_all(decisions, snapshot):
+                trade_counts[ledger.model_index[fill['model']]] += 1
+            
+            cash_hist[k] = ledger.cash[:n_models]
+            qty_hist[k] = ledger.qty[:n_models]
+            fee_hist[k] = ledger.fees_paid[:n_models]
+        replay_seconds = max(time.perf_counter() - start - llm_seconds, 0.0)
+        
+        # 每根K线所属的决策段，段内持仓不变
+        segment = np.searchsorted(decision_index, np.arange(len(bars)), side='right') - 1
+        nav = cash_hist[segment] + np.einsum('tms,ts->tm', qty_hist[segment], close)
+        fees = fee_hist[segment]
+        drawdown = drawdown_series(nav)
+        periods_per_year = self._periods_per_year()
+        sharpe = np.atleast_1d(sharpe_ratio(nav, periods_per_year))
+        calmar = np.atleast_1d(calmar_ratio(nav, periods_per_year))
+        
+        results = {}
+        for row, model_name in enumerate(ledger.model_names):
+            # K线时间戳为毫秒，持仓时长换算为秒
+            pnl, holding = round_trips(engine.fills, model_name)
+            stats = trade_stats(pnl, holding / 1000.0)
+            results[model_name] = {
+                'nav': nav[:, row],
+                'drawdown': drawdown[:, row],
+                'fees': fees[:, row],
+                'summary': {
+                    'final_nav': float(nav[-1, row]),
+                    'total_return': float(nav[-1, row] / self.initial_cash - 1.0),
+                    'max_drawdown': float(drawdown[:, row].min()),
+                    'sharpe': float(sharpe[row]),
+                    'calmar': float(calmar[row]),
+                    'total_fees': float(fees[-1, row]),
+                    'trades': int(trade_counts[row]),
+                    'round_trips': stats['trades'],
+                    'win_rate': stats['win_rate'],
+                    'payoff_ratio': stats['payoff_ratio'],
+                    'avg_holding_seconds': stats['avg_holding_seconds'],
+                    'decisions': len(decision_index),
+                    'replay_seconds': replay_seconds,
+                    'llm_seconds': llm_seconds
+                }
+            }
+        return results
+    
+    def _periods_per_year(self) -> float:
+        """按K线间隔（毫秒时间戳的中位差）折算每年期数，用于年化Sharpe/Calmar"""
+        timestamps = np.asarray(self.bars.timestamps, dtype=np.float64)
+        if len(timestamps) < 2:
+            return SECONDS_PER_YEAR / 60.0
+        step = float(np.median(np.diff(timestamps))) / 1000.0
+        return SECONDS_PER_YEAR / step if step > 0 else SECONDS_PER_YEAR / 60.0
+    
+    def _market_context(self, i: int) -> Dict[str, Dict[str, Any]]:
+        """截取决策点之前的K线窗口，格式与MarketData.get_market_context一致"""
+        bars = self.bars
+        lo = max(0, i - self.context_bars + 1)
+        seconds = np.asarray(bars.timestamps[lo:i + 1], dtype=np.float64)[:, None] / 1000.0
+        
+        context = {}
+        for col, symbol in enumerate(bars.symbols):
+            window = np.hstack((seconds, bars.ohlcv[lo:i + 1, col, :]))
+            context[symbol] = {'bars': window, 'features': compute_features(window)}
+        return context
+
+
+def main():
+    """命令行入口：python -m core.backtest <bars.csv|bars.parquet|缓存目录>"""
+    import argparse
+    from adapters.stub_adapter import StubLLMAdapter
+    from adapters.cached_adapter import CachedLLMAdapter, ResponseCache
+    
+    parser = argparse.ArgumentParser(description="Alpha Arena 历史回测")
+    parser.add_argument('bars', nargs='?', help="K线文件或缓存目录，不填则使用合成数据")
+    parser.add_argument('--interval', type=int, default=5, help="决策间隔（K线根数）")
+    parser.add_argument('--synthetic-bars', type=int, default=525600, help="合成数据K线数量")
+    parser.add_argument('--cache', help="LLM响应缓存路径（SQLite），重复回放时直接命中")
+    parser.add_argument('--context-bars', type=int, default=0, help="每次决策附带的历史K线根数")
+    parser.add_argument('--kline-store', help="从本地K线存储读取（配合--start/--end，YYYY-MM-DD）")
+    parser.add_argument('--start', help="K线存储的起始日期（UTC）")
+    parser.add_argument('--end', help="K线存储的结束日期（UTC，不含）")
+    parser.add_argument('--risk', action='store_true', help="启用风控（单笔20%%、持1个标的、-5%%止损、10%%Kill-Switch、5分钟去重）")
+    args = parser.parse_args()
+    
+    symbols = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'BNBUSDT', 'SOLUSDT']
+    if args.kline_store:
+        from core.kline_store import KlineStore, parse_date_ms
+        bars = KlineStore(args.kline_store).to_bar_data(symbols, parse_date_ms(args.start), parse_date_ms(args.end))
+    elif args.bars:
+        bars = BarData.load(args.bars)
+    else:
+        bars = BarData.synthetic(symbols, args.synthetic_bars)
+    
+    adapter = StubLLMAdapter()
+    if args.cache:
+        adapter = CachedLLMAdapter(adapter, ResponseCache(args.cache))
+    
+    decision_maker = DecisionMaker(adapter, symbols=bars.symbols)
+    results = Backtester([decision_maker], bars, decision_interval=args.interval,
+                         context_bars=args.context_bars,
+                         risk_limits=DEFAULT_RISK_LIMITS if args.risk else None).run()
+    
+    for model_name, result in results.items():
+        summary = result['summary']
+        print(f"📊 {model_name}")
+        print(f"   最终净值: ${summary['final_nav']:.2f}（{summary['total_return']:+.2%}）")
+        print(f"   最大回撤: {summary['max_drawdown']:.2%}，Sharpe {summary['sharpe']:.2f}，Calmar {summary['calmar']:.2f}")
+        print(f"   完整交易 {summary['round_trips']} 笔，胜率 {summary['win_rate']:.1%}，"
+              f"盈亏比 {summary['payoff_ratio']:.2f}，平均持仓 {summary['avg_holding_seconds'] / 60:.1f}分钟")
+        print(f"   手续费: ${summary['total_fees']:.2f}，成交 {summary['trades']} 笔 / 决策 {summary['decisions']} 次")
+        print(f"   回放耗时: {summary['replay_seconds']:.2f}s（不含LLM），"
+              f"LLM耗时: {summary['llm_seconds']:.2f}s")
+    
+    if args.cache:
+        stats = adapter.get_stats()
+        print(f"🗄️ 缓存命中 {stats['hits']} / 未命中 {stats['misses']}（命中率 {stats['hit_rate']:.1%}）")
+        adapter.cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线环形缓冲区
+由实时tick增量聚合1分钟K线，内存固定，单次更新O(1)
+"""
+
+import threading
+from typing import Dict, List, Any
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+# 缓冲区列：分钟起始时间戳（秒）、开、高、低、收、量
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+# 单根K线的序列化模板，一次格式化整行
+BAR_FORMAT = "[" + ",".join(["%.8g"] * 5) + "]"
+
+
+class BarRingBuffer:
+    """单个代币的1分钟K线环形缓冲区（行情线程写入、决策周期读取，读写都在锁内完成）"""
+    
+    def __init__(self, capacity: int = 60, interval: int = 60):
+        """
+        初始化环形缓冲区
+        
+        Args:
+            capacity: 保留的K线根数
+            interval: K线周期（秒）
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.capacity = capacity
+        self.interval = interval
+        self.data = np.zeros((capacity, 6))
+        self.head = -1
+        self.count = 0
+        self.current_start = None
+        self.lock = threading.Lock()
+    
+    def update(self, price: float, ts: float, volume: float = 0.0):
+        """
+        用一条tick更新当前K线
+        
+        同一分钟内只改写当前行；跨分钟时推进写指针，缺失的分钟用上一根收盘价补平
+        （最多补capacity根），因此每次更新的开销与历史长度无关。
+        
+        Args:
+            price: 成交价
+            ts: tick时间戳（秒）
+            volume: 该tick的成交量
+        """
+        with self.lock:
+            start = ts - ts % self.interval
+            
+            if self.current_start is not None and start < self.current_start:
+                return
+            
+            if start != self.current_start:
+                if self.current_start is not None:
+                    last_close = self.data[self.head, CLOSE]
+                    gap = int((start - self.current_start) // self.interval) - 1
+                    for k in range(min(gap, self.capacity), 0, -1):
+                        self._advance(start - k * self.interval, last_close, 0.0)
+                self._advance(start, price, volume)
+                return
+            
+            row = self.data[self.head]
+            if price > row[HIGH]:
+                row[HIGH] = price
+            if price < row[LOW]:
+                row[LOW] = price
+            row[CLOSE] = price
+            row[VOLUME] += volume
+    
+    def _advance(self, start: float, price: float, volume: float):
+        """推进写指针并开启新K线（调用方持有锁）"""
+        self.head = (self.head + 1) % self.capacity
+        self.data[self.head] = (start, price, price, price, price, volume)
+        self.current_start = start
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def seed(self, bars):
+        """
+        用历史K线初始化缓冲区
+        
+        Args:
+            bars: 形状(n, 6)的数组，列为ts、开、高、低、收、量，按时间升序
+        """
+        bars = np.asarray(bars)[-self.capacity:]
+        n = len(bars)
+        if n == 0:
+            return
+        with self.lock:
+            self.data[:n] = bars
+            self.head = n - 1
+            self.count = n
+            self.current_start = float(bars[-1, TS])
+    
+    def to_array(self):
+        """
+        按时间升序返回缓冲区内容
+        
+        Returns:
+            形状(count, 6)的数组副本
+        """
+        with self.lock:
+            if self.count < self.capacity:
+                return self.data[:self.count].copy()
+            start = self.head + 1
+            return np.concatenate((self.data[start:], self.data[:start]))
+
+
+def compute_features(bars, bid: float = 0.0, ask: float = 0.0) -> Dict[str, float]:
+    """
+    由K线和盘口计算prompt使用的衍生特征
+    
+    Args:
+        bars: 形状(n, 6)的K线数组，按时间升序
+        bid: 买一价
+        ask: 卖一价
+        
+    Returns:
+        特征字典{return_pct, volatility_pct, bid, ask, mid, spread_bp}
+    """
+    features = {'return_pct': 0.0, 'volatility_pct': 0.0}
+    close = bars[:, CLOSE] if len(bars) else None
+    if close is not None and len(close) >= 2 and close[0] > 0:
+        log_returns = np.diff(np.log(close))
+        features['return_pct'] = float((close[-1] / close[0] - 1.0) * 100)
+        features['volatility_pct'] = float(log_returns.std() * 100)
+    
+    if bid > 0 and ask > 0:
+        mid = (bid + ask) / 2
+        features.update({'bid': bid, 'ask': ask, 'mid': mid, 'spread_bp': (ask - bid) / mid * 10000})
+    return features
+
+
+def format_bars(bars) -> str:
+    """
+    把K线序列化为紧凑JSON数组[[o,h,l,c,v], ...]
+    
+    Args:
+        bars: 形状(n, 6)的K线数组
+        
+    Returns:
+        JSON字符串
+    """
+    return "[" + ",".join([BAR_FORMAT % tuple(row) for row in bars[:, OPEN:].tolist()]) + "]"
+
+
+class BarStore:
+    """多代币K线缓冲区集合"""
+    
+    def __init__(self, symbols: List[str], capacity: int = 60, interval: int = 60):
+        """
+        初始化K线集合
+        
+        Args:
+            symbols: 代币符号列表
+            capacity: 每个代币保留的K线根数
+            interval: K线周期（秒）
+        """
+        self.buffers = {symbol: BarRingBuffer(capacity, interval) for symbol in symbols}
+    
+    def update(self, symbol: str, price: float, ts: float, volume: float = 0.0):
+        """
+        更新指定代币的K线
+        
+        Args:
+            symbol: 代币符号
+            price: 成交价
+            ts: 时间戳（秒）
+            volume: 成交量
+        """
+        buffer = self.buffers.get(symbol)
+        if buffer is not None:
+            buffer.update(price, ts, volume)
+    
+    def seed(self, symbol: str, bars):
+        """
+        用历史K线初始化指定代币的缓冲区
+        
+        Args:
+            symbol: 代币符号
+            bars: 形状(n, 6)的数组，列为ts、开、高、低、收、量，按时间升序
+        """
+        buffer = self.buffers.get(symbol)
+        if buffer is not None:
+            buffer.seed(bars)
+    
+    def get_bars(self, symbol: str):
+        """
+        获取指定代币的K线数组
+        
+        Args:
+            symbol: 代币符号
+            
+        Returns:
+            形状(n, 6)的数组
+        """
+        return self.buffers[symbol].to_array()
+    
+    def get_context(self, ticks: Dict[str, Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        生成所有代币的prompt上下文
+        
+        Args:
+            ticks: 最新盘口{symbol: {bid, ask}}
+            
+        Returns:
+            上下文字典{symbol: {bars, features}}
+        """
+        ticks = ticks or {}
+        context = {}
+        for symbol, buffer in self.buffers.items():
+            bars = buffer.to_array()
+            tick = ticks.get(symbol) or {}
+            context[symbol] = {
+                'bars': bars,
+                'features': compute_features(bars, tick.get('bid', 0.0), tick.get('ask', 0.0))
+            }
+        return context
@@ -5,143 +5,462 @@
 处理LLM交易决策
 """
 
-import json
-from typing import Dict, Any
-from adapters.llm_base import LLMAdapter
+import time
+from typing import Dict, List, Any, Tuple
+from adapters.instrumentation import get_instrumentation, metric_key
+from adapters.llm_base import LLMAdapter, FALLBACK_RESPONSE
+from core.bars import format_bars
+from core.decision_parser import Decision, DecisionParser, DecisionSchema, BatchDecisionParser
+from core.prompts import DEFAULT_SYMBOLS, compile_template
 
 
 class DecisionMaker:
     """交易决策引擎"""
     
-    def __init__(self, llm_adapter: LLMAdapter):
+    def __init__(self, llm_adapter: LLMAdapter, streaming: bool = True, symbols: List[str] = None,
+                 guidance: str = ""):
         """
         初始化决策引擎
         
         Args:
             llm_adapter: LLM适配器实例
+            streaming: 适配器支持时是否使用流式输出并在决策JSON闭合后提前终止
+            symbols: 可交易代币列表（通常为MarketData.get_symbols()），默认BTC/ETH/XRP/BNB/SOL
+            guidance: 追加到提示词注意事项的策略指引（见core.prompts.PROMPT_VARIANTS）
         """
         self.llm_adapter = llm_adapter
+        self.streaming = streaming
         self.model_name = llm_adapter.get_model_name()
+        self.symbols = list(symbols or DEFAULT_SYMBOLS)
+        self.template = compile_template(tuple(self.symbols), guidance)
+        self.schema = DecisionSchema(self.symbols)
+        
+        # 最近一次决策的分阶段耗时（秒）：prompt构建、LLM请求、响应解析
+        self.last_timings = {'prompt': 0.0, 'llm': 0.0, 'parse': 0.0}
+        
+        # 最近一次决策的prompt和原始响应（供审计日志记录）
+        self.last_prompt = None
+        self.last_response = None
+        
+        # 埋点键按模型预先构造，热路径上只做直方图/计数器累加
+        self.instrumentation = get_instrumentation()
+        self.stage_keys = [(stage, metric_key('decision_stage_seconds', model=self.model_name, stage=stage))
+                           for stage in ('prompt', 'llm', 'parse')]
+        self.decisions_key = metric_key('decisions_total', model=self.model_name)
+        self.llm_errors_key = metric_key('llm_errors_total', model=self.model_name)
+        self.json_violations_key = metric_key('json_violations_total', model=self.model_name)
+        self.batch_retries_key = metric_key('batch_retries_total', model=self.model_name)
+        
+        # 批量模式下按代币子集缓存的schema
+        self.batch_schemas = {}
     
-    def build_prompt(self, market_data: Dict[str, float]) -> str:
+    def build_prompt(self, market_data: Dict[str, float], market_context: Dict[str, Dict[str, Any]] = None) -> str:
         """
         构建交易决策提示词
         
         Args:
             market_data: 市场数据字典
+            market_context: 行情上下文{symbol: {bars, features}}，来自MarketData.get_market_context
             
         Returns:
-            构建的提示词
+            构建的提示词（静态前缀 + 动态后缀）
         """
-        prompt = f"""
-你是专业的量化交易分析师，请根据当前市场价格给出交易决策。
-
-当前市场价格：
-- BTCUSDT: ${market_data.get('BTCUSDT', 0):.4f}
-- ETHUSDT: ${market_data.get('ETHUSDT', 0):.4f}
-- XRPUSDT: ${market_data.get('XRPUSDT', 0):.4f}
-- BNBUSDT: ${market_data.get('BNBUSDT', 0):.4f}
-- SOLUSDT: ${market_data.get('SOLUSDT', 0):.4f}
-
-请以JSON格式返回你的交易决策：
-{{
-    "symbol": "BTCUSDT|ETHUSDT|XRPUSDT|BNBUSDT|SOLUSDT|null",
-    "action": "BUY|SELL|HOLD",
-    "confidence": 0.0-1.0,
-    "rationale": "简短理由（不超过50字）"
-}}
-
-注意事项：
-1. 只返回JSON，不要其他文字
-2. symbol为null表示不选择任何代币
-3. action为HOLD表示持有/观望
-4. confidence表示决策信心度
-5. rationale给出决策理由
-
-JSON:
-"""
-        return prompt
+        return "".join(self.build_prompt_parts(market_data, market_context))
+    
+    def build_prompt_parts(self, market_data: Dict[str, float],
+                           market_context: Dict[str, Dict[str, Any]] = None) -> Tuple[str, str]:
+        """
+        构建拆分后的提示词
+        
+        Args:
+            market_data: 市场数据字典
+            market_context: 行情上下文
+            
+        Returns:
+            (静态前缀, 动态后缀)，前缀在所有周期和模型间逐字节一致
+        """
+        context_section = self.format_market_context(market_context) if market_context else ""
+        return self.template.render(market_data, context_section)
+    
+    def format_market_context(self, market_context: Dict[str, Dict[str, Any]]) -> str:
+        """
+        把K线和衍生特征序列化为prompt片段
+        
+        Args:
+            market_context: 行情上下文{symbol: {bars, features}}
+            
+        Returns:
+            prompt片段（以换行开头）
+        """
+        lines = ["", "最近1分钟K线（ohlcv，按时间升序）与衍生特征："]
+        for symbol, context in market_context.items():
+            features = context['features']
+            summary = f"收益 {features['return_pct']:+.3f}%，1分钟波动率 {features['volatility_pct']:.3f}%"
+            if 'spread_bp' in features:
+                summary += (f"，bid {features['bid']:.4f} / ask {features['ask']:.4f}"
+                            f" / mid {features['mid']:.4f}，价差 {features['spread_bp']:.2f}bp")
+            lines.append(f"- {symbol}（{len(context['bars'])}根）: {summary}")
+            lines.append(f"  {format_bars(context['bars'])}")
+        return "\n".join(lines) + "\n"
     
-    def get_decision(self, market_data: Dict[str, float]) -> Dict[str, Any]:
+    def get_decision(self, market_data: Dict[str, float], market_context: Dict[str, Dict[str, Any]] = None) -> Decision:
         """
         获取交易决策
         
         Args:
             market_data: 市场数据
+            market_context: 行情上下文（K线与衍生特征）
             
         Returns:
-            解析后的决策字典
+            解析后的决策对象
         """
-        prompt = self.build_prompt(market_data)
+        prompt, options, request_start = self._start_timing(market_data, market_context)
         
         try:
-            response = self.llm_adapter.call(prompt)
+            if self.use_streaming():
+                return self.stream_decision(prompt, **options)
+            response = self.llm_adapter.call(prompt, **options)
+            self.last_response = response
+            if response == FALLBACK_RESPONSE:
+                self.instrumentation.inc_key(self.llm_errors_key)
             return self.parse_decision(response)
         except Exception as e:
             print(f"❌ {self.model_name}决策获取失败: {e}")
+            self.instrumentation.inc_key(self.llm_errors_key)
             return self.get_default_decision()
+        finally:
+            self._finish_timing(request_start)
     
-    def parse_decision(self, response: str) -> Dict[str, Any]:
+    async def aget_decision(self, market_data: Dict[str, float],
+                            market_context: Dict[str, Dict[str, Any]] = None) -> Decision:
         """
-        解析LLM响应
+        异步获取交易决策
         
         Args:
-            response: LLM响应文本
+            market_data: 市场数据
+            market_context: 行情上下文（K线与衍生特征）
             
         Returns:
-            解析后的决策字典
+            解析后的决策对象
         """
+        prompt, options, request_start = self._start_timing(market_data, market_context)
+        
         try:
-            # 尝试提取JSON
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.endswith('```'):
-                response = response[:-3]
-            
-            decision = json.loads(response)
-            
-            # 验证必要字段
-            required_fields = ['symbol', 'action', 'confidence', 'rationale']
-            for field in required_fields:
-                if field not in decision:
-                    print(f"⚠️ 决策缺少字段: {field}")
-                    return self.get_default_decision()
-            
-            # 验证字段值
-            if decision['action'] not in ['BUY', 'SELL', 'HOLD']:
-                print(f"⚠️ 无效的action: {decision['action']}")
-                decision['action'] = 'HOLD'
+            if self.use_streaming():
+                return await self.astream_decision(prompt, **options)
+            response = await self.llm_adapter.acall(prompt, **options)
+            self.last_response = response
+            if response == FALLBACK_RESPONSE:
+                self.instrumentation.inc_key(self.llm_errors_key)
+            return self.parse_decision(response)
+        except Exception as e:
+            print(f"❌ {self.model_name}决策获取失败: {e}")
+            self.instrumentation.inc_key(self.llm_errors_key)
+            return self.get_default_decision()
+        finally:
+            self._finish_timing(request_start)
+    
+    def _start_timing(self, market_data: Dict[str, float], market_context: Dict[str, Dict[str, Any]]):
+        """
+        构建prompt并开始记录分阶段耗时
+        
+        适配器支持system提示词时，静态前缀作为system单独发送（可命中服务商前缀缓存），
+        否则与后缀拼成一条prompt。
+        
+        Returns:
+            (prompt, 适配器调用参数, LLM请求开始时间)
+        """
+        start = time.perf_counter()
+        prefix, suffix = self.build_prompt_parts(market_data, market_context)
+        if self.llm_adapter.supports_system_prompt:
+            prompt, options = suffix, {'system': prefix}
+        else:
+            prompt, options = prefix + suffix, {}
+        request_start = time.perf_counter()
+        self.last_timings = {'prompt': request_start - start, 'llm': 0.0, 'parse': 0.0}
+        self.last_prompt = prefix + suffix
+        self.last_response = None
+        return prompt, options, request_start
+    
+    def _finish_timing(self, request_start: float):
+        """结束计时：LLM耗时 = 请求总耗时 - 解析耗时（流式时两者交错），并计入分阶段直方图"""
+        elapsed = time.perf_counter() - request_start
+        self.last_timings['llm'] = max(elapsed - self.last_timings['parse'], 0.0)
+        
+        instrumentation = self.instrumentation
+        for stage, key in self.stage_keys:
+            instrumentation.observe_key(key, self.last_timings[stage])
+        instrumentation.inc_key(self.decisions_key)
+    
+    def use_streaming(self) -> bool:
+        """是否走流式+提前终止路径"""
+        return self.streaming and self.llm_adapter.supports_streaming
+    
+    def stream_decision(self, prompt: str, **options) -> Decision:
+        """
+        流式获取决策，收到完整JSON对象后立即关闭流（取消剩余生成）
+        
+        Args:
+            prompt: 输入提示词
+            **options: 适配器调用参数（如system）
             
-            if not isinstance(decision['confidence'], (int, float)) or not (0 <= decision['confidence'] <= 1):
-                print(f"⚠️ 无效的confidence: {decision['confidence']}")
-                decision['confidence'] = 0.5
+        Returns:
+            解析后的决策对象
+        """
+        parser = DecisionParser(self.schema)
+        chunks = self.llm_adapter.stream(prompt, **options)
+        try:
+            for chunk in chunks:
+                self._timed_feed(parser, chunk)
+                if parser.complete:
+                    break
+        finally:
+            chunks.close()
+        return self._finish_stream(parser)
+    
+    async def astream_decision(self, prompt: str, **options) -> Decision:
+        """
+        异步流式获取决策，收到完整JSON对象后立即关闭流（取消剩余生成）
+        
+        Args:
+            prompt: 输入提示词
+            **options: 适配器调用参数（如system）
             
-            return decision
+        Returns:
+            解析后的决策对象
+        """
+        parser = DecisionParser(self.schema)
+        chunks = self.llm_adapter.astream(prompt, **options)
+        try:
+            async for chunk in chunks:
+                self._timed_feed(parser, chunk)
+                if parser.complete:
+                    break
+        finally:
+            await chunks.aclose()
+        return self._finish_stream(parser)
+    
+    def _timed_feed(self, parser: DecisionParser, chunk: str):
+        """喂入一段流式token并累计解析耗时"""
+        start = time.perf_counter()
+        parser.feed(chunk)
+        self.last_timings['parse'] += time.perf_counter() - start
+    
+    def _finish_stream(self, parser: DecisionParser) -> Decision:
+        """流结束后取出决策；对象不完整或校验失败时按整段文本解析（含错误提示）"""
+        self.last_response = parser.extractor.text
+        if self.last_response == FALLBACK_RESPONSE:
+            self.instrumentation.inc_key(self.llm_errors_key)
+        if parser.decision is not None:
+            for warning in parser.warnings:
+                print(f"⚠️ {warning}")
+            return parser.decision
+        return self.parse_decision(parser.extractor.text)
+    
+    def parse_decision(self, response: str) -> Decision:
+        """
+        解析LLM响应
+        
+        Args:
+            response: LLM响应文本
             
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON解析失败: {e}")
+        Returns:
+            解析后的决策对象
+        """
+        start = time.perf_counter()
+        parser = DecisionParser(self.schema)
+        decision = parser.parse(response)
+        self.last_timings['parse'] += time.perf_counter() - start
+        
+        for warning in parser.warnings:
+            print(f"⚠️ {warning}")
+        
+        if decision is None:
+            self.instrumentation.inc_key(self.json_violations_key)
+            print(f"❌ 决策解析失败: {parser.error}")
             print(f"原始响应: {response}")
             return self.get_default_decision()
-        except Exception as e:
-            print(f"❌ 决策解析失败: {e}")
-            return self.get_default_decision()
+        
+        return decision
+    
+    def build_batch_prompt_parts(self, contexts: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """
+        构建批量提示词
+        
+        Args:
+            contexts: 上下文列表[{id, market_data, market_context, account, symbols}]，
+                market_context/account/symbols可选，symbols为该上下文可选的代币子集
+                
+        Returns:
+            (静态前缀, 动态后缀)，前缀与上下文个数无关
+        """
+        sections = []
+        for context in contexts:
+            market_context = context.get('market_context')
+            symbols = context.get('symbols')
+            if market_context and symbols is not None:
+                market_context = {symbol: market_context[symbol] for symbol in symbols if symbol in market_context}
+            sections.append({
+                'id': context['id'],
+                'market_data': context['market_data'],
+                'context_section': self.format_market_context(market_context) if market_context else "",
+                'account': context.get('account'),
+                'symbols': symbols
+            })
+        return self.template.batch_prefix, self.template.render_batch_suffix(sections)
     
-    def get_default_decision(self) -> Dict[str, Any]:
+    def get_batch_decisions(self, contexts: List[Dict[str, Any]], max_retries: int = 1) -> Dict[str, Decision]:
+        """
+        一次请求获取多个独立上下文的决策
+        
+        回复按id拆回各上下文；缺失或无效的上下文单独组成更小的批次重试，
+        重试后仍失败的上下文为默认观望决策。
+        
+        Args:
+            contexts: 上下文列表（见build_batch_prompt_parts），id在批次内唯一
+            max_retries: 失败上下文的最大重试轮数
+            
+        Returns:
+            决策字典{id: Decision}，顺序与contexts一致
+        """
+        contexts = self._normalize_contexts(contexts)
+        self.last_timings = {'prompt': 0.0, 'llm': 0.0, 'parse': 0.0}
+        decisions = {}
+        pending = contexts
+        for attempt in range(max_retries + 1):
+            if attempt:
+                self.instrumentation.inc_key(self.batch_retries_key)
+                print(f"🔁 {self.model_name}批量决策重试{len(pending)}个失败的上下文")
+            prompt, options = self._start_batch(pending)
+            request_start = time.perf_counter()
+            try:
+                response = self.llm_adapter.call(prompt, **options)
+            except Exception as e:
+                print(f"❌ {self.model_name}批量决策获取失败: {e}")
+                response = FALLBACK_RESPONSE
+            pending = self._finish_batch(pending, response, request_start, decisions)
+            if not pending:
+                break
+        return self._collect_batch(contexts, pending, decisions)
+    
+    async def aget_batch_decisions(self, contexts: List[Dict[str, Any]], max_retries: int = 1) -> Dict[str, Decision]:
+        """
+        异步批量获取决策（语义同get_batch_decisions）
+        
+        Args:
+            contexts: 上下文列表
+            max_retries: 失败上下文的最大重试轮数
+            
+        Returns:
+            决策字典{id: Decision}
+        """
+        contexts = self._normalize_contexts(contexts)
+        self.last_timings = {'prompt': 0.0, 'llm': 0.0, 'parse': 0.0}
+        decisions = {}
+        pending = contexts
+        for attempt in range(max_retries + 1):
+            if attempt:
+                self.instrumentation.inc_key(self.batch_retries_key)
+                print(f"🔁 {self.model_name}批量决策重试{len(pending)}个失败的上下文")
+            prompt, options = self._start_batch(pending)
+            request_start = time.perf_counter()
+            try:
+                response = await self.llm_adapter.acall(prompt, **options)
+            except Exception as e:
+                print(f"❌ {self.model_name}批量决策获取失败: {e}")
+                response = FALLBACK_RESPONSE
+            pending = self._finish_batch(pending, response, request_start, decisions)
+            if not pending:
+                break
+        return self._collect_batch(contexts, pending, decisions)
+    
+    def _normalize_contexts(self, contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """补齐缺省id（按序号）并转为字符串，检查id唯一"""
+        normalized = []
+        for i, context in enumerate(contexts):
+            context = dict(context)
+            context['id'] = str(context.get('id', i))
+            normalized.append(context)
+        if len({context['id'] for context in normalized}) != len(normalized):
+            raise ValueError("批量决策的上下文id必须唯一")
+        return normalized
+    
+    def _start_batch(self, pending: List[Dict[str, Any]]):
+        """构建一轮批量请求，返回(prompt, 适配器调用参数)"""
+        start = time.perf_counter()
+        prefix, suffix = self.build_batch_prompt_parts(pending)
+        if self.llm_adapter.supports_system_prompt:
+            prompt, options = suffix, {'system': prefix}
+        else:
+            prompt, options = prefix + suffix, {}
+        self.last_timings['prompt'] += time.perf_counter() - start
+        self.last_prompt = prefix + suffix
+        return prompt, options
+    
+    def _finish_batch(self, pending: List[Dict[str, Any]], response: str, request_start: float,
+                      decisions: Dict[str, Decision]) -> List[Dict[str, Any]]:
+        """
+        解析一轮批量回复，把成功的决策并入decisions
+        
+        Returns:
+            仍需重试的上下文列表
+        """
+        parse_start = time.perf_counter()
+        self.last_timings['llm'] += parse_start - request_start
+        self.last_response = response
+        if response == FALLBACK_RESPONSE:
+            self.instrumentation.inc_key(self.llm_errors_key)
+        
+        parser = BatchDecisionParser({context['id']: self._batch_schema(context) for context in pending})
+        decisions.update(parser.parse(response))
+        self.last_timings['parse'] += time.perf_counter() - parse_start
+        
+        for warning in parser.warnings:
+            print(f"⚠️ {warning}")
+        if parser.errors:
+            self.instrumentation.inc_key(self.json_violations_key, len(parser.errors))
+            for context_id, error in parser.errors.items():
+                print(f"❌ 上下文{context_id}决策解析失败: {error}")
+        return [context for context in pending if context['id'] in parser.errors]
+    
+    def _collect_batch(self, contexts: List[Dict[str, Any]], failed: List[Dict[str, Any]],
+                       decisions: Dict[str, Decision]) -> Dict[str, Decision]:
+        """按输入顺序整理结果（失败的上下文为默认决策），并计入分阶段直方图"""
+        for context in failed:
+            decisions[context['id']] = self.get_default_decision()
+        
+        instrumentation = self.instrumentation
+        for stage, key in self.stage_keys:
+            instrumentation.observe_key(key, self.last_timings[stage])
+        instrumentation.inc_key(self.decisions_key, len(contexts))
+        return {context['id']: decisions[context['id']] for context in contexts}
+    
+    def _batch_schema(self, context: Dict[str, Any]) -> DecisionSchema:
+        """上下文可选代币对应的schema（未指定子集时为全部代币）"""
+        symbols = context.get('symbols')
+        if symbols is None:
+            return self.schema
+        key = tuple(symbols)
+        schema = self.batch_schemas.get(key)
+        if schema is None:
+            schema = self.batch_schemas[key] = DecisionSchema(symbols)
+        return schema
+    
+    def get_default_decision(self) -> Decision:
         """获取默认决策"""
-        return {
-            "symbol": None,
-            "action": "HOLD",
-            "confidence": 0.0,
-            "rationale": "解析失败，默认观望"
-        }
+        return Decision(
+            symbol=None,
+            action="HOLD",
+            confidence=0.0,
+            rationale="解析失败，默认观望"
+        )
     
-    def format_decision_for_display(self, decision: Dict[str, Any]) -> str:
+    def format_decision_for_display(self, decision: Decision) -> str:
         """
         格式化决策用于显示
         
         Args:
-            decision: 决策字典
+            decision: 决策对象
             
         Returns:
             格式化的决策字符串
@@ -152,3 +471,26 @@ JSON:
         rationale = decision.get('rationale', '无理由')
         
         return f"   决策: {action} {symbol}\n   信心: {confidence:.2f}\n   理由: {rationale}"
+
+
+def check_unique_model_names(decision_makers: List[DecisionMaker]):
+    """
+    检查决策引擎的模型名称互不相同
+    
+    决策字典、账本、竞技场统计和审计日志都以模型名称为键，同名的模型会互相覆盖。
+    
+    Args:
+        decision_makers: 决策引擎列表
+        
+    Raises:
+        ValueError: 存在重复的模型名称
+    """
+    seen = set()
+    duplicates = set()
+    for decision_maker in decision_makers:
+        if decision_maker.model_name in seen:
+            duplicates.add(decision_maker.model_name)
+        seen.add(decision_maker.model_name)
+    if duplicates:
+        raise ValueError(f"模型名称重复: {', '.join(sorted(duplicates))}，"
+                         "请用display_name选项区分（桩适配器为model_name）")
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+决策解析器
+从LLM响应（或流式token）中单遍提取括号平衡的JSON对象，按预编译schema依次校验，取第一个合法决策
+"""
+
+import json
+import re
+from json.decoder import scanstring
+from typing import Dict, Any, List, Tuple
+
+# 括号内的结构字符：字符串起始引号或括号，其余字符整段跳过（字符串本体交给C实现的scanstring）
+STRUCTURAL_TOKENS = {
+    '{': re.compile(r'[{}"]'),
+    '[': re.compile(r'[\[\]"]'),
+}
+CLOSING_CHARS = {'{': '}', '[': ']'}
+
+# 跨块的字符串：匹配到结束引号之前，停在结束引号、末尾的单个反斜杠或文本末尾
+STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+ACTIONS = frozenset(('BUY', 'SELL', 'HOLD'))
+REQUIRED_FIELDS = ('symbol', 'action', 'confidence', 'rationale')
+OPTIONAL_PRICE_FIELDS = ('position_size_pct', 'take_profit', 'stop_loss')
+MAX_RATIONALE_LENGTH = 200
+
+
+class Decision:
+    """结构化交易决策（兼容字典式访问）"""
+    
+    __slots__ = ('symbol', 'action', 'confidence', 'rationale', 'position_size_pct', 'take_profit', 'stop_loss')
+    
+    def __init__(self, symbol: str = None, action: str = 'HOLD', confidence: float = 0.0, rationale: str = '',
+                 position_size_pct: float = None, take_profit: float = None, stop_loss: float = None):
+        self.symbol = symbol
+        self.action = action
+        self.confidence = confidence
+        self.rationale = rationale
+        self.position_size_pct = position_size_pct
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """按字段名读取，未设置的字段返回default"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Decision):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"Decision({self.to_dict()})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为字典（用于序列化和日志）
+        
+        Returns:
+            决策字典，未给出的可选字段不输出
+        """
+        result = {field: getattr(self, field) for field in REQUIRED_FIELDS}
+        for field in OPTIONAL_PRICE_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                result[field] = value
+        return result
+
+
+class JSONObjectExtractor:
+    """增量式JSON对象（或数组）提取器，可逐块喂入流式token"""
+    
+    def __init__(self, open_char: str = '{'):
+        """
+        初始化提取器
+        
+        Args:
+            open_char: 提取的结构类型，'{'为对象，'['为数组
+        """
+        self.pattern = STRUCTURAL_TOKENS[open_char]
+        self.open_char = open_char
+        self.close_char = CLOSING_CHARS[open_char]
+        self.buffer = []
+        self.length = 0
+        self.depth = 0
+        self.in_string = False
+        self.pending_escape = False
+        self.start = None
+    
+    def feed(self, chunk: str) -> List[str]:
+        """
+        喂入一段文本
+        
+        只扫描新到达的字符；对象外的前言文字、尾注被忽略，依次返回每个顶层括号平衡的片段。
+        
+        Args:
+            chunk: 新到达的文本片段
+            
+        Returns:
+            本段文本中闭合的完整片段列表（按出现顺序），没有时为空列表
+        """
+        if not chunk:
+            return []
+        offset = self.length
+        self.buffer.append(chunk)
+        self.length += len(chunk)
+        
+        # 上一块以字符串内的反斜杠结尾时，本块首字符是被转义的字符
+        index = 1 if self.pending_escape else 0
+        self.pending_escape = False
+        
+        spans = []
+        end = len(chunk)
+        while index < end:
+            if self.in_string:
+                index = STRING_BODY.match(chunk, index).end()
+                if index >= end:
+                    break
+                if chunk[index] == '\\':
+                    self.pending_escape = True
+                    break
+                self.in_string = False
+                index += 1
+                continue
+            
+            if self.depth == 0:
+                # 括号外的前言/尾注：直接找下一个开括号（其中的引号不算字符串）
+                index = chunk.find(self.open_char, index)
+                if index < 0:
+                    break
+                self.start = offset + index
+                self.depth = 1
+                index += 1
+                continue
+            
+            match = self.pattern.search(chunk, index)
+            if match is None:
+                break
+            token = match.group()
+            index = match.end()
+            if token == '"':
+                try:
+                    index = scanstring(chunk, index, False)[1]
+                except ValueError:
+                    # 字符串在本块内未闭合（或含非法转义），逐字符处理剩余部分
+                    self.in_string = True
+            elif token == self.open_char:
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    spans.append((self.start, offset + index))
+        
+        if not spans:
+            return []
+        text = self.text
+        return [text[begin:end] for begin, end in spans]
+    
+    @property
+    def text(self) -> str:
+        """已接收的全部文本"""
+        return ''.join(self.buffer)
+
+
+class DecisionSchema:
+    """预编译的决策schema，校验并规整字段"""
+    
+    def __init__(self, symbols: List[str] = None):
+        """
+        初始化schema
+        
+        Args:
+            symbols: 允许的代币列表，为None时不校验代币
+        """
+        self.symbols = frozenset(symbols) if symbols else None
+    
+    def validate(self, data: Dict[str, Any]) -> Tuple[Decision, List[str]]:
+        """
+        校验决策字段
+        
+        缺少必要字段视为无效；action/confidence/代币非法时按原有规则规整并给出警告。
+        
+        Args:
+            data: json.loads得到的字典
+            
+        Returns:
+            (决策对象, 警告列表)；无效时决策对象为None
+        """
+        for field in REQUIRED_FIELDS:
+            if field not in data:
+                return None, [f"决策缺少字段: {field}"]
+        
+        warnings = []
+        action = data['action']
+        if not isinstance(action, str) or action not in ACTIONS:
+            warnings.append(f"无效的action: {action}")
+            action = 'HOLD'
+        
+        confidence = data['confidence']
+        if not _is_number(confidence) or not (0 <= confidence <= 1):
+            warnings.append(f"无效的confidence: {confidence}")
+            confidence = 0.5
+        
+        symbol = data['symbol']
+        if symbol is not None and (not isinstance(symbol, str) or
+                                   (self.symbols is not None and symbol not in self.symbols)):
+            warnings.append(f"无效的symbol: {symbol}")
+            symbol, action = None, 'HOLD'
+        
+        rationale = data['rationale']
+        rationale = rationale[:MAX_RATIONALE_LENGTH] if isinstance(rationale, str) else str(rationale)
+        
+        optional = {}
+        for field in OPTIONAL_PRICE_FIELDS:
+            value = data.get(field)
+            if value is None:
+                continue
+            if not _is_number(value) or value < 0:
+                warnings.append(f"无效的{field}: {value}")
+                continue
+            optional[field] = value
+        
+        return Decision(symbol, action, confidence, rationale, **optional), warnings
+
+
+class DecisionParser:
+    """决策解析器（整段文本或流式token）"""
+    
+    def __init__(self, schema: DecisionSchema = None):
+        """
+        初始化解析器
+        
+        Args:
+            schema: 决策schema，为None时使用不校验代币的默认schema
+        """
+        self.schema = schema or DecisionSchema()
+        self.extractor = JSONObjectExtractor()
+        self.decision = None
+        self.error = None
+        self.warnings = []
+    
+    def parse(self, text: str):
+        """
+        解析完整响应文本
+        
+        与流式共用同一个提取器单遍扫描：前言文字、代码围栏和尾随说明都会被跳过，
+        平衡对象不是合法JSON或校验失败时继续尝试后面的对象。
+        
+        Args:
+            text: LLM响应文本
+            
+        Returns:
+            决策对象；解析失败时返回None并设置error
+        """
+        self.extractor = JSONObjectExtractor()
+        self.decision = None
+        self.error = None
+        self.warnings = []
+        
+        decision = self.feed(text)
+        if decision is None and self.error is None:
+            self.error = "响应中没有完整的JSON对象"
+        return decision
+    
+    def feed(self, chunk: str):
+        """
+        喂入一段流式token
+        
+        Args:
+            chunk: 新到达的文本片段
+            
+        Returns:
+            得到合法决策后返回决策对象；否则返回None（已闭合的对象都无效时设置error）
+        """
+        if self.decision is not None:
+            return self.decision
+        
+        for candidate in self.extractor.feed(chunk):
+            error = self.error
+            self.decision = self._decode(candidate)
+            if self.decision is not None:
+                return self.decision
+            # 保留最有信息量的错误：字段校验失败优先于JSON解析失败
+            if error is not None and error != "JSON解析失败":
+                self.error = error
+        return None
+    
+    @property
+    def complete(self) -> bool:
+        """流式模式下是否已得到合法决策"""
+        return self.decision is not None
+    
+    def _decode(self, candidate: str):
+        """JSON解码并按schema校验"""
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            self.error = "JSON解析失败"
+            return None
+        
+        if not isinstance(data, dict):
+            self.error = "JSON不是对象"
+            return None
+        
+        decision, messages = self.schema.validate(data)
+        if decision is None:
+            self.error = messages[0]
+        else:
+            self.error = None
+            self.warnings = messages
+        return decision
+
+
+class BatchDecisionParser:
+    """批量决策解析器：把decisions数组拆回各上下文的决策"""
+    
+    def __init__(self, schemas: Dict[str, DecisionSchema]):
+        """
+        初始化解析器
+        
+        Args:
+            schemas: 各上下文id对应的schema（按该上下文可选代币校验）
+        """
+        self.schemas = schemas
+        self.errors = {}
+        self.warnings = []
+    
+    def parse(self, text: str) -> Dict[str, Decision]:
+        """
+        解析批量响应
+        
+        接受 {"decisions": [...]} 或裸数组；每项按id归属到上下文并单独校验，
+        一项无效不影响其他项。
+        
+        Args:
+            text: LLM响应文本
+            
+        Returns:
+            解析成功的决策{id: Decision}；失败的上下文记录在errors{id: 原因}
+        """
+        self.errors = {}
+        self.warnings = []
+        
+        items = self._load_items(text)
+        if items is None:
+            self.errors = {context_id: "响应中没有decisions数组" for context_id in self.schemas}
+            return {}
+        
+        decisions = {}
+        for item in items:
+            if not isinstance(item, dict) or item.get('id') is None:
+                self.warnings.append("决策项缺少id，已忽略")
+                continue
+            context_id = str(item['id'])
+            schema = self.schemas.get(context_id)
+            if schema is None:
+                self.warnings.append(f"未知的上下文id: {context_id}")
+                continue
+            if context_id in decisions:
+                self.warnings.append(f"上下文{context_id}重复返回，只保留第一项")
+                continue
+            
+            decision, messages = schema.validate(item)
+            if decision is None:
+                self.errors[context_id] = messages[0]
+                continue
+            self.errors.pop(context_id, None)
+            decisions[context_id] = decision
+            self.warnings.extend(f"{context_id}: {message}" for message in messages)
+        
+        for context_id in self.schemas:
+            if context_id not in decisions and context_id not in self.errors:
+                self.errors[context_id] = "响应中缺少该上下文"
+        return decisions
+    
+    def _load_items(self, text: str):
+        """
+        取出决策数组
+        
+        Returns:
+            决策项列表；找不到时返回None
+        """
+        # 快速路径：首尾括号之间恰好是包装对象或裸数组
+        for open_char, close_char in (('{', '}'), ('[', ']')):
+            begin, end = text.find(open_char), text.rfind(close_char)
+            if 0 <= begin < end:
+                try:
+                    data = json.loads(text[begin:end + 1])
+                except ValueError:
+                    continue
+                if isinstance(data, dict):
+                    data = data.get('decisions')
+                if isinstance(data, list):
+                    return data
+        
+        # 前言/尾注中带括号时逐个尝试括号平衡的包装对象，再尝试裸数组
+        for open_char in ('{', '['):
+            for candidate in JSONObjectExtractor(open_char).feed(text):
+                try:
+                    data = json.loads(candidate)
+                except ValueError:
+                    continue
+                if isinstance(data, dict):
+                    data = data.get('decisions')
+                if isinstance(data, list) and any(isinstance(item, dict) for item in data):
+                    return data
+        return None
+
+
+def _is_number(value: Any) -> bool:
+    """是否为数值（排除bool）"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
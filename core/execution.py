@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟撮合引擎
+按行情快照成交决策，为每个模型维护独立账本
+"""
+
+import time
+from typing import Dict, List, Any
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+
+class LedgerBook:
+    """多模型账本（数组存储，行=模型，列=代币）"""
+    
+    def __init__(self, symbols: List[str], initial_cash: float = 10000.0, capacity: int = 8):
+        """
+        初始化账本
+        
+        Args:
+            symbols: 代币符号列表
+            initial_cash: 每个模型的初始资金（USDT）
+            capacity: 预分配的模型行数，不足时自动翻倍
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.initial_cash = initial_cash
+        self.model_names = []
+        self.model_index = {}
+        
+        n_symbols = len(self.symbols)
+        self.cash = np.zeros(capacity)
+        self.fees_paid = np.zeros(capacity)
+        self.realized_pnl = np.zeros(capacity)
+        self.qty = np.zeros((capacity, n_symbols))
+        self.avg_px = np.zeros((capacity, n_symbols))
+    
+    @property
+    def size(self) -> int:
+        """已注册模型数"""
+        return len(self.model_names)
+    
+    def add_model(self, model_name: str) -> int:
+        """
+        注册模型账本
+        
+        Args:
+            model_name: 模型名称
+            
+        Returns:
+            模型所在行号
+        """
+        if model_name in self.model_index:
+            return self.model_index[model_name]
+        
+        row = self.size
+        if row >= len(self.cash):
+            self._grow(max(2 * len(self.cash), 1))
+        
+        self.model_names.append(model_name)
+        self.model_index[model_name] = row
+        self.cash[row] = self.initial_cash
+        return row
+    
+    def _grow(self, capacity: int):
+        """扩容账本数组"""
+        def grow(array):
+            grown = np.zeros((capacity,) + array.shape[1:])
+            grown[:len(array)] = array
+            return grown
+        
+        self.cash = grow(self.cash)
+        self.fees_paid = grow(self.fees_paid)
+        self.realized_pnl = grow(self.realized_pnl)
+        self.qty = grow(self.qty)
+        self.avg_px = grow(self.avg_px)
+    
+    def price_vector(self, prices: Dict[str, float]):
+        """
+        将价格字典转换为按代币列排列的数组
+        
+        Args:
+            prices: 价格字典
+            
+        Returns:
+            价格数组，缺失价格为0
+        """
+        return np.array([prices.get(symbol, 0.0) for symbol in self.symbols])
+    
+    def mark_to_market(self, price_vector) -> Any:
+        """
+        按最新价计算所有模型净值（一次矩阵运算）
+        
+        Args:
+            price_vector: 价格数组（与symbols对齐）
+            
+        Returns:
+            净值数组（与model_names对齐）
+        """
+        n = self.size
+        return self.cash[:n] + self.qty[:n] @ price_vector
+    
+    def get_account(self, model_name: str, prices: Dict[str, float] = None) -> Dict[str, Any]:
+        """
+        获取单个模型的账户信息
+        
+        Args:
+            model_name: 模型名称
+            prices: 价格字典，用于计算净值和浮盈
+            
+        Returns:
+            账户字典{cash, positions, nav, fees_paid, realized_pnl}
+        """
+        row = self.model_index[model_name]
+        positions = []
+        for col in np.flatnonzero(self.qty[row]):
+            positions.append({
+                'symbol': self.symbols[col],
+                'qty': float(self.qty[row, col]),
+                'avg_px': float(self.avg_px[row, col])
+            })
+        
+        account = {
+            'cash': float(self.cash[row]),
+            'positions': positions,
+            'fees_paid': float(self.fees_paid[row]),
+            'realized_pnl': float(self.realized_pnl[row])
+        }
+        if prices is not None:
+            account['nav'] = float(self.cash[row] + self.qty[row] @ self.price_vector(prices))
+        return account
+
+
+class PaperTradingEngine:
+    """模拟撮合引擎（现货、只做多、市价单+固定滑点）"""
+    
+    def __init__(self, symbols: List[str], initial_cash: float = 10000.0, fee_bp: float = 5.0,
+                 slippage_bp: float = 10.0, default_position_pct: float = 0.2, verbose: bool = True):
+        """
+        初始化模拟撮合引擎
+        
+        Args:
+            symbols: 代币符号列表
+            initial_cash: 每个模型的初始资金（USDT）
+            fee_bp: 手续费（基点），默认万5
+            slippage_bp: 滑点（基点），默认10bp
+            default_position_pct: 决策未给出position_size_pct时的下单比例（占净值）
+            verbose: 是否打印未成交原因（回测时关闭）
+        """
+        self.ledger = LedgerBook(symbols, initial_cash)
+        self.fee_rate = fee_bp / 10000.0
+        self.slippage_rate = slippage_bp / 10000.0
+        self.default_position_pct = default_position_pct
+        self.verbose = verbose
+        self.fills = []
+    
+    def register_model(self, model_name: str):
+        """
+        注册模型账本
+        
+        Args:
+            model_name: 模型名称
+        """
+        self.ledger.add_model(model_name)
+    
+    def execute(self, model_name: str, decision: Dict[str, Any], snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按行情快照成交一个决策
+        
+        Args:
+            model_name: 模型名称
+            decision: DecisionMaker.parse_decision返回的决策
+            snapshot: 行情快照{timestamp, prices}
+            
+        Returns:
+            成交记录；HOLD或无法成交时返回None
+        """
+        action = decision.get('action', 'HOLD')
+        symbol = decision.get('symbol')
+        if action == 'HOLD':
+            return None
+        
+        if symbol not in self.ledger.symbol_index:
+            if self.verbose:
+                print(f"⚠️ {model_name}决策代币无效: {symbol}")
+            return None
+        
+        price = snapshot['prices'].get(symbol, 0.0)
+        if price <= 0:
+            if self.verbose:
+                print(f"⚠️ {symbol}无有效价格，{model_name}的{action}未成交")
+            return None
+        
+        row = self.ledger.add_model(model_name)
+        col = self.ledger.symbol_index[symbol]
+        timestamp = snapshot.get('timestamp', time.time())
+        
+        if action == 'BUY':
+            fill = self._buy(row, col, price, self._position_pct(decision), snapshot['prices'])
+        else:
+            fill = self._sell(row, col, price)
+        
+        if fill is None:
+            return None
+        
+        fill.update({'model': model_name, 'symbol': symbol, 'side': action, 'timestamp': timestamp})
+        self.fills.append(fill)
+        return fill
+    
+    def execute_all(self, decisions: Dict[str, Dict[str, Any]], snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        成交一个周期内所有模型的决策
+        
+        Args:
+            decisions: 决策字典{model_name: decision}
+            snapshot: 行情快照
+            
+        Returns:
+            成交记录列表
+        """
+        fills = []
+        for model_name, decision in decisions.items():
+            fill = self.execute(model_name, decision, snapshot)
+            if fill is not None:
+                fills.append(fill)
+        return fills
+    
+    def mark_to_market(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """
+        计算所有模型的净值
+        
+        Args:
+            prices: 价格字典
+            
+        Returns:
+            净值字典{model_name: nav}
+        """
+        navs = self.ledger.mark_to_market(self.ledger.price_vector(prices))
+        return dict(zip(self.ledger.model_names, navs.tolist()))
+    
+    def _position_pct(self, decision: Dict[str, Any]) -> float:
+        """读取下单比例，兼容0-1小数和0-100百分数"""
+        pct = decision.get('position_size_pct')
+        if not isinstance(pct, (int, float)) or pct <= 0:
+            return self.default_position_pct
+        return pct / 100.0 if pct > 1 else float(pct)
+    
+    def _buy(self, row: int, col: int, price: float, pct: float, prices: Dict[str, float]):
+        """按净值比例买入"""
+        ledger = self.ledger
+        nav = ledger.cash[row] + ledger.qty[row] @ ledger.price_vector(prices)
+        notional = float(min(nav * pct, ledger.cash[row] / (1 + self.fee_rate)))
+        if notional <= 0:
+            if self.verbose:
+                print(f"⚠️ {ledger.model_names[row]}现金不足，买入未成交")
+            return None
+        
+        fill_px = price * (1 + self.slippage_rate)
+        qty = notional / fill_px
+        fee = notional * self.fee_rate
+        
+        held = ledger.qty[row, col]
+        ledger.avg_px[row, col] = (held * ledger.avg_px[row, col] + qty * fill_px) / (held + qty)
+        ledger.qty[row, col] = held + qty
+        ledger.cash[row] -= notional + fee
+        ledger.fees_paid[row] += fee
+        
+        return {'qty': qty, 'price': fill_px, 'notional': notional, 'fee': fee}
+    
+    def _sell(self, row: int, col: int, price: float):
+        """平掉该代币全部持仓（只做多）"""
+        ledger = self.ledger
+        qty = float(ledger.qty[row, col])
+        if qty <= 0:
+            return None
+        
+        fill_px = price * (1 - self.slippage_rate)
+        notional = qty * fill_px
+        fee = notional * self.fee_rate
+        
+        ledger.realized_pnl[row] += (fill_px - ledger.avg_px[row, col]) * qty - fee
+        ledger.cash[row] += notional - fee
+        ledger.fees_paid[row] += fee
+        ledger.qty[row, col] = 0.0
+        ledger.avg_px[row, col] = 0.0
+        
+        return {'qty': qty, 'price': fill_px, 'notional': notional, 'fee': fee}
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+决策审计日志
+按周期记录行情快照、prompt、原始响应、解析后的决策与耗时；
+后台线程批量追加为Arrow IPC列式分段，SQLite索引记录每条记录所在批次的字节偏移，查询时直接定位读取，无需全量扫描
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any
+
+try:
+    import pyarrow as pa
+except ImportError:
+    print("❌ 请安装pyarrow: pip install pyarrow")
+    pa = None
+
+# 日志列（按写入顺序）；快照、决策、耗时以JSON字符串存储
+JOURNAL_COLUMNS = ('ts', 'cycle', 'model', 'prompt', 'response', 'decision', 'snapshot', 'latency', 'timings')
+JSON_COLUMNS = ('decision', 'snapshot', 'timings')
+
+
+class DecisionJournal:
+    """追加写入的列式决策审计日志"""
+    
+    def __init__(self, directory: str = "journal", batch_size: int = 64, flush_interval: float = 5.0,
+                 segment_rows: int = 10000, queue_size: int = 10000):
+        """
+        初始化审计日志
+        
+        Args:
+            directory: 日志目录（分段文件与索引库）
+            batch_size: 攒够多少条记录立即写一批
+            flush_interval: 最长多久写一次（秒）
+            segment_rows: 单个分段文件的最大行数，超过后滚动到新分段
+            queue_size: 待写队列上限，写满时丢弃新记录而不阻塞交易循环
+        """
+        if pa is None:
+            raise ImportError("pyarrow库未安装")
+        
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+        os.makedirs(directory, exist_ok=True)
+        
+        self.schema = pa.schema([
+            ('ts', pa.float64()),
+            ('cycle', pa.int64()),
+            ('model', pa.string()),
+            ('prompt', pa.string()),
+            ('response', pa.string()),
+            ('decision', pa.string()),
+            ('snapshot', pa.string()),
+            ('latency', pa.float64()),
+            ('timings', pa.string()),
+        ])
+        try:
+            self.write_options = pa.ipc.IpcWriteOptions(compression='zstd')
+        except Exception:
+            self.write_options = pa.ipc.IpcWriteOptions()
+        
+        self.index = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self.index_lock = threading.Lock()
+        with self.index_lock:
+            self.index.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "ts REAL NOT NULL, model TEXT NOT NULL, cycle INTEGER, "
+                "segment TEXT NOT NULL, batch INTEGER NOT NULL, row INTEGER NOT NULL, byte_offset INTEGER)"
+            )
+            # 旧版索引没有byte_offset列，其记录查询时回退为顺序读取分段
+            columns = [column[1] for column in self.index.execute("PRAGMA table_info(entries)")]
+            if 'byte_offset' not in columns:
+                self.index.execute("ALTER TABLE entries ADD COLUMN byte_offset INTEGER")
+            self.index.execute("CREATE INDEX IF NOT EXISTS idx_entries_ts ON entries (ts)")
+            self.index.execute("CREATE INDEX IF NOT EXISTS idx_entries_model_ts ON entries (model, ts)")
+            self.index.commit()
+        
+        # 当前分段（仅后台线程访问）
+        self.writer = None
+        self.sink = None
+        self.segment = None
+        self.segment_batches = 0
+        self.segment_written = 0
+        
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.dropped = 0
+        self.written = 0
+        self.thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self.thread.start()
+    
+    def record(self, entry: Dict[str, Any]) -> bool:
+        """
+        提交一条记录（非阻塞）
+        
+        Args:
+            entry: 记录字典，键见JOURNAL_COLUMNS
+            
+        Returns:
+            是否入队；队列已满时丢弃并返回False
+        """
+        try:
+            self.queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+    
+    def record_cycle(self, result: Dict[str, Any], decision_makers: List[Any]):
+        """
+        记录一个周期内所有模型的决策
+        
+        Args:
+            result: CycleScheduler.run_cycle返回的周期结果
+            decision_makers: 决策引擎列表（读取各自最近一次的prompt和原始响应）
+        """
+        decisions = result['decisions']
+        timings = result['timings']
+        ts = result['snapshot'].get('timestamp', time.time())
+        for decision_maker in decision_makers:
+            model_name = decision_maker.model_name
+            if model_name not in decisions:
+                continue
+            decision = decisions[model_name]
+            self.record({
+                'ts': ts,
+                'cycle': result['cycle'],
+                'model': model_name,
+                'prompt': decision_maker.last_prompt,
+                'response': decision_maker.last_response,
+                'decision': decision.to_dict() if hasattr(decision, 'to_dict') else dict(decision),
+                'snapshot': result['snapshot'],
+                'latency': result['latencies'].get(model_name, 0.0),
+                'timings': dict(timings, **decision_maker.last_timings)
+            })
+    
+    def _run(self):
+        """后台写入线程：攒批或到时即写，停止标记置位后写完队列中剩余的记录"""
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            stopping = self.stop_event.is_set()
+            drained = False
+            try:
+                timeout = 0.0 if stopping else max(deadline - time.monotonic(), 0.0)
+                entry = self.queue.get(timeout=timeout)
+                if entry is not None:
+                    pending.append(entry)
+            except queue.Empty:
+                drained = stopping
+            
+            expired = time.monotonic() >= deadline
+            if pending and (len(pending) >= self.batch_size or expired or drained):
+                try:
+                    self._write_batch(pending)
+                except Exception as e:
+                    print(f"❌ 审计日志写入失败: {e}")
+                pending = []
+            if expired:
+                deadline = time.monotonic() + self.flush_interval
+            if drained:
+                break
+        
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            self.writer = None
+    
+    def _write_batch(self, entries: List[Dict[str, Any]]):
+        """把一批记录写成一个RecordBatch并更新索引（先落盘后写索引，索引不会指向未写入的数据）"""
+        if self.writer is None or self.segment_written >= self.segment_rows:
+            self._open_segment()
+        
+        columns = {name: [] for name in JOURNAL_COLUMNS}
+        for entry in entries:
+            for name in JOURNAL_COLUMNS:
+                value = entry.get(name)
+                if name in JSON_COLUMNS and value is not None:
+                    value = json.dumps(value, ensure_ascii=False, default=float)
+                columns[name].append(value)
+        
+        batch = pa.RecordBatch.from_arrays([pa.array(columns[name], type=self.schema.field(name).type)
+                                            for name in JOURNAL_COLUMNS], schema=self.schema)
+        # 分段的第一个批次之前还有schema消息，读取时跳过
+        offset = self.sink.tell()
+        self.writer.write_batch(batch)
+        self.sink.flush()
+        
+        batch_index = self.segment_batches
+        rows = [(entry.get('ts'), entry.get('model'), entry.get('cycle'), self.segment, batch_index, row, offset)
+                for row, entry in enumerate(entries)]
+        with self.index_lock:
+            self.index.executemany(
+                "INSERT INTO entries (ts, model, cycle, segment, batch, row, byte_offset) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.index.commit()
+        
+        self.segment_batches += 1
+        self.segment_written += len(entries)
+        self.written += len(entries)
+    
+    def _open_segment(self):
+        """关闭当前分段并新建一个分段文件"""
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+        self.segment = f"segment-{time.strftime('%Y%m%d-%H%M%S')}-{self.written:08d}.arrow"
+        self.sink = pa.OSFile(os.path.join(self.directory, self.segment), 'wb')
+        self.writer = pa.ipc.new_stream(self.sink, self.schema, options=self.write_options)
+        self.segment_batches = 0
+        self.segment_written = 0
+    
+    def query(self, model: str = None, start: float = None, end: float = None,
+              limit: int = None) -> List[Dict[str, Any]]:
+        """
+        按模型和时间范围查询记录（先查索引，按字节偏移直接读取命中的批次）
+        
+        Args:
+            model: 模型名称，为None时不限
+            start: 起始时间戳（含）
+            end: 结束时间戳（含）
+            limit: 最多返回条数
+            
+        Returns:
+            记录列表，按时间升序，JSON列已解码
+        """
+        conditions, params = [], []
+        if model is not None:
+            conditions.append("model = ?")
+            params.append(model)
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("ts <= ?")
+            params.append(end)
+        
+        sql = "SELECT segment, batch, row, byte_offset FROM entries"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY ts, rowid"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        
+        with self.index_lock:
+            locations = self.index.execute(sql, params).fetchall()
+        
+        # 按分段、批次分组，每个批次只读一次
+        wanted = {}
+        for segment, batch, row, offset in locations:
+            rows = wanted.setdefault(segment, {}).setdefault(batch, (offset, []))[1]
+            rows.append(row)
+        
+        records = {}
+        for segment, batches in wanted.items():
+            with pa.OSFile(os.path.join(self.directory, segment), 'rb') as source:
+                for batch_index, record_batch in self._read_batches(source, batches):
+                    rows = batches[batch_index][1]
+                    for row, record in zip(rows, record_batch.take(pa.array(rows)).to_pylist()):
+                        records[(segment, batch_index, row)] = record
+        
+        results = []
+        for segment, batch, row, _ in locations:
+            record = records[(segment, batch, row)]
+            for name in JSON_COLUMNS:
+                if record[name] is not None:
+                    record[name] = json.loads(record[name])
+            results.append(record)
+        return results
+    
+    def _read_batches(self, source, batches: Dict[int, tuple]):
+        """
+        读取分段中指定的批次
+        
+        Args:
+            source: 已打开的分段文件
+            batches: {批次序号: (字节偏移, 行号列表)}，偏移为None（旧版索引）时顺序读到该批次
+            
+        Yields:
+            (批次序号, RecordBatch)
+        """
+        for batch_index in sorted(batches):
+            offset = batches[batch_index][0]
+            if offset is None:
+                continue
+            source.seek(offset)
+            message = pa.ipc.read_message(source)
+            if message.type == 'schema':
+                message = pa.ipc.read_message(source)
+            yield batch_index, pa.ipc.read_record_batch(message, self.schema)
+        
+        legacy = {batch_index for batch_index, (offset, _) in batches.items() if offset is None}
+        if legacy:
+            source.seek(0)
+            for batch_index, record_batch in enumerate(pa.ipc.open_stream(source)):
+                if batch_index in legacy:
+                    yield batch_index, record_batch
+                if batch_index >= max(legacy):
+                    break
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取写入统计
+        
+        Returns:
+            统计字典{written, pending, dropped}
+        """
+        return {'written': self.written, 'pending': self.queue.qsize(), 'dropped': self.dropped}
+    
+    def close(self, timeout: float = 10.0):
+        """
+        停止后台线程，写完队列中剩余的记录并关闭分段
+        
+        后台线程在timeout内未退出时保留索引连接（线程仍在写入），不会阻塞调用方。
+        
+        Args:
+            timeout: 等待写完的最长时间（秒）
+        """
+        self.stop_event.set()
+        try:
+            # 唤醒等待中的后台线程；队列已满时线程正忙于写入，会自行看到停止标记
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            print(f"⚠️ 审计日志{timeout:g}秒内未写完，剩余{self.queue.qsize()}条在后台继续写入")
+            return
+        with self.index_lock:
+            self.index.close()
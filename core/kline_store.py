@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史K线存储
+按代币、按UTC日分区的1分钟OHLCV列式文件：每个日文件是6列×1440个分钟槽位的float64数组，
+可直接内存映射；槽位只写一次（已有K线不覆盖，补齐的无成交K线除外），同步时只向交易所请求缺失的分钟段，
+读取时单日内连续的区间返回零拷贝视图
+"""
+
+import calendar
+import os
+import threading
+import time
+from typing import Dict, List, Any, Tuple
+
+from adapters.exchange_api import ExchangeAPI
+from core.backtest import BarData, CLOSE as OHLCV_CLOSE
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+# 列顺序与BarRingBuffer一致：ts（秒）、开、高、低、收、量
+KLINE_COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+TS, CLOSE, VOLUME = 0, 4, 5
+
+MINUTE_MS = 60000
+MINUTES_PER_DAY = 1440
+DAY_MS = MINUTE_MS * MINUTES_PER_DAY
+
+# 日文件扩展名
+PARTITION_SUFFIX = '.f8'
+
+
+class KlineStore:
+    """本地1分钟K线列式存储"""
+    
+    def __init__(self, root: str):
+        """
+        初始化存储
+        
+        Args:
+            root: 存储根目录，布局为 root/<symbol>/<YYYYMMDD>.f8
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.root = root
+        self.maps = {}
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+    
+    def _path(self, symbol: str, day: int) -> str:
+        """日分区文件路径（day为自1970-01-01起的UTC日序号）"""
+        return os.path.join(self.root, symbol, time.strftime('%Y%m%d', time.gmtime(day * 86400)) + PARTITION_SUFFIX)
+    
+    def _partition(self, symbol: str, day: int, create: bool = False):
+        """
+        打开日分区的内存映射
+        
+        Args:
+            symbol: 代币符号
+            day: UTC日序号
+            create: 文件不存在时是否创建（全部槽位为NaN）
+            
+        Returns:
+            形状(6, 1440)的内存映射数组；不存在且create为False时返回None
+        """
+        key = (symbol, day)
+        partition = self.maps.get(key)
+        if partition is not None:
+            return partition
+        
+        path = self._path(symbol, day)
+        if not os.path.exists(path):
+            if not create:
+                return None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.full((len(KLINE_COLUMNS), MINUTES_PER_DAY), np.nan).tofile(path)
+        
+        partition = np.memmap(path, dtype=np.float64, mode='r+', shape=(len(KLINE_COLUMNS), MINUTES_PER_DAY))
+        self.maps[key] = partition
+        return partition
+    
+    def write(self, symbol: str, rows) -> int:
+        """
+        写入K线（已存在的分钟不覆盖）
+        
+        补齐的无成交K线成交量记为NaN，之后写入的真实K线可以覆盖它们。
+        
+        Args:
+            symbol: 代币符号
+            rows: 形状(n, 6)的数组，列为ts（秒）、开、高、低、收、量（NaN表示补齐的K线）
+            
+        Returns:
+            新写入的K线根数
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(KLINE_COLUMNS))
+        if len(rows) == 0:
+            return 0
+        
+        minutes = (rows[:, TS] * 1000 // MINUTE_MS).astype(np.int64)
+        days = minutes // MINUTES_PER_DAY
+        written = 0
+        with self.lock:
+            for day in np.unique(days).tolist():
+                in_day = days == day
+                partition = self._partition(symbol, day, create=True)
+                slots = minutes[in_day] - day * MINUTES_PER_DAY
+                fresh = np.isnan(partition[TS, slots])
+                fresh |= np.isnan(partition[VOLUME, slots]) & ~np.isnan(rows[in_day][:, VOLUME])
+                if not fresh.any():
+                    continue
+                partition[:, slots[fresh]] = rows[in_day][fresh].T
+                written += int(fresh.sum())
+        return written
+    
+    def missing_ranges(self, symbol: str, start_ms: int, end_ms: int,
+                       include_quiet: bool = False) -> List[Tuple[int, int]]:
+        """
+        找出区间内缺失的分钟段
+        
+        Args:
+            symbol: 代币符号
+            start_ms: 起始时间（毫秒，含）
+            end_ms: 结束时间（毫秒，不含）
+            include_quiet: 是否把补齐的无成交K线也算作缺失（重新向交易所确认）
+            
+        Returns:
+            缺失段列表[(start_ms, end_ms)]，相邻缺失分钟合并为一段
+        """
+        first, last = -(-start_ms // MINUTE_MS), -(-end_ms // MINUTE_MS)
+        if last <= first:
+            return []
+        
+        missing = np.ones(last - first, dtype=bool)
+        for day in range(first // MINUTES_PER_DAY, (last - 1) // MINUTES_PER_DAY + 1):
+            partition = self._partition(symbol, day)
+            if partition is None:
+                continue
+            lo, hi = max(first, day * MINUTES_PER_DAY), min(last, (day + 1) * MINUTES_PER_DAY)
+            column = VOLUME if include_quiet else TS
+            missing[lo - first:hi - first] = np.isnan(partition[column, lo - day * MINUTES_PER_DAY:hi - day * MINUTES_PER_DAY])
+        
+        # 缺失标记的上升沿/下降沿即各段起止
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], missing.view(np.int8), [0]))))
+        return [((first + lo) * MINUTE_MS, (first + hi) * MINUTE_MS) for lo, hi in edges.reshape(-1, 2).tolist()]
+    
+    def sync(self, exchange_api: ExchangeAPI, symbols: List[str], start_ms: int, end_ms: int = None,
+             limit: int = 1000, refetch_quiet: bool = False) -> Dict[str, int]:
+        """
+        增量同步：只请求缺失的分钟段
+        
+        只同步已收盘的K线（end_ms截断到当前分钟）。返回的K线少于请求的区间时（分页截断），
+        从最后一根之后继续请求。同一次响应中两根真实K线之间缺失的分钟视为无成交，
+        用上一根收盘价补齐（成交量为NaN，可被之后的真实K线覆盖），避免下次重复请求；
+        最后一根真实K线之后的分钟不补，留待下次同步。
+        
+        Args:
+            exchange_api: 交易所API（或提供get_klines的替身）
+            symbols: 代币列表
+            start_ms: 起始时间（毫秒）
+            end_ms: 结束时间（毫秒，不含），默认为当前分钟
+            limit: 单次请求的最大K线根数
+            refetch_quiet: 是否重新请求已补齐的无成交分钟
+            
+        Returns:
+            各代币新写入的K线根数{symbol: count}
+        """
+        current_minute = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+        end_ms = min(end_ms if end_ms is not None else current_minute, current_minute)
+        
+        written = {}
+        for symbol in symbols:
+            count = 0
+            for lo, hi in self.missing_ranges(symbol, start_ms, end_ms, include_quiet=refetch_quiet):
+                cursor = lo
+                while cursor < hi:
+                    page_end = min(cursor + limit * MINUTE_MS, hi)
+                    rows = exchange_api.get_klines(symbol, cursor, page_end, limit=limit)
+                    if rows is None:
+                        break
+                    rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(KLINE_COLUMNS))
+                    if len(rows) == 0:
+                        cursor = page_end
+                        continue
+                    count += self.write(symbol, rows)
+                    last_ms = int(np.max(rows[:, TS])) * 1000
+                    count += self._fill_quiet_minutes(symbol, cursor, last_ms)
+                    cursor = last_ms + MINUTE_MS if cursor <= last_ms < page_end - MINUTE_MS else page_end
+            written[symbol] = count
+            if count:
+                print(f"📥 {symbol}: 同步 {count} 根K线")
+        return written
+    
+    def _fill_quiet_minutes(self, symbol: str, start_ms: int, end_ms: int) -> int:
+        """用前一根收盘价补齐已确认无成交的分钟（end_ms为同一响应中最后一根真实K线的时间）"""
+        filled = 0
+        for lo, hi in self.missing_ranges(symbol, start_ms, end_ms):
+            previous = self.read(symbol, lo - MINUTE_MS, lo)
+            if len(previous) == 0:
+                continue
+            close = previous[-1, CLOSE]
+            ts = np.arange(lo, hi, MINUTE_MS, dtype=np.float64) / 1000.0
+            rows = np.column_stack((ts, np.full((len(ts), 4), close), np.full(len(ts), np.nan)))
+            filled += self.write(symbol, rows)
+        return filled
+    
+    def read(self, symbol: str, start_ms: int, end_ms: int):
+        """
+        读取区间内的K线
+        
+        区间落在单个日分区内、没有缺失且没有补齐的K线时，返回内存映射的转置视图（零拷贝）；
+        跨日或有缺失时拼接并去掉缺失行，补齐K线的成交量返回0。
+        
+        Args:
+            symbol: 代币符号
+            start_ms: 起始时间（毫秒，含）
+            end_ms: 结束时间（毫秒，不含）
+            
+        Returns:
+            形状(n, 6)的数组，列为ts（秒）、开、高、低、收、量，可直接用于BarRingBuffer.seed
+        """
+        first, last = -(-start_ms // MINUTE_MS), -(-end_ms // MINUTE_MS)
+        empty = np.empty((0, len(KLINE_COLUMNS)))
+        if last <= first:
+            return empty
+        
+        pieces = []
+        for day in range(first // MINUTES_PER_DAY, (last - 1) // MINUTES_PER_DAY + 1):
+            partition = self._partition(symbol, day)
+            if partition is None:
+                continue
+            lo = max(first, day * MINUTES_PER_DAY) - day * MINUTES_PER_DAY
+            hi = min(last, (day + 1) * MINUTES_PER_DAY) - day * MINUTES_PER_DAY
+            pieces.append(partition[:, lo:hi].T)
+        
+        if not pieces:
+            return empty
+        bars = pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+        present = ~np.isnan(bars[:, TS])
+        if not present.all():
+            bars = bars[present]
+        quiet = np.isnan(bars[:, VOLUME])
+        if quiet.any():
+            bars = bars.copy() if bars.base is not None else bars
+            bars[quiet, VOLUME] = 0.0
+        return bars
+    
+    def latest(self, symbol: str, count: int, end_ms: int = None):
+        """
+        最近count根K线
+        
+        Args:
+            symbol: 代币符号
+            count: K线根数
+            end_ms: 截止时间（毫秒，不含），默认为当前分钟
+            
+        Returns:
+            形状(≤count, 6)的数组
+        """
+        if end_ms is None:
+            end_ms = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+        return self.read(symbol, end_ms - count * MINUTE_MS, end_ms)
+    
+    def to_bar_data(self, symbols: List[str], start_ms: int, end_ms: int) -> BarData:
+        """
+        组装回测用的多代币对齐K线
+        
+        Args:
+            symbols: 代币列表
+            start_ms: 起始时间（毫秒，含）
+            end_ms: 结束时间（毫秒，不含）
+            
+        Returns:
+            BarData实例；缺失分钟沿用上一根收盘价、成交量为0，区间开头缺失的K线被丢弃
+        """
+        first, last = -(-start_ms // MINUTE_MS), -(-end_ms // MINUTE_MS)
+        n = max(last - first, 0)
+        ohlcv = np.full((n, len(symbols), 5), np.nan)
+        
+        for col, symbol in enumerate(symbols):
+            bars = self.read(symbol, first * MINUTE_MS, last * MINUTE_MS)
+            slots = (bars[:, TS] * 1000 // MINUTE_MS).astype(np.int64) - first
+            ohlcv[slots, col] = bars[:, 1:]
+        
+        # 缺失分钟：价格沿用上一根收盘价，成交量为0
+        missing = np.isnan(ohlcv[:, :, OHLCV_CLOSE])
+        if missing.any():
+            close = ohlcv[:, :, OHLCV_CLOSE]
+            valid_index = np.where(~missing, np.arange(n)[:, None], 0)
+            np.maximum.accumulate(valid_index, axis=0, out=valid_index)
+            filled = close[valid_index, np.arange(len(symbols))]
+            for field in range(4):
+                ohlcv[:, :, field] = np.where(missing, filled, ohlcv[:, :, field])
+            ohlcv[:, :, 4] = np.where(missing, 0.0, ohlcv[:, :, 4])
+        
+        # 开头还没有任何K线的代币行无法回填，从所有代币都有价格的第一根开始
+        complete = ~np.isnan(ohlcv[:, :, OHLCV_CLOSE]).any(axis=1)
+        start = int(np.argmax(complete)) if complete.any() else n
+        timestamps = (np.arange(first, last, dtype=np.int64) * MINUTE_MS)[start:]
+        return BarData(timestamps, symbols, ohlcv[start:])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        存储统计
+        
+        Returns:
+            {symbols, partitions, bars, bytes}
+        """
+        stats = {'symbols': 0, 'partitions': 0, 'bars': 0, 'bytes': 0}
+        for symbol in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, symbol)
+            if not os.path.isdir(directory):
+                continue
+            stats['symbols'] += 1
+            for name in os.listdir(directory):
+                if not name.endswith(PARTITION_SUFFIX):
+                    continue
+                path = os.path.join(directory, name)
+                partition = np.memmap(path, dtype=np.float64, mode='r', shape=(len(KLINE_COLUMNS), MINUTES_PER_DAY))
+                stats['partitions'] += 1
+                stats['bars'] += int(np.count_nonzero(~np.isnan(partition[TS])))
+                stats['bytes'] += os.path.getsize(path)
+        return stats
+    
+    def flush(self):
+        """把内存映射的改动刷到磁盘"""
+        with self.lock:
+            for partition in self.maps.values():
+                partition.flush()
+
+
+def parse_date_ms(value: str) -> int:
+    """把YYYY-MM-DD（UTC）转换为毫秒时间戳"""
+    return int(calendar.timegm(time.strptime(value, '%Y-%m-%d'))) * 1000
+
+
+def main():
+    """命令行入口：python -m core.kline_store <目录> --days 7 [--mock]"""
+    import argparse
+    from adapters.mock_exchange import MockExchangeClient
+    
+    parser = argparse.ArgumentParser(description="Alpha Arena 历史K线同步")
+    parser.add_argument('root', help="K线存储目录")
+    parser.add_argument('--symbols', default='BTCUSDT,ETHUSDT,XRPUSDT,BNBUSDT,SOLUSDT', help="代币列表（逗号分隔）")
+    parser.add_argument('--days', type=float, default=1.0, help="同步最近多少天")
+    parser.add_argument('--start', help="起始日期YYYY-MM-DD（UTC），优先于--days")
+    parser.add_argument('--end', help="结束日期YYYY-MM-DD（UTC，不含），默认为当前分钟")
+    parser.add_argument('--mock', action='store_true', help="使用模拟交易所（离线生成确定性K线）")
+    parser.add_argument('--refetch-quiet', action='store_true', help="重新请求已补齐的无成交分钟")
+    args = parser.parse_args()
+    
+    symbols = [symbol.strip() for symbol in args.symbols.split(',') if symbol.strip()]
+    end_ms = parse_date_ms(args.end) if args.end else int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+    start_ms = parse_date_ms(args.start) if args.start else end_ms - int(args.days * DAY_MS)
+    
+    if args.mock:
+        exchange_api = ExchangeAPI(client=MockExchangeClient(latency=0.0, jitter=0.0), verbose=False)
+    else:
+        exchange_api = ExchangeAPI(verbose=False)
+    
+    store = KlineStore(args.root)
+    start = time.perf_counter()
+    written = store.sync(exchange_api, symbols, start_ms, end_ms, refetch_quiet=args.refetch_quiet)
+    store.flush()
+    stats = store.get_stats()
+    print(f"✅ 同步完成: 新增 {sum(written.values())} 根K线，耗时 {time.perf_counter() - start:.2f}s")
+    print(f"🗂️ 存储: {stats['symbols']}个代币，{stats['partitions']}个日分区，"
+          f"{stats['bars']}根K线，{stats['bytes'] / 1024 / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
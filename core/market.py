@@ -5,17 +5,83 @@
 获取和管理市场数据
 """
 
-from typing import Dict, List
+import os
+import time
+from typing import Dict, List, Any
 from adapters.exchange_api import ExchangeAPI
+from adapters.ticker_stream import TickerStream
+from core.bars import BarStore
+from core.kline_store import KlineStore, MINUTE_MS
 
 
 class MarketData:
     """市场数据管理器"""
     
-    def __init__(self):
-        """初始化市场数据管理器"""
-        self.exchange_api = ExchangeAPI()
-        self.symbols = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'BNBUSDT', 'SOLUSDT']
+    def __init__(self, ticker_stream: TickerStream = None, tick_ttl: float = None, bar_capacity: int = 60,
+                 exchange_api: ExchangeAPI = None, symbols: List[str] = None, kline_store: KlineStore = None):
+        """
+        初始化市场数据管理器
+        
+        Args:
+            ticker_stream: 实时行情推送，为None时每次都走REST
+            tick_ttl: 缓存tick的有效期（秒），超过后回退到REST，默认读取TICK_TTL环境变量
+            bar_capacity: 每个代币保留的1分钟K线根数
+            exchange_api: 交易所API，为None时创建默认的Bitget接口
+            symbols: 代币列表，默认BTC/ETH/XRP/BNB/SOL
+            kline_store: 本地K线存储，提供时启动前增量同步并用历史K线预热缓冲区
+        """
+        self.exchange_api = exchange_api or ExchangeAPI()
+        self.symbols = list(symbols or ['BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'BNBUSDT', 'SOLUSDT'])
+        self.tick_ttl = tick_ttl if tick_ttl is not None else float(os.getenv('TICK_TTL', '5'))
+        
+        # 最新tick表：{symbol: (price, bid, ask, 本地接收时间)}，整元组替换，读写无需加锁
+        self.latest_ticks = {}
+        
+        # 每个代币最近bar_capacity根1分钟K线，由tick增量聚合；推送tick与REST快照统一按本地接收时间分桶
+        self.bar_capacity = bar_capacity
+        self.bar_store = BarStore(self.symbols, bar_capacity)
+        self.kline_store = kline_store
+        if kline_store is not None:
+            self.warm_up_bars()
+        
+        self.ticker_stream = ticker_stream
+        if ticker_stream is not None:
+            ticker_stream.add_listener(self.on_tick)
+            ticker_stream.start(self.symbols)
+    
+    def on_tick(self, tick: Dict[str, Any]):
+        """
+        行情推送回调，更新最新tick表
+        
+        Args:
+            tick: tick字典{symbol, price, bid, ask, ts}
+        """
+        now = time.time()
+        self.latest_ticks[tick['symbol']] = (tick['price'], tick.get('bid', 0.0), tick.get('ask', 0.0), now)
+        # 不用交易所ts：REST快照只有本地时间，两种时钟混用时偏差会让较早的一方被当作乱序丢弃
+        self.bar_store.update(tick['symbol'], tick['price'], now, tick.get('volume', 0.0))
+    
+    def warm_up_bars(self, now: float = None) -> int:
+        """
+        从本地K线存储预热环形缓冲区（先增量同步缺失的已收盘K线）
+        
+        Args:
+            now: 当前时间（秒），默认为time.time()
+            
+        Returns:
+            载入缓冲区的K线总根数
+        """
+        end_ms = int((now if now is not None else time.time()) * 1000) // MINUTE_MS * MINUTE_MS
+        start_ms = end_ms - self.bar_capacity * MINUTE_MS
+        self.kline_store.sync(self.exchange_api, self.symbols, start_ms, end_ms)
+        
+        loaded = 0
+        for symbol in self.symbols:
+            bars = self.kline_store.read(symbol, start_ms, end_ms)
+            self.bar_store.seed(symbol, bars)
+            loaded += len(bars)
+        print(f"🕯️ 已从本地K线存储预热 {loaded} 根K线")
+        return loaded
     
     def get_current_prices(self) -> Dict[str, float]:
         """
@@ -24,7 +90,42 @@ class MarketData:
         Returns:
             价格字典
         """
-        return self.exchange_api.get_latest_prices(self.symbols)
+        return self.get_snapshot()['prices']
+    
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        获取当前所有代币的价格快照
+        
+        新鲜的价格直接从tick表读取，只有过期或缺失的代币才走一次批量REST请求。
+        
+        Returns:
+            快照字典，包含timestamp、latency、prices
+        """
+        now = time.time()
+        prices = {}
+        stale_symbols = []
+        for symbol in self.symbols:
+            tick = self.latest_ticks.get(symbol)
+            if tick is not None and now - tick[3] <= self.tick_ttl:
+                prices[symbol] = tick[0]
+            else:
+                stale_symbols.append(symbol)
+        
+        if not stale_symbols:
+            return {'timestamp': now, 'latency': 0.0, 'prices': prices}
+        
+        snapshot = self.exchange_api.get_price_snapshot(stale_symbols)
+        for symbol, price in snapshot['prices'].items():
+            if price > 0:
+                self.latest_ticks[symbol] = (price, 0.0, 0.0, snapshot['timestamp'])
+                self.bar_store.update(symbol, price, snapshot['timestamp'])
+        prices.update(snapshot['prices'])
+        
+        return {
+            'timestamp': snapshot['timestamp'],
+            'latency': snapshot['latency'],
+            'prices': {symbol: prices[symbol] for symbol in self.symbols}
+        }
     
     def get_price(self, symbol: str) -> float:
         """
@@ -36,7 +137,41 @@ class MarketData:
         Returns:
             价格
         """
-        return self.exchange_api.get_single_price(symbol)
+        tick = self.latest_ticks.get(symbol)
+        if tick is not None and time.time() - tick[3] <= self.tick_ttl:
+            return tick[0]
+        
+        price = self.exchange_api.get_single_price(symbol)
+        if price > 0:
+            self.latest_ticks[symbol] = (price, 0.0, 0.0, time.time())
+        return price
+    
+    def get_tick(self, symbol: str) -> Dict[str, float]:
+        """
+        获取指定代币的最新tick
+        
+        Args:
+            symbol: 代币符号
+            
+        Returns:
+            tick字典{price, bid, ask, age}，无数据时返回None
+        """
+        tick = self.latest_ticks.get(symbol)
+        if tick is None:
+            return None
+        return {'price': tick[0], 'bid': tick[1], 'ask': tick[2], 'age': time.time() - tick[3]}
+    
+    def get_market_context(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取prompt使用的行情上下文（最近1分钟K线 + 衍生特征 + 盘口）
+        
+        直接读取内存中的环形缓冲区，不重新下载K线。
+        
+        Returns:
+            上下文字典{symbol: {bars, features}}
+        """
+        ticks = {symbol: {'bid': tick[1], 'ask': tick[2]} for symbol, tick in self.latest_ticks.items()}
+        return self.bar_store.get_context(ticks)
     
     def get_symbols(self) -> List[str]:
         """获取支持的代币列表"""
@@ -46,6 +181,11 @@ class MarketData:
         """检查API是否可用"""
         return self.exchange_api.is_available()
     
+    def close(self):
+        """停止行情推送"""
+        if self.ticker_stream is not None:
+            self.ticker_stream.stop()
+    
     def format_prices_for_display(self, prices: Dict[str, float]) -> str:
         """
         格式化价格用于显示
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+绩效指标
+累计收益、最大回撤、Sharpe/Calmar、胜率、盈亏比、持仓时长；
+批量模式对NAV数组整体向量化计算，在线模式每个tick O(1)增量更新（运行最大值 + Welford方差）
+"""
+
+import math
+from typing import Dict, List, Any, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+# 每年的1分钟K线数（回测默认采样频率）
+MINUTES_PER_YEAR = 365 * 24 * 60
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def simple_returns(nav):
+    """
+    逐期收益率
+    
+    Args:
+        nav: 净值数组，形状(T,)或(T, 模型数)
+        
+    Returns:
+        形状(T-1, ...)的收益率数组
+    """
+    nav = np.asarray(nav, dtype=np.float64)
+    return nav[1:] / nav[:-1] - 1.0
+
+
+def drawdown_series(nav):
+    """
+    回撤序列（相对历史最高净值）
+    
+    Args:
+        nav: 净值数组，形状(T,)或(T, 模型数)
+        
+    Returns:
+        与nav同形状的回撤数组（<=0）
+    """
+    nav = np.asarray(nav, dtype=np.float64)
+    return nav / np.maximum.accumulate(nav, axis=0) - 1.0
+
+
+def max_drawdown(nav):
+    """最大回撤（负数），多模型时按列返回"""
+    return drawdown_series(nav).min(axis=0)
+
+
+def cumulative_return(nav):
+    """累计收益率，多模型时按列返回"""
+    nav = np.asarray(nav, dtype=np.float64)
+    return nav[-1] / nav[0] - 1.0
+
+
+def annualized_return(nav, periods_per_year: float = MINUTES_PER_YEAR):
+    """
+    年化收益率（按几何复利折算）
+    
+    Args:
+        nav: 净值数组
+        periods_per_year: 每年的采样期数
+        
+    Returns:
+        年化收益率
+    """
+    nav = np.asarray(nav, dtype=np.float64)
+    periods = max(len(nav) - 1, 1)
+    return (nav[-1] / nav[0]) ** (periods_per_year / periods) - 1.0
+
+
+def sharpe_ratio(nav, periods_per_year: float = MINUTES_PER_YEAR, risk_free: float = 0.0):
+    """
+    年化Sharpe比率
+    
+    Args:
+        nav: 净值数组
+        periods_per_year: 每年的采样期数
+        risk_free: 年化无风险利率
+        
+    Returns:
+        Sharpe比率，收益无波动时为0
+    """
+    returns = simple_returns(nav) - risk_free / periods_per_year
+    if len(returns) < 2:
+        return np.zeros(returns.shape[1:]) if returns.ndim > 1 else 0.0
+    std = returns.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, returns.mean(axis=0) / std * math.sqrt(periods_per_year), 0.0)
+    return sharpe if sharpe.ndim else float(sharpe)
+
+
+def calmar_ratio(nav, periods_per_year: float = MINUTES_PER_YEAR):
+    """
+    Calmar比率（年化收益 / |最大回撤|）
+    
+    Args:
+        nav: 净值数组
+        periods_per_year: 每年的采样期数
+        
+    Returns:
+        Calmar比率，无回撤时为0
+    """
+    mdd = np.abs(max_drawdown(nav))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calmar = np.where(mdd > 0, annualized_return(nav, periods_per_year) / mdd, 0.0)
+    return calmar if calmar.ndim else float(calmar)
+
+
+class RoundTripTracker:
+    """由成交记录配对出完整交易（买入建仓 → 卖出平仓），用于胜率、盈亏比和持仓时长"""
+    
+    def __init__(self):
+        """初始化配对器"""
+        # {(model, symbol): [累计成本（含手续费）, 首次建仓时间]}
+        self.open_positions = {}
+    
+    def on_fill(self, fill: Dict[str, Any]):
+        """
+        处理一笔成交
+        
+        Args:
+            fill: PaperTradingEngine的成交记录{model, symbol, side, notional, fee, timestamp}
+            
+        Returns:
+            平仓时返回(模型, 净盈亏, 持仓秒数)，否则返回None
+        """
+        key = (fill['model'], fill['symbol'])
+        if fill['side'] == 'BUY':
+            position = self.open_positions.setdefault(key, [0.0, fill['timestamp']])
+            position[0] += fill['notional'] + fill['fee']
+            return None
+        
+        position = self.open_positions.pop(key, None)
+        if position is None:
+            return None
+        pnl = fill['notional'] - fill['fee'] - position[0]
+        return fill['model'], pnl, fill['timestamp'] - position[1]
+
+
+def round_trips(fills: List[Dict[str, Any]], model_name: str = None) -> Tuple[Any, Any]:
+    """
+    从成交列表配对出完整交易
+    
+    Args:
+        fills: 成交记录列表（按时间顺序）
+        model_name: 只统计该模型，为None时统计全部
+        
+    Returns:
+        (净盈亏数组, 持仓秒数数组)
+    """
+    tracker = RoundTripTracker()
+    pnl, holding = [], []
+    for fill in fills:
+        if model_name is not None and fill['model'] != model_name:
+            continue
+        trip = tracker.on_fill(fill)
+        if trip is not None:
+            pnl.append(trip[1])
+            holding.append(trip[2])
+    return np.array(pnl, dtype=np.float64), np.array(holding, dtype=np.float64)
+
+
+def trade_stats(pnl, holding=None) -> Dict[str, float]:
+    """
+    交易统计
+    
+    Args:
+        pnl: 每笔完整交易的净盈亏数组
+        holding: 每笔交易的持仓秒数数组
+        
+    Returns:
+        统计字典{trades, win_rate, payoff_ratio, avg_holding_seconds}
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl < 0]
+    avg_win = wins.mean() if len(wins) else 0.0
+    avg_loss = -losses.mean() if len(losses) else 0.0
+    return {
+        'trades': int(len(pnl)),
+        'win_rate': float(len(wins) / len(pnl)) if len(pnl) else 0.0,
+        'payoff_ratio': float(avg_win / avg_loss) if avg_loss > 0 else 0.0,
+        'avg_holding_seconds': float(np.mean(holding)) if holding is not None and len(holding) else 0.0
+    }
+
+
+def compute_metrics(nav, fills: List[Dict[str, Any]] = None, model_name: str = None,
+                    periods_per_year: float = MINUTES_PER_YEAR) -> Dict[str, float]:
+    """
+    计算单个模型的全部指标
+    
+    Args:
+        nav: 净值数组，形状(T,)
+        fills: 成交记录列表，为None时不计算交易统计
+        model_name: 成交记录所属模型
+        periods_per_year: nav的每年采样期数
+        
+    Returns:
+        指标字典{cumulative_return, annualized_return, max_drawdown, sharpe, calmar,
+                 trades, win_rate, payoff_ratio, avg_holding_seconds, fee_ratio}
+    """
+    metrics = {
+        'cumulative_return': float(cumulative_return(nav)),
+        'annualized_return': float(annualized_return(nav, periods_per_year)),
+        'max_drawdown': float(max_drawdown(nav)),
+        'sharpe': float(sharpe_ratio(nav, periods_per_year)),
+        'calmar': float(calmar_ratio(nav, periods_per_year)),
+    }
+    if fills is not None:
+        metrics.update(trade_stats(*round_trips(fills, model_name)))
+        model_fills = [fill for fill in fills if model_name is None or fill['model'] == model_name]
+        notional = sum(fill['notional'] for fill in model_fills)
+        metrics['fee_ratio'] = sum(fill['fee'] for fill in model_fills) / notional if notional else 0.0
+    return metrics
+
+
+class OnlineMetrics:
+    """
+    在线指标（多模型向量化，每次更新O(模型数)，与历史长度无关）
+    
+    回撤用运行最大值，收益波动用Welford增量方差，交易统计用累加器。
+    """
+    
+    def __init__(self, model_names: List[str], initial_nav: float = 10000.0,
+                 periods_per_year: float = MINUTES_PER_YEAR):
+        """
+        初始化在线指标
+        
+        Args:
+            model_names: 模型名称列表（与update传入的净值向量对齐）
+            initial_nav: 初始净值
+            periods_per_year: update调用频率对应的每年期数（5分钟周期为105120）
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.model_names = list(model_names)
+        self.model_index = {name: i for i, name in enumerate(self.model_names)}
+        self.periods_per_year = periods_per_year
+        n = len(self.model_names)
+        
+        self.initial_nav = np.full(n, float(initial_nav))
+        self.last_nav = self.initial_nav.copy()
+        self.peak = self.initial_nav.copy()
+        self.max_drawdown = np.zeros(n)
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        
+        self.trades = np.zeros(n, dtype=np.int64)
+        self.wins = np.zeros(n, dtype=np.int64)
+        self.win_sum = np.zeros(n)
+        self.losses = np.zeros(n, dtype=np.int64)
+        self.loss_sum = np.zeros(n)
+        self.holding_sum = np.zeros(n)
+        self.tracker = RoundTripTracker()
+    
+    def update(self, nav):
+        """
+        推入一期净值
+        
+        Args:
+            nav: 净值向量（与model_names对齐），或{model_name: nav}字典
+        """
+        if isinstance(nav, dict):
+            nav = [nav.get(name, last) for name, last in zip(self.model_names, self.last_nav.tolist())]
+        nav = np.asarray(nav, dtype=np.float64)
+        
+        ret = nav / self.last_nav - 1.0
+        self.count += 1
+        delta = ret - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (ret - self.mean)
+        
+        np.maximum(self.peak, nav, out=self.peak)
+        np.minimum(self.max_drawdown, nav / self.peak - 1.0, out=self.max_drawdown)
+        self.last_nav = nav
+    
+    def on_fill(self, fill: Dict[str, Any]):
+        """
+        推入一笔成交，平仓时更新交易统计
+        
+        Args:
+            fill: PaperTradingEngine的成交记录
+        """
+        trip = self.tracker.on_fill(fill)
+        if trip is None or trip[0] not in self.model_index:
+            return
+        row = self.model_index[trip[0]]
+        pnl = trip[1]
+        self.trades[row] += 1
+        self.holding_sum[row] += trip[2]
+        if pnl > 0:
+            self.wins[row] += 1
+            self.win_sum[row] += pnl
+        elif pnl < 0:
+            self.losses[row] += 1
+            self.loss_sum[row] -= pnl
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        当前全部指标
+        
+        Returns:
+            {model_name: 指标字典}，字段与compute_metrics一致
+        """
+        cumulative = self.last_nav / self.initial_nav - 1.0
+        periods = max(self.count, 1)
+        annualized = (1.0 + cumulative) ** (self.periods_per_year / periods) - 1.0
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.zeros_like(self.m2)
+            sharpe = np.where(std > 0, self.mean / std * math.sqrt(self.periods_per_year), 0.0)
+            mdd = np.abs(self.max_drawdown)
+            calmar = np.where(mdd > 0, annualized / mdd, 0.0)
+            win_rate = np.where(self.trades > 0, self.wins / self.trades, 0.0)
+            avg_win = np.where(self.wins > 0, self.win_sum / self.wins, 0.0)
+            avg_loss = np.where(self.losses > 0, self.loss_sum / self.losses, 0.0)
+            payoff = np.where(avg_loss > 0, avg_win / avg_loss, 0.0)
+            holding = np.where(self.trades > 0, self.holding_sum / self.trades, 0.0)
+        
+        result = {}
+        for row, name in enumerate(self.model_names):
+            result[name] = {
+                'nav': float(self.last_nav[row]),
+                'cumulative_return': float(cumulative[row]),
+                'annualized_return': float(annualized[row]),
+                'max_drawdown': float(self.max_drawdown[row]),
+                'current_drawdown': float(self.last_nav[row] / self.peak[row] - 1.0),
+                'sharpe': float(sharpe[row]),
+                'calmar': float(calmar[row]),
+                'trades': int(self.trades[row]),
+                'win_rate': float(win_rate[row]),
+                'payoff_ratio': float(payoff[row]),
+                'avg_holding_seconds': float(holding[row])
+            }
+        return result
+
+
+def format_metrics(metrics: Dict[str, float]) -> str:
+    """
+    格式化单个模型的指标
+    
+    Args:
+        metrics: 指标字典
+        
+    Returns:
+        单行显示文本
+    """
+    text = (f"收益 {metrics['cumulative_return']:+.2%}，最大回撤 {metrics['max_drawdown']:.2%}，"
+            f"Sharpe {metrics['sharpe']:.2f}，Calmar {metrics['calmar']:.2f}")
+    if 'trades' in metrics:
+        text += (f"，交易 {metrics['trades']} 笔，胜率 {metrics['win_rate']:.1%}，"
+                 f"盈亏比 {metrics['payoff_ratio']:.2f}，平均持仓 {metrics['avg_holding_seconds'] / 60:.1f}分钟")
+    return text
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+决策调度器
+并行向所有模型发送同一份行情，统一超时回退
+"""
+
+import time
+from concurrent.futures import wait
+from typing import Dict, Any, List
+from adapters.instrumentation import get_instrumentation
+from adapters.llm_base import submit_coroutine
+from core.decision import DecisionMaker, check_unique_model_names
+
+
+class DecisionOrchestrator:
+    """多模型决策并发调度器"""
+    
+    def __init__(self, decision_makers: List[DecisionMaker] = None, timeout: float = 8.0):
+        """
+        初始化决策调度器
+        
+        Args:
+            decision_makers: 决策引擎列表
+            timeout: 单模型决策超时（秒），超时=默认HOLD
+            
+        Raises:
+            ValueError: 模型名称重复（决策按模型名称汇总）
+        """
+        self.decision_makers = list(decision_makers or [])
+        check_unique_model_names(self.decision_makers)
+        self.timeout = timeout
+        self.last_latencies = {}
+        self.last_timings = {}
+        self.instrumentation = get_instrumentation()
+    
+    def register(self, decision_maker: DecisionMaker):
+        """
+        注册决策引擎
+        
+        Args:
+            decision_maker: 决策引擎实例
+            
+        Raises:
+            ValueError: 与已注册的模型重名
+        """
+        check_unique_model_names(self.decision_makers + [decision_maker])
+        self.decision_makers.append(decision_maker)
+    
+    def collect_decisions(self, market_data: Dict[str, float],
+                          market_context: Dict[str, Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        并行获取所有模型的决策
+        
+        所有请求以协程形式同时提交到共享事件循环，整体耗时取决于最慢的模型且不超过timeout；
+        超时的请求会被取消，释放其占用的连接。
+        
+        Args:
+            market_data: 市场数据
+            market_context: 行情上下文（K线与衍生特征），所有模型共用
+            
+        Returns:
+            决策字典，格式为{model_name: decision}
+        """
+        start = time.monotonic()
+        futures = {}
+        for decision_maker in self.decision_makers:
+            future = submit_coroutine(self._timed_decision(decision_maker, market_data, market_context, start))
+            futures[future] = decision_maker
+        
+        done, _ = wait(futures, timeout=self.timeout)
+        
+        decisions = {}
+        latencies = {}
+        timings = {}
+        for future, decision_maker in futures.items():
+            model_name = decision_maker.model_name
+            if future in done:
+                try:
+                    decisions[model_name], latencies[model_name] = future.result()
+                except Exception as e:
+                    print(f"❌ {model_name}决策获取失败: {e}")
+                    decisions[model_name] = decision_maker.get_default_decision()
+                    latencies[model_name] = time.monotonic() - start
+                timings[model_name] = dict(decision_maker.last_timings)
+            else:
+                future.cancel()
+                self.instrumentation.inc('decision_timeouts_total', model=model_name)
+                print(f"⏰ {model_name}决策超时（>{self.timeout:g}s），默认观望")
+                decision = decision_maker.get_default_decision()
+                decision['rationale'] = f"决策超时（>{self.timeout:g}s），默认观望"
+                decisions[model_name] = decision
+                latencies[model_name] = self.timeout
+                timings[model_name] = {'prompt': decision_maker.last_timings['prompt'],
+                                       'llm': self.timeout, 'parse': 0.0}
+        
+        self.last_latencies = latencies
+        self.last_timings = timings
+        return decisions
+    
+    async def _timed_decision(self, decision_maker: DecisionMaker, market_data: Dict[str, float],
+                              market_context: Dict[str, Dict[str, Any]], start: float):
+        """执行单个模型决策并记录耗时"""
+        decision = await decision_maker.aget_decision(market_data, market_context)
+        return decision, time.monotonic() - start
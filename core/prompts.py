@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词模板
+按代币列表预编译决策提示词：静态前缀（角色、输出格式、注意事项）在所有周期和模型间逐字节一致，
+便于服务商的前缀缓存命中；每周期只渲染动态后缀（价格与K线上下文）
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple
+
+DEFAULT_SYMBOLS = ('BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'BNBUSDT', 'SOLUSDT')
+
+# 批量模式中每个上下文小节的标题前缀
+BATCH_SECTION_TITLE = "### 上下文 "
+
+# 提示词变体：追加在注意事项末尾的策略指引（参数扫描时按名称选择）
+PROMPT_VARIANTS = {
+    'default': "",
+    'conservative': "7. 风格保守：信心度低于0.7时选择HOLD，仓位不超过0.1\n",
+    'momentum': "7. 顺势交易：优先选择近期涨幅最大的代币，趋势不明时HOLD\n",
+    'contrarian': "7. 逆势交易：优先选择近期超跌的代币，避免追涨\n",
+}
+
+
+class PromptTemplate:
+    """编译后的决策提示词模板"""
+    
+    def __init__(self, symbols: List[str], guidance: str = ""):
+        """
+        编译模板
+        
+        Args:
+            symbols: 代币列表（决定价格行顺序和symbol取值范围）
+            guidance: 追加在注意事项末尾的策略指引（如PROMPT_VARIANTS中的值）
+        """
+        self.symbols = tuple(symbols)
+        self.guidance = guidance
+        choices = "|".join(self.symbols + ('null',))
+        self.prefix = (
+            "你是专业的量化交易分析师，请根据当前市场价格给出交易决策。\n"
+            "\n"
+            "请以JSON格式返回你的交易决策：\n"
+            "{\n"
+            f'    "symbol": "{choices}",\n'
+            '    "action": "BUY|SELL|HOLD",\n'
+            '    "position_size_pct": 0.0-0.2,\n'
+            '    "take_profit": 0.0,\n'
+            '    "stop_loss": 0.0,\n'
+            '    "confidence": 0.0-1.0,\n'
+            '    "rationale": "简短理由（不超过50字）"\n'
+            "}\n"
+            "\n"
+            "注意事项：\n"
+            "1. 只返回JSON，不要其他文字\n"
+            "2. symbol为null表示不选择任何代币\n"
+            "3. action为HOLD表示持有/观望\n"
+            "4. confidence表示决策信心度\n"
+            "5. rationale给出决策理由\n"
+            "6. position_size_pct为下单金额占净值比例，take_profit/stop_loss为绝对价格（可选）\n"
+            f"{guidance}"
+        )
+        # 价格行预先拼成一个format串，渲染时只做一次格式化
+        self.price_format = "\n".join(f"- {symbol}: ${{{i}:.4f}}" for i, symbol in enumerate(self.symbols))
+        
+        # 批量模式：一次请求覆盖多个相互独立的上下文，输出为decisions数组（前缀与上下文个数无关）
+        self.batch_prefix = (
+            "你是专业的量化交易分析师，下面给出若干相互独立的决策上下文（不同账户或代币组合），请分别给出交易决策。\n"
+            "\n"
+            "请以JSON格式返回，decisions数组中每个上下文对应一项，id与上下文标题中的id一致：\n"
+            "{\n"
+            '    "decisions": [\n'
+            "        {\n"
+            '            "id": "上下文id",\n'
+            f'            "symbol": "{choices}",\n'
+            '            "action": "BUY|SELL|HOLD",\n'
+            '            "position_size_pct": 0.0-0.2,\n'
+            '            "take_profit": 0.0,\n'
+            '            "stop_loss": 0.0,\n'
+            '            "confidence": 0.0-1.0,\n'
+            '            "rationale": "简短理由（不超过50字）"\n'
+            "        }\n"
+            "    ]\n"
+            "}\n"
+            "\n"
+            "注意事项：\n"
+            "1. 只返回JSON，不要其他文字\n"
+            "2. 每个上下文必须且只能返回一项，symbol只能从该上下文列出的代币中选择，null表示不选择任何代币\n"
+            "3. 各上下文相互独立，不要互相参考\n"
+            "4. action为HOLD表示持有/观望，confidence表示决策信心度，rationale给出决策理由\n"
+            "5. position_size_pct为下单金额占该账户净值比例，take_profit/stop_loss为绝对价格（可选）\n"
+            f"{guidance}"
+        )
+    
+    def render_suffix(self, market_data: Dict[str, float], context_section: str = "") -> str:
+        """
+        渲染动态后缀
+        
+        Args:
+            market_data: 市场数据字典
+            context_section: 行情上下文片段（DecisionMaker.format_market_context的结果）
+            
+        Returns:
+            后缀文本
+        """
+        prices = self.price_format.format(*[market_data.get(symbol, 0) for symbol in self.symbols])
+        return f"\n当前市场价格：\n{prices}\n{context_section}\nJSON:\n"
+    
+    def render_batch_suffix(self, sections: List[Dict[str, Any]]) -> str:
+        """
+        渲染批量模式的动态后缀
+        
+        Args:
+            sections: 上下文列表[{id, market_data, context_section, account, symbols}]，
+                symbols为None时列出模板的全部代币，account为账户摘要文本（可选）
+                
+        Returns:
+            后缀文本，每个上下文一节，标题为"### 上下文 <id>"
+        """
+        parts = []
+        for section in sections:
+            market_data = section['market_data']
+            symbols = section.get('symbols')
+            if symbols is None or tuple(symbols) == self.symbols:
+                prices = self.price_format.format(*[market_data.get(symbol, 0) for symbol in self.symbols])
+            else:
+                prices = "\n".join(f"- {symbol}: ${market_data.get(symbol, 0):.4f}" for symbol in symbols)
+            
+            lines = [f"\n{BATCH_SECTION_TITLE}{section['id']}"]
+            if section.get('account'):
+                lines.append(f"账户: {section['account']}")
+            lines.append(f"当前市场价格：\n{prices}")
+            parts.append("\n".join(lines) + "\n" + section.get('context_section', ""))
+        return "".join(parts) + "\nJSON:\n"
+    
+    def render(self, market_data: Dict[str, float], context_section: str = "") -> Tuple[str, str]:
+        """
+        渲染完整提示词
+        
+        Args:
+            market_data: 市场数据字典
+            context_section: 行情上下文片段
+            
+        Returns:
+            (静态前缀, 动态后缀)
+        """
+        return self.prefix, self.render_suffix(market_data, context_section)
+
+
+@lru_cache(maxsize=32)
+def compile_template(symbols: Tuple[str, ...] = DEFAULT_SYMBOLS, guidance: str = "") -> PromptTemplate:
+    """
+    获取代币列表对应的模板（同一列表只编译一次，所有DecisionMaker共用同一前缀对象）
+    
+    Args:
+        symbols: 代币元组
+        guidance: 策略指引
+        
+    Returns:
+        模板实例
+    """
+    return PromptTemplate(symbols, guidance)
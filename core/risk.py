@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+风控引擎
+位于决策与撮合之间：下单前按预计算的每模型限额表校验（单笔20%净值、最多持1个标的、5分钟去重、停机状态），
+成交后登记止损/止盈价；每个tick只做数组比较即可触发止盈止损和Kill-Switch强平
+"""
+
+import threading
+import time
+from typing import Dict, List, Any
+from core.execution import PaperTradingEngine
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+# 默认限额（与README风控规则一致）
+DEFAULT_RISK_LIMITS = {
+    'max_position_pct': 0.2,
+    'max_open_symbols': 1,
+    'stop_loss_pct': 0.05,
+    'kill_switch_pct': 0.10,
+    'dedup_seconds': 300.0,
+}
+
+# 强平原因的显示名称
+RISK_REASON_LABELS = {'stop_loss': '止损', 'take_profit': '止盈', 'kill_switch': 'Kill-Switch'}
+
+# 去重窗口允许的时钟误差比例（对齐周期的行情时间戳会有毫秒级抖动）
+DEDUP_SLACK = 0.05
+
+
+class RiskEngine:
+    """风控闸门（包装PaperTradingEngine，接口与其execute/execute_all一致）"""
+    
+    def __init__(self, engine: PaperTradingEngine, max_position_pct: float = 0.2, max_open_symbols: int = 1,
+                 stop_loss_pct: float = 0.05, kill_switch_pct: float = 0.10, dedup_seconds: float = 300.0,
+                 time_unit: float = 1.0, verbose: bool = True):
+        """
+        初始化风控引擎
+        
+        Args:
+            engine: 模拟撮合引擎
+            max_position_pct: 单笔下单上限（占净值比例）
+            max_open_symbols: 每个模型最多同时持有的标的数
+            stop_loss_pct: 兜底强平阈值（相对持仓均价的跌幅），模型给出更紧的止损价时以模型为准
+            kill_switch_pct: 净值自高点回撤超过该比例时全平并禁用新单
+            dedup_seconds: 两次新开/平仓决策的最小间隔（秒）
+            time_unit: 行情时间戳单位对应的秒数（回测K线为毫秒时传0.001）
+            verbose: 是否打印拦截与强平信息
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.engine = engine
+        self.ledger = engine.ledger
+        self.default_position_limit = float(max_position_pct)
+        self.max_open_symbols = max_open_symbols
+        self.stop_loss_pct = stop_loss_pct
+        self.kill_switch_pct = kill_switch_pct
+        self.dedup_seconds = dedup_seconds
+        self.time_unit = time_unit
+        self.verbose = verbose
+        self.lock = threading.RLock()
+        
+        # 限额表：行与账本模型对齐，列与代币对齐
+        capacity = len(self.ledger.cash)
+        n_symbols = len(self.ledger.symbols)
+        self.max_position_pct = np.full(capacity, self.default_position_limit)
+        self.stop_px = np.zeros((capacity, n_symbols))
+        self.take_px = np.full((capacity, n_symbols), np.inf)
+        self.peak_nav = np.full(capacity, float(self.ledger.initial_cash))
+        self.kill_nav = self.peak_nav * (1.0 - kill_switch_pct)
+        self.halted = np.zeros(capacity, dtype=bool)
+        self.last_order_at = np.full(capacity, -np.inf)
+        
+        self.last_prices = np.zeros(n_symbols)
+        self.pending_fills = []
+        self.stats = {'checked': 0, 'rejected': 0, 'clamped': 0, 'stop_loss': 0, 'take_profit': 0, 'kill_switch': 0}
+    
+    def _ensure_capacity(self):
+        """账本扩容后同步扩容限额表"""
+        capacity = len(self.ledger.cash)
+        if capacity <= len(self.halted):
+            return
+        
+        def grow(array, fill):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+        
+        self.max_position_pct = grow(self.max_position_pct, self.default_position_limit)
+        self.stop_px = grow(self.stop_px, 0.0)
+        self.take_px = grow(self.take_px, np.inf)
+        self.peak_nav = grow(self.peak_nav, float(self.ledger.initial_cash))
+        self.kill_nav = grow(self.kill_nav, float(self.ledger.initial_cash) * (1.0 - self.kill_switch_pct))
+        self.halted = grow(self.halted, False)
+        self.last_order_at = grow(self.last_order_at, -np.inf)
+    
+    def set_limit(self, model_name: str, max_position_pct: float):
+        """
+        单独调整某个模型的单笔下单上限
+        
+        Args:
+            model_name: 模型名称
+            max_position_pct: 单笔下单上限（占净值比例）
+        """
+        with self.lock:
+            row = self.ledger.add_model(model_name)
+            self._ensure_capacity()
+            self.max_position_pct[row] = max_position_pct
+    
+    def check(self, model_name: str, decision: Dict[str, Any], snapshot: Dict[str, Any]):
+        """
+        下单前校验
+        
+        Args:
+            model_name: 模型名称
+            decision: 决策
+            snapshot: 行情快照{timestamp, prices}
+            
+        Returns:
+            (可执行的决策, 拦截原因)；放行时原因为None，拦截时决策为None
+        """
+        action = decision.get('action', 'HOLD')
+        if action == 'HOLD':
+            return decision, None
+        
+        row = self.ledger.add_model(model_name)
+        self._ensure_capacity()
+        self.stats['checked'] += 1
+        
+        if self.halted[row]:
+            return None, "Kill-Switch已触发，禁用新单"
+        
+        now = snapshot.get('timestamp', time.time()) * self.time_unit
+        if now - self.last_order_at[row] < self.dedup_seconds * (1.0 - DEDUP_SLACK):
+            return None, f"{self.dedup_seconds:.0f}秒内已有决策成交（去重）"
+        
+        if action != 'BUY':
+            return decision, None
+        
+        col = self.ledger.symbol_index.get(decision.get('symbol'))
+        held = self.ledger.qty[row] > 0
+        if col is not None and not held[col] and np.count_nonzero(held) >= self.max_open_symbols:
+            return None, f"已持有{np.count_nonzero(held)}个标的，超过持仓限制"
+        
+        limit = float(self.max_position_pct[row])
+        pct = self.engine._position_pct(decision)
+        if pct > limit:
+            decision = dict(decision) if isinstance(decision, dict) else decision.to_dict()
+            decision['position_size_pct'] = limit
+            self.stats['clamped'] += 1
+        return decision, None
+    
+    def execute(self, model_name: str, decision: Dict[str, Any], snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        校验后撮合一个决策，并更新该持仓的止损/止盈价
+        
+        Args:
+            model_name: 模型名称
+            decision: 决策
+            snapshot: 行情快照
+            
+        Returns:
+            成交记录；HOLD、被拦截或无法成交时返回None
+        """
+        with self.lock:
+            checked, reason = self.check(model_name, decision, snapshot)
+            if checked is None:
+                self.stats['rejected'] += 1
+                if self.verbose:
+                    print(f"🛡️ {model_name}的{decision.get('action')} {decision.get('symbol')}被风控拦截: {reason}")
+                return None
+            
+            fill = self.engine.execute(model_name, checked, snapshot)
+            if fill is None:
+                return None
+            
+            row = self.ledger.model_index[model_name]
+            col = self.ledger.symbol_index[fill['symbol']]
+            self.last_order_at[row] = fill['timestamp'] * self.time_unit
+            if fill['side'] == 'BUY':
+                self._arm(row, col, checked)
+            else:
+                self._disarm(row, col)
+            return fill
+    
+    def execute_all(self, decisions: Dict[str, Dict[str, Any]], snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        撮合一个周期内所有模型的决策
+        
+        先按快照价格检查止盈止损和Kill-Switch，再逐个校验决策；
+        上个周期以来tick触发的强平成交一并返回。
+        
+        Args:
+            decisions: 决策字典{model_name: decision}
+            snapshot: 行情快照
+            
+        Returns:
+            成交记录列表（强平在前）
+        """
+        with self.lock:
+            cols = self._apply_prices(snapshot['prices'])
+            timestamp = snapshot.get('timestamp', time.time() / self.time_unit)
+            fills = self.pending_fills + self._evaluate(cols, timestamp)
+            self.pending_fills = []
+            for model_name, decision in decisions.items():
+                fill = self.execute(model_name, decision, snapshot)
+                if fill is not None:
+                    fills.append(fill)
+            return fills
+    
+    def _arm(self, row: int, col: int, decision: Dict[str, Any]):
+        """按最新持仓均价登记止损/止盈价（模型止损更紧时采用模型止损）"""
+        avg_px = float(self.ledger.avg_px[row, col])
+        stop = avg_px * (1.0 - self.stop_loss_pct)
+        model_stop = decision.get('stop_loss')
+        if isinstance(model_stop, (int, float)) and stop < model_stop < avg_px:
+            stop = float(model_stop)
+        take = decision.get('take_profit')
+        self.stop_px[row, col] = stop
+        self.take_px[row, col] = float(take) if isinstance(take, (int, float)) and take > avg_px else np.inf
+    
+    def _disarm(self, row: int, col: int):
+        """平仓后清除止损/止盈价"""
+        self.stop_px[row, col] = 0.0
+        self.take_px[row, col] = np.inf
+    
+    def on_tick(self, tick: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        行情推送回调（可直接注册到TickerStream.add_listener），强平成交在下一次execute_all时一并返回
+        
+        Args:
+            tick: tick字典{symbol, price, ts}
+            
+        Returns:
+            本次触发的强平成交列表
+        """
+        col = self.ledger.symbol_index.get(tick['symbol'])
+        if col is None or tick['price'] <= 0:
+            return []
+        with self.lock:
+            self.last_prices[col] = tick['price']
+            fills = self._evaluate([col], tick.get('ts', time.time()))
+            self.pending_fills += fills
+            return fills
+    
+    def on_prices(self, prices: Dict[str, float], timestamp: float = None) -> List[Dict[str, Any]]:
+        """
+        用一组价格检查全部模型（周期快照或回测决策点）
+        
+        Args:
+            prices: 价格字典
+            timestamp: 行情时间戳，默认为当前时间
+            
+        Returns:
+            本次触发的强平成交列表
+        """
+        with self.lock:
+            cols = self._apply_prices(prices)
+            timestamp = time.time() / self.time_unit if timestamp is None else timestamp
+            fills = self._evaluate(cols, timestamp)
+            self.pending_fills += fills
+            return fills
+    
+    def _apply_prices(self, prices: Dict[str, float]) -> List[int]:
+        """更新最新价向量，返回有有效价格的代币列"""
+        cols = []
+        for symbol, price in prices.items():
+            col = self.ledger.symbol_index.get(symbol)
+            if col is not None and price > 0:
+                self.last_prices[col] = price
+                cols.append(col)
+        return cols
+    
+    def _evaluate(self, cols: List[int], timestamp: float) -> List[Dict[str, Any]]:
+        """
+        检查给定代币列上的止盈止损，以及全部模型的Kill-Switch
+        
+        全部为数组比较：止损/止盈价在成交时预计算，Kill-Switch阈值只在净值创新高时更新。
+        """
+        n = self.ledger.size
+        if n == 0 or not cols:
+            return []
+        
+        # 没有任何模型持有这些代币时净值不变，直接返回
+        qty = self.ledger.qty[:n, cols]
+        if not qty.any():
+            return []
+        
+        fills = []
+        prices = self.last_prices[cols]
+        stop_hit = (qty > 0) & (prices <= self.stop_px[:n, cols])
+        take_hit = (qty > 0) & (prices >= self.take_px[:n, cols])
+        for row, k in zip(*np.nonzero(stop_hit | take_hit)):
+            reason = 'stop_loss' if stop_hit[row, k] else 'take_profit'
+            fills += self._liquidate(row, [cols[k]], timestamp, reason)
+        
+        # 只有全部持仓都有价格时才计算净值，避免缺价导致误触发
+        navs = self.ledger.mark_to_market(self.last_prices)
+        priced = ~np.any((self.ledger.qty[:n] > 0) & (self.last_prices <= 0), axis=1)
+        rising = priced & (navs > self.peak_nav[:n])
+        if rising.any():
+            self.peak_nav[:n][rising] = navs[rising]
+            self.kill_nav[:n][rising] = navs[rising] * (1.0 - self.kill_switch_pct)
+        for row in np.flatnonzero(priced & ~self.halted[:n] & (navs <= self.kill_nav[:n])):
+            self.halted[row] = True
+            if self.verbose:
+                print(f"🛑 {self.ledger.model_names[row]}净值回撤超过{self.kill_switch_pct:.0%}，Kill-Switch全平并停止开仓")
+            fills += self._liquidate(row, np.flatnonzero(self.ledger.qty[row] > 0).tolist(), timestamp, 'kill_switch')
+        return fills
+    
+    def _liquidate(self, row: int, cols: List[int], timestamp: float, reason: str) -> List[Dict[str, Any]]:
+        """按最新价强平指定持仓"""
+        model_name = self.ledger.model_names[row]
+        fills = []
+        for col in cols:
+            symbol = self.ledger.symbols[col]
+            snapshot = {'timestamp': timestamp, 'prices': {symbol: float(self.last_prices[col])}}
+            fill = self.engine.execute(model_name, {'action': 'SELL', 'symbol': symbol}, snapshot)
+            self._disarm(row, col)
+            if fill is None:
+                continue
+            fill['reason'] = reason
+            self.stats[reason] += 1
+            fills.append(fill)
+            if self.verbose and reason != 'kill_switch':
+                print(f"🛡️ {model_name} {symbol}触发{RISK_REASON_LABELS[reason]}，按 ${fill['price']:.4f} 平仓")
+        return fills
+    
+    def resume(self, model_name: str):
+        """
+        解除某个模型的Kill-Switch（以当前净值作为新的高点）
+        
+        Args:
+            model_name: 模型名称
+        """
+        with self.lock:
+            row = self.ledger.model_index[model_name]
+            nav = float(self.ledger.mark_to_market(self.last_prices)[row])
+            self.halted[row] = False
+            self.peak_nav[row] = nav
+            self.kill_nav[row] = nav * (1.0 - self.kill_switch_pct)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取风控统计
+        
+        Returns:
+            统计字典{checked, rejected, clamped, stop_loss, take_profit, kill_switch, halted}
+        """
+        with self.lock:
+            halted = [name for row, name in enumerate(self.ledger.model_names) if self.halted[row]]
+            return dict(self.stats, halted=halted)
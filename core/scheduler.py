@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+周期调度器
+常驻进程按统一时钟对齐决策周期，行情、适配器和连接在周期之间保持复用
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Callable
+from adapters.instrumentation import get_instrumentation, metric_key
+from core.market import MarketData
+from core.orchestrator import DecisionOrchestrator
+from core.execution import PaperTradingEngine
+from core.journal import DecisionJournal
+from core.risk import RiskEngine
+from core.arena import Arena
+from core.metrics import OnlineMetrics
+
+# 周期内的阶段，按执行顺序
+STAGES = ('fetch', 'prompt', 'llm', 'parse', 'execute')
+STAGE_LABELS = {'fetch': '行情', 'prompt': 'prompt', 'llm': 'LLM', 'parse': '解析', 'execute': '撮合'}
+
+# 周期分阶段耗时直方图的键（prompt/llm/parse取本周期最慢模型）
+CYCLE_STAGE_KEYS = [(stage, metric_key('cycle_stage_seconds', stage=stage)) for stage in STAGES + ('total',)]
+
+
+class CycleScheduler:
+    """常驻决策周期调度器"""
+    
+    def __init__(self, market_data: MarketData, orchestrator: DecisionOrchestrator,
+                 engine: PaperTradingEngine = None, interval: float = 300.0,
+                 on_cycle: Callable[[Dict[str, Any]], None] = None, history_size: int = 288,
+                 journal: DecisionJournal = None, risk: RiskEngine = None,
+                 live_metrics: OnlineMetrics = None, arena: Arena = None):
+        """
+        初始化周期调度器
+        
+        Args:
+            market_data: 市场数据管理器（整个进程复用）
+            orchestrator: 决策调度器（整个进程复用）
+            engine: 模拟撮合引擎，为None时只收集决策
+            interval: 周期长度（秒），周期起点对齐到interval的整数倍，默认5分钟
+            on_cycle: 每个周期结束后的回调，参数为周期结果字典
+            history_size: 保留的周期耗时记录条数
+            journal: 决策审计日志，为None时不记录
+            risk: 风控引擎（包装同一个engine），为None时决策直接撮合
+            live_metrics: 在线绩效指标，每个有净值的周期计入一次，为None时不统计
+            arena: 竞技场，每个有决策的周期计入一次投票与一致率，为None时不统计
+        """
+        self.market_data = market_data
+        self.orchestrator = orchestrator
+        self.engine = engine
+        self.interval = interval
+        self.on_cycle = on_cycle
+        self.journal = journal
+        self.risk = risk
+        self.live_metrics = live_metrics
+        self.arena = arena
+        
+        self.stop_event = threading.Event()
+        self.cycle_count = 0
+        self.skipped_cycles = 0
+        self.last_timings = {}
+        self.history = deque(maxlen=history_size)
+        self.instrumentation = get_instrumentation()
+    
+    def next_boundary(self, now: float = None) -> float:
+        """
+        计算下一个周期起点
+        
+        Args:
+            now: 当前时间戳（秒），默认取系统时间
+            
+        Returns:
+            下一个interval整数倍的时间戳
+        """
+        now = time.time() if now is None else now
+        return (now // self.interval + 1) * self.interval
+    
+    def run_cycle(self, scheduled_at: float = None) -> Dict[str, Any]:
+        """
+        执行一个完整周期：拉取行情 → 构建prompt → 并发请求LLM → 解析 → 撮合
+        
+        各模型并发执行，prompt/LLM/解析阶段取最慢模型的耗时。
+        
+        Args:
+            scheduled_at: 本周期的计划起点，默认为当前时间
+            
+        Returns:
+            周期结果字典{cycle, scheduled_at, snapshot, decisions, latencies, fills, navs, timings, arena}，
+            arena为本周期的投票汇总（未配置竞技场或无决策时为None）
+        """
+        cycle_start = time.perf_counter()
+        self.cycle_count += 1
+        
+        snapshot = self.market_data.get_snapshot()
+        market_context = self.market_data.get_market_context()
+        prices = snapshot['prices']
+        timings = {'fetch': time.perf_counter() - cycle_start}
+        
+        decisions = {}
+        fills = []
+        navs = {}
+        if any(price > 0 for price in prices.values()):
+            decisions = self.orchestrator.collect_decisions(prices, market_context)
+            model_timings = self.orchestrator.last_timings.values()
+            for stage in ('prompt', 'llm', 'parse'):
+                timings[stage] = max((t[stage] for t in model_timings), default=0.0)
+            
+            execute_start = time.perf_counter()
+            if self.engine is not None:
+                executor = self.risk if self.risk is not None else self.engine
+                fills = executor.execute_all(decisions, snapshot)
+                navs = self.engine.mark_to_market(prices)
+            timings['execute'] = time.perf_counter() - execute_start
+        else:
+            print("❌ 没有获取到有效价格，本周期跳过决策")
+        
+        # 统计在周期内完成，不依赖回调是否打印
+        arena_summary = None
+        if self.arena is not None and decisions:
+            arena_summary = self.arena.update(decisions)
+        if self.live_metrics is not None and navs:
+            for fill in fills:
+                self.live_metrics.on_fill(fill)
+            self.live_metrics.update(navs)
+        
+        for stage in STAGES:
+            timings.setdefault(stage, 0.0)
+        timings['total'] = time.perf_counter() - cycle_start
+        for stage, key in CYCLE_STAGE_KEYS:
+            self.instrumentation.observe_key(key, timings[stage])
+        
+        self.last_timings = timings
+        self.history.append(timings)
+        
+        result = {
+            'cycle': self.cycle_count,
+            'scheduled_at': scheduled_at if scheduled_at is not None else time.time(),
+            'snapshot': snapshot,
+            'decisions': decisions,
+            'latencies': dict(self.orchestrator.last_latencies) if decisions else {},
+            'fills': fills,
+            'navs': navs,
+            'timings': timings,
+            'arena': arena_summary
+        }
+        if self.journal is not None and decisions:
+            self.journal.record_cycle(result, self.orchestrator.decision_makers)
+        if self.on_cycle is not None:
+            self.on_cycle(result)
+        return result
+    
+    def run_forever(self, max_cycles: int = None):
+        """
+        按时钟循环执行周期，直到stop()或达到max_cycles
+        
+        周期耗时超过interval时不会补跑或叠加：错过的周期直接跳过，下一周期对齐到之后的第一个时钟边界。
+        
+        Args:
+            max_cycles: 最多执行的周期数，为None时不限
+        """
+        boundary = self.next_boundary()
+        while not self.stop_event.is_set():
+            print(f"⏳ 下一周期: {datetime.fromtimestamp(boundary).strftime('%H:%M:%S')}")
+            if self.stop_event.wait(max(boundary - time.time(), 0.0)):
+                break
+            
+            try:
+                result = self.run_cycle(boundary)
+                print(self.format_timings(result['timings']))
+            except Exception as e:
+                print(f"❌ 第{self.cycle_count}个周期运行出错: {e}")
+            
+            if max_cycles is not None and self.cycle_count >= max_cycles:
+                break
+            
+            boundary += self.interval
+            now = time.time()
+            if now >= boundary:
+                missed = int((now - boundary) // self.interval) + 1
+                self.skipped_cycles += missed
+                boundary += missed * self.interval
+                print(f"⚠️ 周期耗时超过间隔（{self.interval:g}s），跳过{missed}个周期")
+    
+    def stop(self):
+        """停止循环（当前周期执行完后退出）"""
+        self.stop_event.set()
+    
+    @staticmethod
+    def format_timings(timings: Dict[str, float]) -> str:
+        """
+        格式化分阶段耗时
+        
+        Args:
+            timings: 耗时字典（秒）
+            
+        Returns:
+            单行显示文本
+        """
+        parts = [f"{STAGE_LABELS[stage]} {timings.get(stage, 0.0) * 1000:.1f}ms" for stage in STAGES]
+        return f"⏱️ 周期耗时 {timings.get('total', 0.0):.2f}s: " + " | ".join(parts)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参数扫描
+按(模型, 提示词变体, 温度, 风控设置)网格展开回测配置，分发到进程池并行回放；
+K线数据先落盘为.npy缓存目录，各工作进程以只读内存映射打开，共享同一份页缓存而不是逐个pickle，
+结果汇总为一张对比表
+"""
+
+import csv
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any
+
+from adapters.registry import get_registry
+from core.backtest import Backtester, BarData
+from core.decision import DecisionMaker
+from core.prompts import PROMPT_VARIANTS
+from core.risk import DEFAULT_RISK_LIMITS
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+# 风控预设（None表示不经风控直接撮合）
+RISK_PRESETS = {
+    'none': None,
+    'default': DEFAULT_RISK_LIMITS,
+    'tight': dict(DEFAULT_RISK_LIMITS, max_position_pct=0.1, stop_loss_pct=0.02, kill_switch_pct=0.05),
+    'loose': dict(DEFAULT_RISK_LIMITS, max_position_pct=0.5, max_open_symbols=3, stop_loss_pct=0.1,
+                  kill_switch_pct=0.25),
+}
+
+# 对比表的列（summary字段, 表头, 格式）
+TABLE_COLUMNS = (
+    ('total_return', '收益', '{:+.2%}'),
+    ('max_drawdown', '回撤', '{:.2%}'),
+    ('sharpe', 'Sharpe', '{:.2f}'),
+    ('calmar', 'Calmar', '{:.2f}'),
+    ('win_rate', '胜率', '{:.1%}'),
+    ('trades', '成交', '{:d}'),
+    ('total_fees', '手续费', '${:.2f}'),
+    ('replay_seconds', '回放', '{:.2f}s'),
+    ('llm_seconds', 'LLM', '{:.2f}s'),
+)
+
+# 工作进程内的K线数据（进程初始化时内存映射打开一次，所有任务复用）
+_worker_bars = None
+
+
+def build_grid(models: List[str], prompts: List[str] = None, temperatures: List[float] = None,
+               risks: List[str] = None, model_options: Dict[str, Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    展开参数网格
+    
+    Args:
+        models: 适配器注册名列表（如['stub', 'openai']）
+        prompts: 提示词变体名列表（PROMPT_VARIANTS的键），默认只用default
+        temperatures: 温度列表，None表示使用适配器默认值
+        risks: 风控预设名列表（RISK_PRESETS的键），默认不经风控
+        model_options: 按注册名提供的适配器构造参数
+        
+    Returns:
+        配置列表[{label, model, options, prompt, temperature, risk}]
+    """
+    prompts = prompts or ['default']
+    temperatures = temperatures or [None]
+    risks = risks or ['none']
+    model_options = model_options or {}
+    
+    for prompt in prompts:
+        if prompt not in PROMPT_VARIANTS:
+            raise ValueError(f"未知的提示词变体: {prompt}（可选: {', '.join(PROMPT_VARIANTS)}）")
+    for risk in risks:
+        if risk not in RISK_PRESETS:
+            raise ValueError(f"未知的风控预设: {risk}（可选: {', '.join(RISK_PRESETS)}）")
+    
+    grid = []
+    for model, prompt, temperature, risk in itertools.product(models, prompts, temperatures, risks):
+        options = dict(model_options.get(model, {}))
+        if temperature is not None:
+            options['temperature'] = temperature
+        temperature_label = 'default' if temperature is None else f"{temperature:g}"
+        grid.append({
+            'label': f"{model}/{prompt}/t={temperature_label}/{risk}",
+            'model': model,
+            'options': options,
+            'prompt': prompt,
+            'temperature': temperature,
+            'risk': risk
+        })
+    return grid
+
+
+def _init_worker(cache_dir: str):
+    """工作进程初始化：只读内存映射打开K线缓存"""
+    global _worker_bars
+    _worker_bars = BarData._load_cache(cache_dir)
+
+
+def run_config(config: Dict[str, Any], bars: BarData = None, decision_interval: int = 5,
+               context_bars: int = 0, initial_cash: float = 10000.0) -> Dict[str, Any]:
+    """
+    回放单个配置
+    
+    Args:
+        config: build_grid返回的配置
+        bars: K线数据，为None时使用工作进程初始化时映射的数据
+        decision_interval: 决策间隔（K线根数）
+        context_bars: 每次决策附带的历史K线根数
+        initial_cash: 初始资金
+        
+    Returns:
+        {config, summary, pid}，回放失败时summary为None并带error
+    """
+    bars = bars if bars is not None else _worker_bars
+    try:
+        adapter = get_registry().create(config['model'], **config['options'])
+        decision_maker = DecisionMaker(adapter, streaming=False, symbols=bars.symbols,
+                                       guidance=PROMPT_VARIANTS[config['prompt']])
+        results = Backtester([decision_maker], bars, decision_interval=decision_interval,
+                             initial_cash=initial_cash, context_bars=context_bars,
+                             risk_limits=RISK_PRESETS[config['risk']]).run()
+        summary = results[decision_maker.model_name]['summary']
+        return {'config': config, 'summary': summary, 'pid': os.getpid()}
+    except Exception as e:
+        return {'config': config, 'summary': None, 'error': f"{type(e).__name__}: {e}", 'pid': os.getpid()}
+
+
+class SweepRunner:
+    """进程池参数扫描器"""
+    
+    def __init__(self, bars: BarData, workers: int = None, decision_interval: int = 5,
+                 context_bars: int = 0, initial_cash: float = 10000.0, cache_dir: str = None):
+        """
+        初始化扫描器
+        
+        Args:
+            bars: K线数据（内存中的数据会先写入临时缓存目录）
+            workers: 进程数，默认为CPU核数
+            decision_interval: 决策间隔（K线根数）
+            context_bars: 每次决策附带的历史K线根数
+            initial_cash: 初始资金
+            cache_dir: 共享给工作进程的.npy缓存目录，为None时自动识别或写入临时目录
+        """
+        if np is None:
+            raise ImportError("numpy库未安装")
+        
+        self.bars = bars
+        self.workers = workers or os.cpu_count() or 1
+        self.decision_interval = decision_interval
+        self.context_bars = context_bars
+        self.initial_cash = initial_cash
+        self.cache_dir = cache_dir
+        self.last_wall_seconds = 0.0
+    
+    def _shared_cache_dir(self):
+        """
+        找到或生成工作进程可以内存映射的缓存目录
+        
+        Returns:
+            (缓存目录, 是否为临时目录)
+        """
+        if self.cache_dir is not None:
+            return self.cache_dir, False
+        
+        ohlcv = self.bars.ohlcv
+        filename = getattr(ohlcv, 'filename', None)
+        if isinstance(ohlcv, np.memmap) and filename and os.path.basename(filename) == 'ohlcv.npy':
+            return os.path.dirname(filename), False
+        
+        temp_dir = tempfile.mkdtemp(prefix="alpha_arena_sweep_")
+        self.bars.save(temp_dir)
+        return temp_dir, True
+    
+    def run(self, grid: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        并行回放所有配置
+        
+        Args:
+            grid: build_grid返回的配置列表
+            
+        Returns:
+            结果列表，顺序与grid一致
+        """
+        cache_dir, is_temp = self._shared_cache_dir()
+        kwargs = {'decision_interval': self.decision_interval, 'context_bars': self.context_bars,
+                  'initial_cash': self.initial_cash}
+        results = [None] * len(grid)
+        
+        start = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(grid)) or 1,
+                                     initializer=_init_worker, initargs=(cache_dir,)) as executor:
+                futures = {executor.submit(run_config, config, None, **kwargs): i for i, config in enumerate(grid)}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    i = futures[future]
+                    results[i] = future.result()
+                    status = "✅" if results[i]['summary'] is not None else "❌"
+                    print(f"{status} [{done}/{len(grid)}] {grid[i]['label']}")
+        finally:
+            if is_temp:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        self.last_wall_seconds = time.perf_counter() - start
+        return results
+    
+    def get_stats(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        并行效率统计
+        
+        Args:
+            results: run的返回值
+            
+        Returns:
+            {configs, workers, wall_seconds, replay_seconds, llm_seconds, speedup}，
+            speedup为各配置回放与LLM耗时之和 / 总墙钟时间
+        """
+        summaries = [result['summary'] for result in results if result['summary']]
+        replay = sum(summary['replay_seconds'] for summary in summaries)
+        llm = sum(summary['llm_seconds'] for summary in summaries)
+        wall = self.last_wall_seconds
+        return {
+            'configs': len(results),
+            'workers': len({result['pid'] for result in results}),
+            'wall_seconds': wall,
+            'replay_seconds': replay,
+            'llm_seconds': llm,
+            'speedup': (replay + llm) / wall if wall > 0 else 0.0
+        }
+
+
+def format_table(results: List[Dict[str, Any]], sort_by: str = 'sharpe') -> str:
+    """
+    格式化对比表
+    
+    Args:
+        results: SweepRunner.run的返回值
+        sort_by: 排序字段（summary中的键，降序）
+        
+    Returns:
+        对比表文本，失败的配置列在末尾
+    """
+    succeeded = [result for result in results if result['summary'] is not None]
+    failed = [result for result in results if result['summary'] is None]
+    succeeded.sort(key=lambda result: result['summary'].get(sort_by, 0.0), reverse=True)
+    
+    headers = ['#', '配置'] + [header for _, header, _ in TABLE_COLUMNS]
+    rows = []
+    for rank, result in enumerate(succeeded, start=1):
+        summary = result['summary']
+        rows.append([str(rank), result['config']['label']] +
+                    [fmt.format(summary[field]) for field, _, fmt in TABLE_COLUMNS])
+    
+    widths = [max(len(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(headers, widths))]
+    lines.append("  ".join("-" * width for width in widths))
+    for row in rows:
+        lines.append("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+    for result in failed:
+        lines.append(f"❌ {result['config']['label']}: {result['error']}")
+    return "\n".join(lines)
+
+
+def save_csv(results: List[Dict[str, Any]], path: str):
+    """
+    把对比表保存为CSV
+    
+    Args:
+        results: SweepRunner.run的返回值
+        path: 输出路径
+    """
+    config_fields = ['label', 'model', 'prompt', 'temperature', 'risk']
+    summary_fields = sorted({key for result in results if result['summary'] for key in result['summary']})
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(config_fields + summary_fields + ['error'])
+        for result in results:
+            summary = result['summary'] or {}
+            writer.writerow([result['config'][field] for field in config_fields] +
+                            [summary.get(field, '') for field in summary_fields] + [result.get('error', '')])
+
+
+def main():
+    """命令行入口：python -m core.sweep <bars.csv|bars.parquet|缓存目录>"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Alpha Arena 参数扫描")
+    parser.add_argument('bars', nargs='?', help="K线文件或缓存目录，不填则使用合成数据")
+    parser.add_argument('--models', default='stub', help="适配器注册名（逗号分隔）")
+    parser.add_argument('--prompts', default='default', help=f"提示词变体（逗号分隔，可选: {','.join(PROMPT_VARIANTS)}）")
+    parser.add_argument('--temperatures', default='', help="温度列表（逗号分隔），不填使用适配器默认值")
+    parser.add_argument('--risks', default='none', help=f"风控预设（逗号分隔，可选: {','.join(RISK_PRESETS)}）")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument('--interval', type=int, default=5, help="决策间隔（K线根数）")
+    parser.add_argument('--context-bars', type=int, default=0, help="每次决策附带的历史K线根数")
+    parser.add_argument('--synthetic-bars', type=int, default=43200, help="合成数据K线数量")
+    parser.add_argument('--sort-by', default='sharpe', help="对比表排序字段")
+    parser.add_argument('--output', help="把对比表另存为CSV")
+    args = parser.parse_args()
+    
+    if args.bars:
+        bars = BarData.load(args.bars)
+    else:
+        bars = BarData.synthetic(['BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'BNBUSDT', 'SOLUSDT'], args.synthetic_bars)
+    
+    split = lambda value: [item.strip() for item in value.split(',') if item.strip()]
+    grid = build_grid(split(args.models), split(args.prompts),
+                      [float(t) for t in split(args.temperatures)] or None, split(args.risks))
+    
+    runner = SweepRunner(bars, workers=args.workers, decision_interval=args.interval,
+                         context_bars=args.context_bars)
+    print(f"🧪 参数扫描: {len(grid)}个配置 × {len(bars)}根K线，{min(runner.workers, len(grid))}个进程")
+    results = runner.run(grid)
+    
+    print()
+    print(format_table(results, args.sort_by))
+    stats = runner.get_stats(results)
+    print(f"\n⏱️ 墙钟 {stats['wall_seconds']:.2f}s，回放合计 {stats['replay_seconds']:.2f}s"
+          f"（LLM另计 {stats['llm_seconds']:.2f}s），"
+          f"加速比 {stats['speedup']:.1f}x（{stats['workers']}个进程）")
+    
+    if args.output:
+        save_csv(results, args.output)
+        print(f"📄 对比表已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
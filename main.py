@@ -5,6 +5,7 @@ Alpha Arena MVP - 主程序
 最简化的AI交易决策对比系统
 """
 
+import argparse
 import os
 import sys
 from datetime import datetime
@@ -18,109 +19,231 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from core.market import MarketData
 from core.decision import DecisionMaker
-from adapters.openai_adapter import OpenAIAdapter
-from adapters.claude_adapter import ClaudeAdapter
+from core.orchestrator import DecisionOrchestrator
+from core.execution import PaperTradingEngine
+from core.scheduler import CycleScheduler
+from core.journal import DecisionJournal
+from core.arena import Arena
+from core.risk import RiskEngine, RISK_REASON_LABELS
+from core.kline_store import KlineStore
+from core.metrics import OnlineMetrics, SECONDS_PER_YEAR, format_metrics
+from adapters.registry import get_registry, load_enabled_models, create_model_adapter
+from adapters.ticker_stream import BitgetTickerStream
+from adapters.hedged_adapter import HedgedLLMAdapter
+from adapters.instrumentation import get_instrumentation
+
+# LLM超时（秒），超时=默认HOLD
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '8'))
+
+# 常驻模式的周期长度（秒），默认5分钟
+CYCLE_INTERVAL = float(os.getenv('CYCLE_INTERVAL', '300'))
+
+# 决策审计日志目录，设为空字符串时不记录
+JOURNAL_DIR = os.getenv('JOURNAL_DIR', 'journal')
+
+# 本地K线存储目录（按日分区的1分钟K线），启动时增量同步并预热prompt上下文，留空则不使用
+KLINE_DIR = os.getenv('KLINE_DIR', '')
+
+# 指标导出：本地HTTP端口（/metrics为Prometheus文本）与JSON文件路径，留空则不导出
+METRICS_PORT = os.getenv('METRICS_PORT', '')
+METRICS_FILE = os.getenv('METRICS_FILE', '')
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Alpha Arena - AI交易决策对比")
+    parser.add_argument('--loop', action='store_true', help="常驻运行，按时钟周期循环决策")
+    parser.add_argument('--interval', type=float, default=CYCLE_INTERVAL,
+                        help="常驻模式的周期长度（秒），默认读取CYCLE_INTERVAL，缺省300")
+    parser.add_argument('--cycles', type=int, default=None, help="常驻模式最多运行的周期数")
+    return parser.parse_args()
+
+
+def build_decision_makers(symbols):
+    """
+    按注册表初始化启用的AI模型（只导入启用模型的适配器模块和SDK）
+    
+    启用哪些模型由ENABLED_MODELS环境变量或models.json配置决定，默认OpenAI + Claude。
+    名称与已初始化模型重复的跳过（可用display_name选项区分同一服务商的多个模型）。
+    
+    Args:
+        symbols: 可交易代币列表（决定提示词模板）
+        
+    Returns:
+        决策引擎列表
+    """
+    registry = get_registry()
+    decision_makers = []
+    
+    for model in load_enabled_models(registry):
+        try:
+            adapter = create_model_adapter(model, registry)
+            name = adapter.get_model_name()
+            if name in {decision_maker.model_name for decision_maker in decision_makers}:
+                adapter.close()
+                print(f"❌ {model['name']}名称 {name} 与已启用的模型重复，请用display_name选项区分（桩适配器为model_name）")
+                continue
+            decision_makers.append(DecisionMaker(adapter, symbols=symbols))
+            print(f"✅ {model['name']} ({adapter.get_model_name()}) 初始化成功")
+        except Exception as e:
+            print(f"❌ {model['name']}初始化失败: {e}")
+    
+    return decision_makers
+
+
+def print_cycle_report(result, decision_makers, market_data, live_metrics=None, arena=None):
+    """
+    打印一个周期的行情、决策、对比和成交（只读，统计已由调度器在周期内更新）
+    
+    Args:
+        result: CycleScheduler.run_cycle返回的周期结果
+        decision_makers: 决策引擎列表
+        market_data: 市场数据管理器
+        live_metrics: 在线绩效指标（OnlineMetrics），为None时不显示
+        arena: 竞技场（Arena），为None时不显示排行榜
+    """
+    prices = result['snapshot']['prices']
+    decisions = result['decisions']
+    
+    print(f"\n🔄 第{result['cycle']}个周期（{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}）")
+    print("\n📈 当前市场价格:")
+    print(market_data.format_prices_for_display(prices))
+    
+    if not decisions:
+        return
+    
+    for decision_maker in decision_makers:
+        model_name = decision_maker.model_name
+        latency = result['latencies'].get(model_name, 0.0)
+        print(f"\n🤖 {model_name}决策（耗时 {latency:.2f}s）:")
+        print(decision_maker.format_decision_for_display(decisions[model_name]))
+    
+    # 对冲请求统计（只有配置了hedge的模型）
+    for decision_maker in decision_makers:
+        if isinstance(decision_maker.llm_adapter, HedgedLLMAdapter):
+            stats = decision_maker.llm_adapter.get_stats()
+            print(f"🔀 {decision_maker.model_name}对冲 {stats['hedges']}/{stats['calls']} 次，"
+                  f"对冲胜出 {stats['hedge_wins']} 次，估计节省 {stats['saved_seconds']:.2f}s，"
+                  f"当前对冲延迟 {stats['hedge_delay']:.2f}s")
+    
+    # 决策对比：信心度加权投票 + 两两一致率
+    if arena is not None and result.get('arena') is not None and len(decisions) >= 2:
+        print("\n📊 决策对比:")
+        print("-" * 30)
+        print(arena.format_cycle(result['arena'], decisions))
+    
+    # 模拟撮合
+    print("\n💼 模拟成交:")
+    for fill in result['fills']:
+        reason = f" [{RISK_REASON_LABELS[fill['reason']]}强平]" if 'reason' in fill else ""
+        print(f"   {fill['model']}: {fill['side']} {fill['symbol']} "
+              f"{fill['qty']:.6f} @ ${fill['price']:.4f}（手续费 ${fill['fee']:.4f}）{reason}")
+    if not result['fills']:
+        print("   本周期无成交")
+    
+    for model_name, nav in result['navs'].items():
+        print(f"   {model_name} 净值: ${nav:.2f}")
+    
+    if live_metrics is not None and result['navs']:
+        print("\n📐 绩效指标:")
+        for model_name, metrics in live_metrics.snapshot().items():
+            print(f"   {model_name}: {format_metrics(metrics)}")
+    
+    if arena is not None and len(result['navs']) >= 2:
+        snapshot = live_metrics.snapshot() if live_metrics is not None else None
+        print("\n🏆 排行榜:")
+        print(arena.format_leaderboard(arena.leaderboard(prices, snapshot)))
 
 
 def main():
     """主函数"""
+    args = parse_args()
+    
     print("🚀 Alpha Arena - 最简化MVP")
     print("=" * 50)
     print(f"📅 运行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
+    market_data = None
+    journal = None
+    decision_makers = []
+    instrumentation = get_instrumentation()
+    metrics_server = None
+    
     try:
-        # 初始化市场数据管理器
+        if METRICS_PORT:
+            try:
+                metrics_server = instrumentation.start_http_server(int(METRICS_PORT))
+            except OSError as e:
+                print(f"⚠️ 指标端点启动失败: {e}")
+        
+        # 初始化市场数据管理器（常驻模式订阅实时行情，周期之间保持热数据）
         print("📊 初始化市场数据管理器...")
-        market_data = MarketData()
+        ticker_stream = None
+        if args.loop:
+            try:
+                ticker_stream = BitgetTickerStream()
+            except ImportError as e:
+                print(f"⚠️ 实时行情不可用，每周期走REST: {e}")
+        kline_store = KlineStore(KLINE_DIR) if KLINE_DIR else None
+        market_data = MarketData(ticker_stream=ticker_stream, kline_store=kline_store)
         
         if not market_data.is_api_available():
             print("❌ 交易所API不可用，请检查配置")
             return
         
-        # 获取实时价格
-        print("💰 获取实时价格...")
-        prices = market_data.get_current_prices()
-        
-        print("\n📈 当前市场价格:")
-        print(market_data.format_prices_for_display(prices))
-        
-        # 检查是否有有效价格
-        valid_prices = {k: v for k, v in prices.items() if v > 0}
-        if not valid_prices:
-            print("❌ 没有获取到有效价格，请检查网络连接")
-            return
-        
         # 初始化LLM适配器
         print("\n🤖 初始化AI模型...")
+        decision_makers = build_decision_makers(market_data.get_symbols())
         
-        # OpenAI适配器
-        try:
-            openai_adapter = OpenAIAdapter()
-            openai_decision_maker = DecisionMaker(openai_adapter)
-            print(f"✅ OpenAI ({openai_adapter.get_model_name()}) 初始化成功")
-        except Exception as e:
-            print(f"❌ OpenAI初始化失败: {e}")
-            openai_decision_maker = None
-        
-        # Claude适配器
-        try:
-            claude_adapter = ClaudeAdapter()
-            claude_decision_maker = DecisionMaker(claude_adapter)
-            print(f"✅ Claude ({claude_adapter.get_model_name()}) 初始化成功")
-        except Exception as e:
-            print(f"❌ Claude初始化失败: {e}")
-            claude_decision_maker = None
-        
-        if not openai_decision_maker and not claude_decision_maker:
+        if not decision_makers:
             print("❌ 没有可用的AI模型，请检查API密钥配置")
             return
         
-        # 获取AI决策
-        print("\n🧠 获取AI交易决策...")
+        # 调度器、撮合引擎在整个进程内复用（单模型超时8秒，超时=默认HOLD）
+        orchestrator = DecisionOrchestrator(decision_makers, timeout=LLM_TIMEOUT)
+        engine = PaperTradingEngine(market_data.get_symbols())
+        for decision_maker in decision_makers:
+            engine.register_model(decision_maker.model_name)
         
-        decisions = {}
+        # 风控闸门：下单前限额校验，实时行情逐tick检查止盈止损和Kill-Switch
+        risk = RiskEngine(engine)
+        if ticker_stream is not None:
+            ticker_stream.add_listener(risk.on_tick)
         
-        # OpenAI决策
-        if openai_decision_maker:
-            print("\n🤖 OpenAI决策:")
-            try:
-                openai_decision = openai_decision_maker.get_decision(prices)
-                decisions['OpenAI'] = openai_decision
-                print(openai_decision_maker.format_decision_for_display(openai_decision))
-            except Exception as e:
-                print(f"❌ OpenAI决策获取失败: {e}")
+        # 在线绩效指标（按周期间隔年化）
+        live_metrics = OnlineMetrics(engine.ledger.model_names, engine.ledger.initial_cash,
+                                     periods_per_year=SECONDS_PER_YEAR / args.interval)
+        
+        # 竞技场：N模型投票、排行与两两一致率
+        arena = Arena(engine.ledger)
         
-        # Claude决策
-        if claude_decision_maker:
-            print("\n🤖 Claude决策:")
+        # 审计日志：后台线程批量落盘，不阻塞决策周期
+        if JOURNAL_DIR:
             try:
-                claude_decision = claude_decision_maker.get_decision(prices)
-                decisions['Claude'] = claude_decision
-                print(claude_decision_maker.format_decision_for_display(claude_decision))
-            except Exception as e:
-                print(f"❌ Claude决策获取失败: {e}")
+                journal = DecisionJournal(JOURNAL_DIR)
+                print(f"📝 审计日志目录: {JOURNAL_DIR}")
+            except ImportError as e:
+                print(f"⚠️ 审计日志不可用: {e}")
+        
+        def on_cycle(result):
+            print_cycle_report(result, decision_makers, market_data, live_metrics, arena)
+            if METRICS_FILE:
+                instrumentation.write_json(METRICS_FILE)
+        
+        scheduler = CycleScheduler(
+            market_data, orchestrator, engine, interval=args.interval,
+            on_cycle=on_cycle, journal=journal, risk=risk,
+            live_metrics=live_metrics, arena=arena
+        )
         
-        # 决策对比
-        if len(decisions) >= 2:
-            print("\n📊 决策对比:")
-            print("-" * 30)
-            
-            for model_name, decision in decisions.items():
-                symbol = decision.get('symbol', 'None')
-                action = decision.get('action', 'HOLD')
-                print(f"   {model_name}: {action} {symbol}")
-            
-            # 检查是否一致
-            if len(decisions) == 2:
-                openai_decision = decisions.get('OpenAI', {})
-                claude_decision = decisions.get('Claude', {})
-                
-                if (openai_decision.get('symbol') == claude_decision.get('symbol') and 
-                    openai_decision.get('action') == claude_decision.get('action')):
-                    print("   🎯 两个AI达成一致！")
-                else:
-                    print("   ⚡ 两个AI意见分歧")
+        if args.loop:
+            print(f"\n🔁 常驻模式，周期 {args.interval:.0f}s（Ctrl+C 退出）")
+            scheduler.run_forever(max_cycles=args.cycles)
+        else:
+            print("\n🧠 获取AI交易决策...")
+            result = scheduler.run_cycle()
+            print(f"\n{scheduler.format_timings(result['timings'])}")
         
         print("\n✅ 运行完成！")
         
@@ -130,6 +253,15 @@ def main():
         print(f"\n❌ 程序运行出错: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if journal is not None:
+            journal.close()
+        if market_data is not None:
+            market_data.close()
+        for decision_maker in decision_makers:
+            decision_maker.llm_adapter.close()
 
 
 if __name__ == "__main__":